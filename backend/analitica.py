@@ -0,0 +1,250 @@
+# backend/analitica.py
+#
+# Resumen de cotizaciones por vendedor y por proyecto (codigo_proyecto del
+# inmueble), por día. Se actualiza en la misma transacción que inserta las
+# cotizaciones (sumas y conteos corridos con un UPSERT por clave), así los
+# dashboards leen unas pocas filas en vez de agregar toda la tabla.
+#
+# El embudo (clientes nuevos / recurrentes) no se decide leyendo las
+# cotizaciones previas: cada cliente tiene una fila en resumen_clientes que se
+# actualiza con un UPSERT atómico (cuenta, día de la primera y de la segunda
+# cotización) y los conteos de un rango se calculan al consultar. Dos
+# inserciones concurrentes del mismo cliente quedan como primera y segunda.
+#
+# Uso (desde backend/):
+#   python analitica.py --reconstruir     # recalcula el resumen desde cotizaciones
+
+import argparse
+import os
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import and_, case, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+
+ANALITICA_HABILITADA = os.getenv("ANALITICA_HABILITADA", "1").lower() not in ("0", "false", "no")
+
+DIMENSIONES = ("vendedor", "proyecto")
+
+TAMANO_BLOQUE_RECONSTRUCCION = 2000
+
+CONTADORES = ("cotizaciones", "suma_tcea", "suma_monto_prestamo", "suma_cuota")
+
+_INSERT_POR_DIALECTO = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def _claves(fila: dict, proyectos: dict) -> dict:
+    """Clave de la fila en cada dimensión (None si no aplica)"""
+    vendedor = fila.get("vendedor_id")
+    return {
+        "vendedor": str(vendedor) if vendedor is not None else None,
+        "proyecto": proyectos.get(fila.get("inmueble_id")),
+    }
+
+
+def _acumular(filas: list[dict], proyectos: dict) -> tuple[dict, dict]:
+    """
+    Deltas del resumen para `filas` (en orden de inserción) y, por
+    (dimension, clave, cliente_id), cuántas cotizaciones suma el cliente con
+    el día y la moneda de la primera y la segunda de ellas.
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(CONTADORES, 0))
+    clientes = {}
+    for fila in filas:
+        dia = fila["fecha_cotizacion"].date()
+        moneda = fila.get("moneda_prestamo") or "PEN"
+        for dimension, clave in _claves(fila, proyectos).items():
+            if clave is None:
+                continue
+            d = deltas[(dimension, clave, moneda, dia)]
+            d["cotizaciones"] += 1
+            d["suma_tcea"] += fila.get("tcea") or 0.0
+            d["suma_monto_prestamo"] += fila.get("monto_prestamo") or 0.0
+            d["suma_cuota"] += fila.get("cuota_mensual_referencial") or 0.0
+
+            cliente = fila.get("cliente_id")
+            if cliente is None:
+                continue
+            c = clientes.get((dimension, clave, cliente))
+            if c is None:
+                clientes[(dimension, clave, cliente)] = dict(
+                    cotizaciones=1, primer_dia=dia, primera_moneda=moneda,
+                    segundo_dia=None, segunda_moneda=None,
+                )
+                continue
+            if c["cotizaciones"] == 1:
+                c["segundo_dia"], c["segunda_moneda"] = dia, moneda
+            c["cotizaciones"] += 1
+    return deltas, clientes
+
+
+def _proyectos(db: Session, filas: list[dict]) -> dict:
+    ids = {f.get("inmueble_id") for f in filas} - {None}
+    if not ids:
+        return {}
+    return dict(db.execute(
+        select(models.Inmueble.id, models.Inmueble.codigo_proyecto).where(models.Inmueble.id.in_(ids))
+    ).all())
+
+
+def _aplicar(db: Session, deltas: dict, clientes: dict):
+    """
+    UPSERT de los deltas (suma a la fila existente o la crea) y de los
+    clientes: si el cliente ya tenía una sola cotización, la primera de este
+    lote pasa a ser su segunda. Ninguno de los dos lee antes de escribir.
+    """
+    insertar = _INSERT_POR_DIALECTO[db.get_bind().dialect.name]
+    if deltas:
+        R = models.ResumenCotizacion.__table__
+        stmt = insertar(R)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["dimension", "clave", "moneda", "dia"],
+            set_={c: R.c[c] + stmt.excluded[c] for c in CONTADORES},
+        )
+        db.execute(stmt, [
+            dict(dimension=dimension, clave=clave, moneda=moneda, dia=dia, **valores)
+            for (dimension, clave, moneda, dia), valores in deltas.items()
+        ])
+    if clientes:
+        K = models.ResumenCliente.__table__
+        stmt = insertar(K)
+        era_primera = K.c.cotizaciones == 1
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["dimension", "clave", "cliente_id"],
+            set_={
+                "cotizaciones": K.c.cotizaciones + stmt.excluded.cotizaciones,
+                "segundo_dia": case((era_primera, stmt.excluded.primer_dia), else_=K.c.segundo_dia),
+                "segunda_moneda": case((era_primera, stmt.excluded.primera_moneda), else_=K.c.segunda_moneda),
+            },
+        )
+        db.execute(stmt, [
+            dict(dimension=dimension, clave=clave, cliente_id=cliente, **valores)
+            for (dimension, clave, cliente), valores in clientes.items()
+        ])
+
+
+def actualizar_resumen(db: Session, filas: list[dict]):
+    """
+    Suma `filas` (valores de cotizaciones a punto de insertarse) al resumen,
+    dentro de la transacción de `db`: debe llamarse antes del INSERT de las
+    cotizaciones y antes del commit. Fija fecha_cotizacion si falta, para que
+    la cotización y el resumen usen el mismo día.
+    """
+    if not ANALITICA_HABILITADA or not filas:
+        return
+    for fila in filas:
+        fila.setdefault("fecha_cotizacion", datetime.utcnow())
+    _aplicar(db, *_acumular(filas, _proyectos(db, filas)))
+
+
+def reconstruir_resumen(db: Session, bloque: int = TAMANO_BLOQUE_RECONSTRUCCION) -> int:
+    """
+    Vacía el resumen y el embudo y los recalcula recorriendo las cotizaciones por id.
+    Devuelve la cantidad de cotizaciones procesadas.
+    """
+    C = models.Cotizacion
+    columnas = (C.id, C.fecha_cotizacion, C.vendedor_id, C.cliente_id, C.inmueble_id,
+                C.moneda_prestamo, C.tcea, C.monto_prestamo, C.cuota_mensual_referencial)
+
+    db.execute(delete(models.ResumenCotizacion))
+    db.execute(delete(models.ResumenCliente))
+    proyectos = dict(db.execute(select(models.Inmueble.id, models.Inmueble.codigo_proyecto)).all())
+    procesadas = 0
+    ultimo_id = 0
+    while True:
+        filas = db.execute(
+            select(*columnas).where(C.id > ultimo_id, C.fecha_cotizacion.is_not(None))
+            .order_by(C.id).limit(bloque)
+        ).mappings().all()
+        if not filas:
+            break
+        _aplicar(db, *_acumular([dict(f) for f in filas], proyectos))
+        procesadas += len(filas)
+        ultimo_id = filas[-1]["id"]
+    db.commit()
+    return procesadas
+
+
+def _embudo(dimension: str, dia, moneda, fecha_desde: date | None, fecha_hasta: date | None):
+    """Clientes cuya primera (o segunda) cotización cae en el rango, por clave y moneda"""
+    K = models.ResumenCliente
+    stmt = (
+        select(K.clave, moneda.label("moneda"), func.count().label("clientes"))
+        .where(K.dimension == dimension, dia.is_not(None))
+        .group_by(K.clave, moneda)
+    )
+    if fecha_desde is not None:
+        stmt = stmt.where(dia >= fecha_desde)
+    if fecha_hasta is not None:
+        stmt = stmt.where(dia <= fecha_hasta)
+    return stmt.subquery()
+
+
+def consultar_resumen(dimension: str, fecha_desde: date | None = None, fecha_hasta: date | None = None):
+    """
+    SELECT agregado del resumen por clave y moneda (no toca cotizaciones).
+    Los clientes nuevos y recurrentes se cuentan en resumen_clientes.
+    """
+    R = models.ResumenCotizacion
+    K = models.ResumenCliente
+    cotizaciones = func.sum(R.cotizaciones)
+    totales = (
+        select(
+            R.clave,
+            R.moneda,
+            cotizaciones.label("cotizaciones"),
+            (func.sum(R.suma_tcea) / cotizaciones).label("tcea_promedio"),
+            (func.sum(R.suma_monto_prestamo) / cotizaciones).label("monto_prestamo_promedio"),
+            (func.sum(R.suma_cuota) / cotizaciones).label("cuota_promedio"),
+        )
+        .where(R.dimension == dimension)
+        .group_by(R.clave, R.moneda)
+    )
+    if fecha_desde is not None:
+        totales = totales.where(R.dia >= fecha_desde)
+    if fecha_hasta is not None:
+        totales = totales.where(R.dia <= fecha_hasta)
+    totales = totales.subquery()
+
+    # Toda primera o segunda cotización del rango está en `totales` (misma
+    # clave, moneda y día), así que basta un LEFT JOIN
+    nuevos = _embudo(dimension, K.primer_dia, K.primera_moneda, fecha_desde, fecha_hasta)
+    recurrentes = _embudo(dimension, K.segundo_dia, K.segunda_moneda, fecha_desde, fecha_hasta)
+    return (
+        select(
+            totales.c.clave,
+            totales.c.moneda,
+            totales.c.cotizaciones,
+            func.coalesce(nuevos.c.clientes, 0).label("clientes_nuevos"),
+            func.coalesce(recurrentes.c.clientes, 0).label("clientes_recurrentes"),
+            totales.c.tcea_promedio,
+            totales.c.monto_prestamo_promedio,
+            totales.c.cuota_promedio,
+        )
+        .outerjoin(nuevos, and_(nuevos.c.clave == totales.c.clave, nuevos.c.moneda == totales.c.moneda))
+        .outerjoin(recurrentes, and_(recurrentes.c.clave == totales.c.clave,
+                                     recurrentes.c.moneda == totales.c.moneda))
+        .order_by(totales.c.cotizaciones.desc())
+    )
+
+
+if __name__ == "__main__":
+    from database import Base, SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Resumen de cotizaciones por vendedor y proyecto")
+    parser.add_argument("--reconstruir", action="store_true", help="recalcular el resumen desde cotizaciones")
+    args = parser.parse_args()
+
+    if args.reconstruir:
+        Base.metadata.create_all(bind=engine)
+        with SessionLocal() as db:
+            total = reconstruir_resumen(db)
+        print(f"Cotizaciones resumidas: {total}")
+    else:
+        parser.print_help()
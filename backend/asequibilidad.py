@@ -0,0 +1,114 @@
+# backend/asequibilidad.py
+#
+# Asequibilidad: qué inmuebles le alcanzan a un cliente y qué clientes
+# califican para un proyecto, con unas mismas condiciones de financiamiento.
+#
+# La cuota referencial de cada inmueble sale de una sola pasada de
+# logic.calcular_columnas_lote sobre el array de precios, pidiendo cero meses
+# de cronograma (meses=()): sólo se calcula la cuota, sin columnas. Nada se
+# guarda en la BD.
+#
+# El préstamo se toma en la moneda de venta del inmueble y el ingreso del
+# cliente se compara en esa misma moneda (no hay tipo de cambio): por eso
+# sólo se evalúan los inmuebles de la moneda pedida.
+
+import os
+
+import numpy as np
+
+import logic
+
+# ============================================================
+# Configuración (variables de entorno)
+# ============================================================
+
+# Cuota / ingreso (%) máximo por defecto
+LIMITE_CUOTA_INGRESO = float(os.getenv("ASEQUIBILIDAD_LIMITE_CUOTA_INGRESO", "30"))
+
+
+def cuotas_referenciales(precios, condiciones):
+    """
+    (monto_prestamo, cuota_mensual_referencial) de cada precio con las
+    `condiciones` (schemas.CondicionesFinanciamiento), como arrays.
+    Mismas fórmulas que logic.parametros_lote.
+    """
+    precios = np.asarray(precios, dtype=np.float64)
+    monto_prestamo = precios - precios * (condiciones.porcentaje_cuota_inicial / 100.0) \
+        - condiciones.monto_bono_buen_pagador
+    _, cuota = logic.calcular_columnas_lote(
+        monto_prestamo=monto_prestamo,
+        tem=logic.tasa_efectiva_mensual(condiciones.tipo_tasa, condiciones.valor_tasa, condiciones.capitalizacion),
+        total_cuotas=condiciones.plazo_anios * 12,
+        tipo_gracia=logic.codigo_gracia(condiciones.tipo_periodo_gracia),
+        meses_gracia=condiciones.meses_gracia,
+        seguro_desgravamen_porc=condiciones.seguro_desgravamen_porc,
+        seguro_riesgo_mensual=precios * (condiciones.seguro_riesgo_porc / 12 / 100.0), # Anual a mensual
+        gastos=condiciones.gastos_administrativos,
+        meses=(),
+    )
+    return monto_prestamo, cuota
+
+
+def inmuebles_asequibles(ingreso_mensual: float, precios, condiciones,
+                         limite_cuota_ingreso: float, maximo: int) -> dict:
+    """
+    Evalúa todos los `precios` para un ingreso. Devuelve las posiciones de los
+    inmuebles con cuota / ingreso <= límite, de menor a mayor relación (a lo
+    más `maximo`), con su monto, cuota y relación.
+    """
+    monto_prestamo, cuota = cuotas_referenciales(precios, condiciones)
+    if ingreso_mensual > 0:
+        cuota_ingreso = cuota / ingreso_mensual * 100
+    else:
+        cuota_ingreso = np.full(cuota.size, np.inf)
+
+    asequibles = np.flatnonzero((cuota_ingreso <= limite_cuota_ingreso) & (monto_prestamo > 0))
+    total = asequibles.size
+    if asequibles.size > maximo:
+        # Sólo se ordenan los `maximo` mejores
+        asequibles = asequibles[np.argpartition(cuota_ingreso[asequibles], maximo - 1)[:maximo]]
+    orden = asequibles[np.argsort(cuota_ingreso[asequibles], kind="stable")]
+
+    return {
+        "evaluados": int(cuota.size),
+        "asequibles": int(total),
+        "posiciones": orden,
+        "monto_prestamo": monto_prestamo[orden],
+        "cuota_mensual_referencial": cuota[orden],
+        "cuota_ingreso": cuota_ingreso[orden],
+    }
+
+
+def clientes_elegibles(ingresos, precios, condiciones,
+                       limite_cuota_ingreso: float, maximo: int) -> dict:
+    """
+    Modo inverso: para cada ingreso, cuántos de los `precios` (inmuebles de un
+    proyecto) quedan dentro del límite. Con las cuotas ordenadas basta un
+    searchsorted por cliente en vez de la matriz clientes x inmuebles.
+
+    Devuelve las posiciones de los clientes con al menos un inmueble
+    asequible, de más a menos inmuebles (a lo más `maximo`).
+    """
+    ingresos = np.asarray(ingresos, dtype=np.float64)
+    monto_prestamo, cuota = cuotas_referenciales(precios, condiciones)
+    cuotas = np.sort(cuota[monto_prestamo > 0])
+
+    cuota_maxima = np.where(ingresos > 0, ingresos * limite_cuota_ingreso / 100, -np.inf)
+    cantidad = np.searchsorted(cuotas, cuota_maxima, side="right")
+
+    elegibles = np.flatnonzero(cantidad > 0)
+    # Más inmuebles primero; a igualdad, mayor ingreso
+    orden = elegibles[np.lexsort((-ingresos[elegibles], -cantidad[elegibles]))][:maximo]
+    cuota_minima = cuotas[0] if cuotas.size else np.nan
+
+    return {
+        "inmuebles": int(cuotas.size),
+        "cuota_desde": round(float(cuotas[0]), 2) if cuotas.size else None,
+        "cuota_hasta": round(float(cuotas[-1]), 2) if cuotas.size else None,
+        "evaluados": int(ingresos.size),
+        "elegibles": int(elegibles.size),
+        "posiciones": orden,
+        "cuota_maxima": cuota_maxima[orden],
+        "inmuebles_asequibles": cantidad[orden],
+        "cuota_ingreso_minima": cuota_minima / ingresos[orden] * 100,
+    }
@@ -1,10 +1,18 @@
 # backend/auth_utils.py
 
 from passlib.context import CryptContext
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import os
+import threading
+import time
 import models
+from pool_hashing import pool_hashing
+from metricas import medir
 
 # ============================================================
 # Configuración del JWT
@@ -41,6 +49,20 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    verify_password en el pool de hashing (no bloquea el event loop).
+    """
+    return await pool_hashing.ejecutar(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    get_password_hash en el pool de hashing (no bloquea el event loop).
+    """
+    return await pool_hashing.ejecutar(get_password_hash, password)
+
+
 # ============================================================
 # Token JWT
 # ============================================================
@@ -56,17 +78,113 @@ def create_access_token(data: dict) -> str:
     return encoded_jwt
 
 
+# ============================================================
+# Caché de tokens verificados
+# ============================================================
+
+AUTH_CACHE_HABILITADO = os.getenv("AUTH_CACHE_HABILITADO", "1").lower() not in ("0", "false", "no")
+AUTH_CACHE_MAX_TOKENS = int(os.getenv("AUTH_CACHE_MAX_TOKENS", "10000"))
+# Vida máxima de una entrada: cota de lo que un proceso sigue aceptando una
+# cuenta borrada o cambiada desde otro proceso (u otro camino que el ORM)
+AUTH_CACHE_TTL_SEGUNDOS = float(os.getenv("AUTH_CACHE_TTL_SEGUNDOS", "30"))
+
+
+@dataclass(frozen=True)
+class AgenteAutenticado:
+    """
+    Copia inmutable de la CuentaAgente autenticada. No depende de una
+    sesión de BD, así que se puede reutilizar entre requests.
+    """
+    id: int
+    username: str
+    email: str
+
+
+class CacheTokens:
+    """
+    token -> (expira_en, agente). Cada entrada vence con el `exp` de su token
+    o a los `ttl` segundos, lo que ocurra antes; al llenarse se descarta la
+    menos usada (LRU).
+
+    La invalidación inmediata (_invalidar_al_modificar) sólo ve los cambios
+    hechos con el ORM en este proceso. Con varios workers, SQL directo o
+    importaciones desde otro proceso, la cuenta vieja se sigue aceptando a
+    lo más `ttl` segundos.
+    """
+
+    def __init__(self, max_tokens: int = AUTH_CACHE_MAX_TOKENS, ttl: float = AUTH_CACHE_TTL_SEGUNDOS):
+        self.max_tokens = max_tokens
+        self.ttl = ttl
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, token: str):
+        with self._lock:
+            entrada = self._tokens.get(token)
+            if entrada is None:
+                return None
+            expira_en, agente = entrada
+            if expira_en <= time.time():
+                del self._tokens[token]
+                return None
+            self._tokens.move_to_end(token)
+            return agente
+
+    def guardar(self, token: str, expira_en: float, agente: AgenteAutenticado):
+        with self._lock:
+            self._tokens[token] = (min(expira_en, time.time() + self.ttl), agente)
+            self._tokens.move_to_end(token)
+            while len(self._tokens) > self.max_tokens:
+                self._tokens.popitem(last=False)
+
+    def invalidar_email(self, email: str):
+        """Descarta todos los tokens de una cuenta (p. ej. si cambió o se borró)."""
+        with self._lock:
+            for token in [t for t, (_, a) in self._tokens.items() if a.email == email]:
+                del self._tokens[token]
+
+    def limpiar(self):
+        with self._lock:
+            self._tokens.clear()
+
+
+cache_tokens = CacheTokens()
+
+
+def invalidar_cuenta(email: str):
+    cache_tokens.invalidar_email(email)
+
+
+@event.listens_for(models.CuentaAgente, "after_update")
+@event.listens_for(models.CuentaAgente, "after_delete")
+def _invalidar_al_modificar(mapper, connection, cuenta):
+    invalidar_cuenta(cuenta.email)
+    # Si cambió el email, los tokens emitidos con el anterior también caducan
+    for email in inspect(cuenta).attrs.email.history.deleted:
+        invalidar_cuenta(email)
+
+
 # ============================================================
 # Decodificar token + obtener usuario
 # ============================================================
 
-def decode_access_token(token: str, db: Session):
+async def decode_access_token(token: str, db: AsyncSession):
     """
     Decodifica el token, extrae el EMAIL y devuelve
-    el usuario (CuentaAgente) de la base de datos.
+    el usuario (CuentaAgente) autenticado.
+
+    Los tokens ya verificados se sirven desde `cache_tokens` hasta su `exp`
+    (a lo más AUTH_CACHE_TTL_SEGUNDOS), sin volver a verificar el JWT ni
+    consultar la BD.
     """
+    if AUTH_CACHE_HABILITADO:
+        agente = cache_tokens.obtener(token)
+        if agente is not None:
+            return agente
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with medir("auth.jwt"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str | None = payload.get("sub")  # Ahora es email, no username
         if email is None:
             return None
@@ -74,4 +192,11 @@ def decode_access_token(token: str, db: Session):
         return None
 
     # Busca en CuentaAgente por email
-    return db.query(models.CuentaAgente).filter(models.CuentaAgente.email == email).first()
+    cuenta = await db.scalar(select(models.CuentaAgente).where(models.CuentaAgente.email == email))
+    if cuenta is None:
+        return None
+
+    agente = AgenteAutenticado(id=cuenta.id, username=cuenta.username, email=cuenta.email)
+    if AUTH_CACHE_HABILITADO and payload.get("exp") is not None:
+        cache_tokens.guardar(token, float(payload["exp"]), agente)
+    return agente
@@ -0,0 +1,78 @@
+# backend/benchmarks/bench_asequibilidad.py
+#
+# Asequibilidad (asequibilidad.py):
+#   - paridad: la cuota de cada inmueble debe coincidir con logic.calcular_cotizacion
+#   - tiempo de un cliente contra N inmuebles y del modo inverso
+#
+# Uso (desde backend/):
+#   python -m benchmarks.bench_asequibilidad
+
+import time
+
+import numpy as np
+
+import asequibilidad
+import logic
+from schemas import CondicionesFinanciamiento, CotizacionInput
+
+TIPOS_GRACIA = ("Sin Gracia", "Parcial", "Total")
+
+
+def condiciones(tipo_gracia: str) -> CondicionesFinanciamiento:
+    return CondicionesFinanciamiento(
+        porcentaje_cuota_inicial=10,
+        monto_bono_buen_pagador=5000,
+        tipo_tasa="Efectiva",
+        valor_tasa=9.0,
+        plazo_anios=20,
+        tipo_periodo_gracia=tipo_gracia,
+        meses_gracia=0 if tipo_gracia == "Sin Gracia" else 6,
+        seguro_desgravamen_porc=0.05,
+        seguro_riesgo_porc=0.3,
+        gastos_administrativos=10,
+    )
+
+
+def cronometrar(funcion, repeticiones: int = 20) -> float:
+    mejor = float("inf")
+    for _ in range(5):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        mejor = min(mejor, (time.perf_counter() - inicio) / repeticiones)
+    return mejor
+
+
+def main():
+    rng = np.random.default_rng(7)
+
+    # Paridad con el cálculo de una cotización
+    precios = rng.integers(80, 900, 20) * 1000.0
+    for gracia in TIPOS_GRACIA:
+        c = condiciones(gracia)
+        monto, cuota = asequibilidad.cuotas_referenciales(precios, c)
+        error = 0.0
+        for precio, m, q in zip(precios, monto, cuota):
+            r = logic.calcular_cotizacion(CotizacionInput(
+                cliente_id=1, inmueble_id=1, precio_final_inmueble=precio,
+                **c.model_dump(exclude={"moneda", "limite_cuota_ingreso"}),
+            ))
+            error = max(error, abs(r["monto_prestamo"] - m), abs(r["cuota_mensual_referencial"] - round(q, 2)))
+        print(f"paridad {gracia:<10} | error máx {error:.1e}")
+        assert error == 0.0
+
+    c = condiciones("Parcial")
+    for n in (10_000, 50_000, 200_000):
+        precios = rng.integers(80, 900, n) * 1000.0
+        t = cronometrar(lambda: asequibilidad.inmuebles_asequibles(8000.0, precios, c, 30.0, 100))
+        print(f"1 cliente x {n:>7} inmuebles | {t * 1e3:7.2f} ms")
+
+    precios = rng.integers(80, 900, 500) * 1000.0
+    for n in (10_000, 50_000, 200_000):
+        ingresos = rng.integers(1000, 20000, n) * 1.0
+        t = cronometrar(lambda: asequibilidad.clientes_elegibles(ingresos, precios, c, 30.0, 100))
+        print(f"{n:>7} clientes x 500 inmuebles | {t * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# backend/benchmarks/bench_auth.py
+#
+# Throughput de requests autenticados con y sin la caché de tokens
+# (auth_utils.cache_tokens), usando un cliente en proceso y una BD temporal.
+#
+# Uso (desde backend/):
+#   python -m benchmarks.bench_auth
+
+import os
+import sys
+import tempfile
+import time
+
+REQUESTS = 2000
+
+
+def preparar_app():
+    """
+    Importa la app dentro de un directorio temporal para no tocar la BD local.
+    """
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, backend)
+    os.chdir(tempfile.mkdtemp(prefix="bench_auth_"))
+
+    from fastapi.testclient import TestClient
+    import main
+
+    # Con el cliente abierto se usa un solo event loop (y se corre el lifespan)
+    cliente = TestClient(main.app)
+    cliente.__enter__()
+    cliente.post(
+        "/api/registrar-usuario",
+        json={"username": "bench", "email": "bench@example.com", "password": "bench"},
+    )
+    token = cliente.post(
+        "/token", data={"username": "bench@example.com", "password": "bench"}
+    ).json()["access_token"]
+    return cliente, token
+
+
+def medir_requests(cliente, token: str, cantidad: int) -> float:
+    """
+    Requests por segundo contra un endpoint protegido que no consulta la BD
+    (incluye el costo del cliente HTTP en proceso).
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    inicio = time.perf_counter()
+    for _ in range(cantidad):
+        respuesta = cliente.get("/api/cotizar/cache", headers=headers)
+        assert respuesta.status_code == 200
+    return cantidad / (time.perf_counter() - inicio)
+
+
+def medir_dependencia(cliente, token: str, cantidad: int) -> float:
+    """
+    Autenticaciones por segundo de get_current_user, con una sesión nueva
+    por llamada como en cada request.
+    """
+    import main
+    from database import AsyncSessionLocal
+
+    async def autenticar():
+        inicio = time.perf_counter()
+        for _ in range(cantidad):
+            async with AsyncSessionLocal() as db:
+                assert await main.get_current_user(token=token, db=db) is not None
+        return cantidad / (time.perf_counter() - inicio)
+
+    # En el loop del cliente, donde viven las conexiones del engine async
+    return cliente.portal.call(autenticar)
+
+
+def main():
+    cliente, token = preparar_app()
+    import auth_utils
+
+    mediciones = {
+        "get_current_user": lambda: medir_dependencia(cliente, token, REQUESTS),
+        "GET /api/cotizar/cache": lambda: medir_requests(cliente, token, REQUESTS // 4),
+    }
+    for nombre, medir in mediciones.items():
+        resultados = {False: 0.0, True: 0.0}
+        # Rondas alternadas; se reporta la mejor de cada modo
+        for _ in range(3):
+            for habilitado in (False, True):
+                auth_utils.AUTH_CACHE_HABILITADO = habilitado
+                auth_utils.cache_tokens.limpiar()
+                resultados[habilitado] = max(resultados[habilitado], medir())
+
+        print(
+            f"{nombre:<24} sin caché {resultados[False]:9.1f}/s | "
+            f"con caché {resultados[True]:9.1f}/s | x{resultados[True] / resultados[False]:.2f}"
+        )
+
+    cliente.__exit__(None, None, None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# backend/benchmarks/bench_tcea.py
+#
+# Compara el solver de TIR dedicado (tcea.py) contra numpy_financial.irr
+# sobre flujos típicos de un crédito hipotecario.
+#
+# Uso (desde backend/):
+#   python -m benchmarks.bench_tcea
+
+import time
+import numpy as np
+import numpy_financial as npf
+import tcea
+
+
+def generar_flujos(cantidad: int, meses: int, semilla: int = 0) -> np.ndarray:
+    """
+    Flujos de tipo hipotecario: desembolso en t=0 y cuotas fijas con seguros.
+    """
+    rng = np.random.default_rng(semilla)
+    monto = rng.uniform(50_000, 500_000, cantidad)
+    tem = rng.uniform(0.004, 0.012, cantidad)
+    cuota = monto * tem / (1 - (1 + tem) ** -meses)
+    cargos = rng.uniform(0, 150, cantidad)
+
+    flujos = np.empty((cantidad, meses + 1))
+    flujos[:, 0] = monto
+    flujos[:, 1:] = -(cuota + cargos)[:, None]
+    return flujos
+
+
+def cronometrar(funcion, repeticiones: int) -> float:
+    """
+    Devuelve el mejor tiempo (segundos) de `repeticiones` ejecuciones.
+    """
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    for meses in (60, 120, 240, 360):
+        flujos = generar_flujos(50, meses)
+
+        # npf.irr es lento: una sola pasada, que también sirve de referencia
+        inicio = time.perf_counter()
+        esperado = np.array([npf.irr(f) for f in flujos])
+        t_npf = time.perf_counter() - inicio
+
+        t_uno = cronometrar(lambda: [tcea.calcular_tir(f) for f in flujos], 3)
+        t_lote = cronometrar(lambda: tcea.calcular_tir_lote(flujos), 3)
+
+        obtenido, convergio = tcea.calcular_tir_lote(flujos)
+        error_max = np.max(np.abs(esperado - obtenido))
+
+        print(
+            f"{meses:>3} meses x {len(flujos)} flujos | "
+            f"npf.irr {t_npf * 1e3:8.2f} ms | "
+            f"calcular_tir {t_uno * 1e3:8.2f} ms | "
+            f"calcular_tir_lote {t_lote * 1e3:8.2f} ms | "
+            f"convergió {convergio.all()} | error máx {error_max:.1e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
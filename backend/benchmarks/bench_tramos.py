@@ -0,0 +1,65 @@
+# backend/benchmarks/bench_tramos.py
+#
+# Cronograma con tasa por tramos (logic.calcular_columnas_tramos): tiempo
+# según la cantidad de tramos, frente a la tasa única. La paridad con el
+# bucle de referencia está en tests/test_tramos.py.
+#
+# Uso (desde backend/):
+#   python -m benchmarks.bench_tramos
+
+import time
+
+import logic
+from schemas import CotizacionInput, TramoTasa
+
+
+def cotizacion(plazo_anios: int, tipo_gracia: str, tramos=None) -> CotizacionInput:
+    return CotizacionInput(
+        cliente_id=1,
+        inmueble_id=1,
+        precio_final_inmueble=350000,
+        porcentaje_cuota_inicial=10,
+        tipo_tasa="Efectiva",
+        valor_tasa=9.0,
+        plazo_anios=plazo_anios,
+        tramos_tasa=tramos,
+        tipo_periodo_gracia=tipo_gracia,
+        meses_gracia=0 if tipo_gracia == "Sin Gracia" else 6,
+        seguro_desgravamen_porc=0.05,
+        seguro_riesgo_porc=0.3,
+        gastos_administrativos=10,
+    )
+
+
+def cronometrar(funcion, repeticiones: int = 50) -> float:
+    mejor = float("inf")
+    for _ in range(5):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        mejor = min(mejor, (time.perf_counter() - inicio) / repeticiones)
+    return mejor
+
+
+def main():
+    # Tiempo: fija a 9% los primeros años y luego reprecia cada `cada` años
+    for n_tramos in (1, 2, 4, 8):
+        cada = max(30 // n_tramos, 1)
+        tramos = [
+            TramoTasa(desde_mes=k * cada * 12 + 1, tipo_tasa="Efectiva", valor_tasa=9.0 + k)
+            for k in range(1, n_tramos)
+        ]
+        datos = cotizacion(30, "Parcial", tramos)
+        t = cronometrar(lambda: logic.calcular_cotizacion(datos))
+        resultado = logic.calcular_cotizacion(datos)
+        saldo_final = resultado["cronograma"][-1]["saldo_final"]
+        print(
+            f"{n_tramos} tramo(s) 30a | {t * 1e3:6.3f} ms | "
+            f"TCEA {resultado['tcea']:.4f}% | saldo final {saldo_final:.2f}"
+        )
+    base = cotizacion(30, "Parcial")
+    print(f"tasa única     30a | {cronometrar(lambda: logic.calcular_cotizacion(base)) * 1e3:6.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+# backend/benchmarks/suite.py
+#
+# Suite de benchmarks reproducible del motor de cotización y de la API:
+#   - micro: logic.calcular_cotizacion para plazos de 5 a 30 años, cada tipo
+#     de gracia y ambos tipos de tasa; y el cálculo de la TIR por separado
+#   - endpoints: /token, /api/cotizar y los listados, con TestClient sobre
+#     una BD SQLite temporal con datos sembrados
+#
+# Los resultados se guardan en JSON; con --base se comparan contra una
+# corrida anterior y el proceso sale con código 1 si algún caso es más
+# lento que la base por encima del umbral.
+#
+# Uso (desde backend/):
+#   python -m benchmarks.suite --salida base.json
+#   python -m benchmarks.suite --base base.json --umbral 0.15
+#   python -m benchmarks.suite --solo micro --rapido
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+PLAZOS_ANIOS = (5, 10, 15, 20, 25, 30)
+TIPOS_GRACIA = ("Sin Gracia", "Parcial", "Total")
+TIPOS_TASA = ("Efectiva", "Nominal")
+
+# Datos sembrados para los benchmarks de endpoints
+SEMILLA = 20240601
+CLIENTES_SEMBRADOS = 5000
+INMUEBLES_SEMBRADOS = 2000
+COTIZACIONES_SEMBRADAS = 3000
+
+UMBRAL_REGRESION = 0.10
+
+
+# ============================================================
+# Medición
+# ============================================================
+
+def _estadisticas(muestras_s: list[float]) -> dict:
+    ordenadas = sorted(muestras_s)
+    p95 = ordenadas[min(len(ordenadas) - 1, int(round(0.95 * (len(ordenadas) - 1))))]
+    return {
+        "mediana_ms": round(statistics.median(ordenadas) * 1e3, 4),
+        "p95_ms": round(p95 * 1e3, 4),
+        "min_ms": round(ordenadas[0] * 1e3, 4),
+        "muestras": len(ordenadas),
+    }
+
+
+def medir_por_llamada(funcion, llamadas: int, repeticiones: int) -> dict:
+    """
+    `repeticiones` muestras de `llamadas` ejecuciones cada una; cada muestra
+    se divide por `llamadas` (tiempo por llamada). Hay una pasada de calentamiento.
+    """
+    funcion()
+    muestras = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(llamadas):
+            funcion()
+        muestras.append((time.perf_counter() - inicio) / llamadas)
+    return _estadisticas(muestras)
+
+
+def medir_cada_una(funcion, repeticiones: int) -> dict:
+    """Una muestra por ejecución (para requests, donde interesa el p95)"""
+    funcion()
+    muestras = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        muestras.append(time.perf_counter() - inicio)
+    return _estadisticas(muestras)
+
+
+# ============================================================
+# Micro-benchmarks del motor
+# ============================================================
+
+def _cotizacion_input(plazo_anios: int, tipo_gracia: str, tipo_tasa: str, valor_tasa: float = 9.0):
+    from schemas import CotizacionInput
+
+    return CotizacionInput(
+        cliente_id=1,
+        inmueble_id=1,
+        precio_final_inmueble=350000,
+        porcentaje_cuota_inicial=10,
+        monto_bono_buen_pagador=0,
+        tipo_tasa=tipo_tasa,
+        valor_tasa=valor_tasa,
+        capitalizacion=30,
+        plazo_anios=plazo_anios,
+        tipo_periodo_gracia=tipo_gracia,
+        meses_gracia=0 if tipo_gracia == "Sin Gracia" else 6,
+        seguro_desgravamen_porc=0.05,
+        seguro_riesgo_porc=0.3,
+        gastos_administrativos=10,
+    )
+
+
+def micro(rapido: bool) -> dict:
+    import logic
+    import tcea
+    from benchmarks.bench_tcea import generar_flujos
+
+    llamadas, repeticiones = (5, 5) if rapido else (20, 15)
+    resultados = {}
+
+    for plazo in PLAZOS_ANIOS:
+        for gracia in TIPOS_GRACIA:
+            for tipo_tasa in TIPOS_TASA:
+                datos = _cotizacion_input(plazo, gracia, tipo_tasa)
+                nombre = f"calcular_cotizacion/{plazo}a/{gracia}/{tipo_tasa}"
+                resultados[nombre] = medir_por_llamada(
+                    lambda: logic.calcular_cotizacion(datos), llamadas, repeticiones
+                )
+
+    for plazo in PLAZOS_ANIOS:
+        [flujo] = generar_flujos(1, plazo * 12, semilla=SEMILLA)
+        resultados[f"tir/{plazo}a"] = medir_por_llamada(
+            lambda: tcea.calcular_tir(flujo), llamadas * 5, repeticiones
+        )
+    return resultados
+
+
+# ============================================================
+# Endpoints (TestClient + SQLite sembrada)
+# ============================================================
+
+def sembrar(clientes: int, inmuebles: int, cotizaciones: int):
+    """
+    Llena la BD (ya configurada por DATABASE_URL) con datos deterministas.
+    """
+    from sqlalchemy import insert
+
+    import analitica
+    import crud
+    import logic
+    import models
+    from database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    rng = np.random.default_rng(SEMILLA)
+
+    with SessionLocal() as db:
+        db.execute(insert(models.Cliente), [
+            dict(
+                dni=f"{10000000 + i}", nombres=f"Cliente {i}", apellidos="Bench",
+                email=f"c{i}@bench.pe", telefono="999999999",
+                ingreso_mensual=float(rng.uniform(2000, 25000)), edad=int(rng.integers(25, 60)),
+                calificacion_sentinel=("Normal", "CPP", "Deficiente")[i % 3], direccion_actual="Lima",
+            )
+            for i in range(clientes)
+        ])
+        db.execute(insert(models.Inmueble), [
+            dict(
+                codigo_proyecto=f"P{i % 25:02d}", direccion=f"Av. Bench {i}", tipo="Departamento",
+                area_m2=float(rng.uniform(45, 150)), precio_venta=float(rng.uniform(150000, 600000)),
+                moneda_venta="PEN" if i % 4 else "USD", estado="Disponible" if i % 5 else "Vendido",
+            )
+            for i in range(inmuebles)
+        ])
+        db.commit()
+
+        lote = [
+            _cotizacion_input(
+                int(rng.choice(PLAZOS_ANIOS)), TIPOS_GRACIA[i % 3], TIPOS_TASA[i % 2],
+                valor_tasa=float(rng.uniform(6, 14)),
+            ).model_copy(update={
+                "cliente_id": int(rng.integers(1, clientes + 1)),
+                "inmueble_id": int(rng.integers(1, inmuebles + 1)),
+            })
+            for i in range(cotizaciones)
+        ]
+        resultados, _ = logic.calcular_cotizaciones_lote(lote)
+        filas = [
+            crud.cotizacion_valores(datos, resultado, vendedor_id=1)
+            for datos, resultado in zip(lote, resultados)
+            if resultado is not None
+        ]
+        # El almacén de flujos lo reconstruye el arranque de la API (sincronizar)
+        analitica.actualizar_resumen(db, filas)
+        db.execute(insert(models.Cotizacion), filas)
+        db.commit()
+
+
+def endpoints(rapido: bool) -> dict:
+    repeticiones = 20 if rapido else 100
+    directorio = tempfile.mkdtemp(prefix="bench_suite_")
+    # La URL se fija antes de importar database/main
+    os.environ["DATABASE_URL"] = f"sqlite:///{directorio}/bench.db"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+
+    sembrar(CLIENTES_SEMBRADOS, INMUEBLES_SEMBRADOS, COTIZACIONES_SEMBRADAS)
+
+    from fastapi.testclient import TestClient
+    import main
+
+    resultados = {}
+    with TestClient(main.app) as cliente:
+        cliente.post("/api/registrar-usuario",
+                     json={"username": "bench", "email": "bench@bench.pe", "password": "bench"})
+        credenciales = {"username": "bench@bench.pe", "password": "bench"}
+
+        def login():
+            respuesta = cliente.post("/token", data=credenciales)
+            assert respuesta.status_code == 200, respuesta.text
+            return respuesta.json()["access_token"]
+
+        # /token es caro (hash): menos repeticiones
+        resultados["POST /token"] = medir_cada_una(login, max(5, repeticiones // 10))
+        headers = {"Authorization": f"Bearer {login()}"}
+
+        # Tasa distinta en cada request para no medir aciertos de la caché
+        tasas = iter(np.linspace(6, 14, 10 * repeticiones + 10))
+
+        def cotizar():
+            datos = _cotizacion_input(20, "Parcial", "Efectiva", valor_tasa=float(next(tasas)))
+            respuesta = cliente.post("/api/cotizar", headers=headers, json=datos.model_dump())
+            assert respuesta.status_code == 200, respuesta.text
+
+        resultados["POST /api/cotizar"] = medir_cada_una(cotizar, repeticiones)
+
+        listados = {
+            "GET /api/clientes": ("/api/clientes", {"limit": 100}),
+            "GET /api/clientes (cursor profundo)": ("/api/clientes", {"limit": 100, "despues_de": CLIENTES_SEMBRADOS - 200}),
+            "GET /api/clientes (filtros)": ("/api/clientes", {"calificacion_sentinel": "CPP", "ingreso_min": 10000}),
+            "GET /api/inmuebles": ("/api/inmuebles", {"limit": 100}),
+            "GET /api/inmuebles (filtros)": ("/api/inmuebles", {"estado": "Disponible", "moneda_venta": "PEN", "precio_max": 300000}),
+            "GET /api/cotizaciones": ("/api/cotizaciones", {"limit": 100}),
+            "GET /api/cotizaciones (filtros)": ("/api/cotizaciones", {"inmueble_id": 7, "con_total": True}),
+        }
+        for nombre, (ruta, parametros) in listados.items():
+            def listar(ruta=ruta, parametros=parametros):
+                respuesta = cliente.get(ruta, headers=headers, params=parametros)
+                assert respuesta.status_code == 200, respuesta.text
+            resultados[nombre] = medir_cada_una(listar, repeticiones)
+
+    return resultados
+
+
+# ============================================================
+# Resultados y comparación
+# ============================================================
+
+def entorno() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+    }
+
+
+def comparar(actual: dict, base: dict, umbral: float) -> list[str]:
+    """
+    Compara medianas caso por caso. Devuelve los casos que empeoraron más que `umbral`.
+    """
+    regresiones = []
+    print(f"\n{'caso':<58} {'base ms':>10} {'actual ms':>10} {'cambio':>8}")
+    for nombre, medicion in actual.items():
+        anterior = base.get(nombre)
+        if anterior is None:
+            print(f"{nombre:<58} {'-':>10} {medicion['mediana_ms']:>10.4f} {'nuevo':>8}")
+            continue
+        cambio = medicion["mediana_ms"] / anterior["mediana_ms"] - 1
+        marca = "  <-- regresión" if cambio > umbral else ""
+        print(f"{nombre:<58} {anterior['mediana_ms']:>10.4f} {medicion['mediana_ms']:>10.4f} {cambio:>+7.1%}{marca}")
+        if cambio > umbral:
+            regresiones.append(nombre)
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del motor de cotización y de la API")
+    parser.add_argument("--salida", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--base", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION,
+                        help="empeoramiento relativo de la mediana que cuenta como regresión (0.10 = 10%%)")
+    parser.add_argument("--solo", choices=("micro", "endpoints"), help="correr sólo un grupo")
+    parser.add_argument("--rapido", action="store_true", help="menos repeticiones (para probar la suite)")
+    args = parser.parse_args()
+
+    resultados = {}
+    if args.solo in (None, "micro"):
+        resultados.update(micro(args.rapido))
+    if args.solo in (None, "endpoints"):
+        resultados.update(endpoints(args.rapido))
+
+    for nombre, medicion in resultados.items():
+        print(f"{nombre:<58} mediana {medicion['mediana_ms']:>10.4f} ms | p95 {medicion['p95_ms']:>10.4f} ms")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"entorno": entorno(), "resultados": resultados}, f, indent=2, ensure_ascii=False)
+
+    if args.base:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)["resultados"]
+        regresiones = comparar(resultados, base, args.umbral)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresiones por encima de {args.umbral:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
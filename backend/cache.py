@@ -0,0 +1,162 @@
+# backend/cache.py
+#
+# Caché en memoria (LRU + TTL) delante de logic.calcular_cotizacion.
+# La clave es un hash de los campos financieros de CotizacionInput:
+# cliente_id / inmueble_id no cambian el cálculo y no forman parte de la clave.
+#
+# El cronograma se guarda en el formato binario de cronograma_codec (pocos KB
+# en vez de cientos de dicts) y se vuelve a armar como lista en cada acierto.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cronograma_codec
+import logic
+from schemas import CotizacionInput
+
+# ============================================================
+# Configuración (variables de entorno)
+# ============================================================
+
+CACHE_HABILITADO = os.getenv("COTIZACION_CACHE_HABILITADO", "1").lower() not in ("0", "false", "no")
+CACHE_MAX_ENTRADAS = int(os.getenv("COTIZACION_CACHE_MAX_ENTRADAS", "1024"))
+CACHE_TTL_SEGUNDOS = float(os.getenv("COTIZACION_CACHE_TTL_SEGUNDOS", "600"))
+
+# Campos que sí intervienen en el cálculo financiero
+CAMPOS_FINANCIEROS = (
+    "precio_final_inmueble",
+    "porcentaje_cuota_inicial",
+    "monto_bono_buen_pagador",
+    "tipo_tasa",
+    "valor_tasa",
+    "capitalizacion",
+    "plazo_anios",
+    "tramos_tasa",
+    "tipo_periodo_gracia",
+    "meses_gracia",
+    "seguro_desgravamen_porc",
+    "seguro_riesgo_porc",
+    "gastos_administrativos",
+)
+
+
+def clave_cotizacion(datos: CotizacionInput) -> str:
+    """
+    Hash canónico de los campos financieros. Los números se normalizan a float
+    para que 10 y 10.0 generen la misma clave.
+    """
+    canonico = {}
+    for campo in CAMPOS_FINANCIEROS:
+        valor = getattr(datos, campo)
+        if campo == "tramos_tasa":
+            valor = sorted(
+                (t.desde_mes, t.tipo_tasa, float(t.valor_tasa), float(t.capitalizacion)) for t in valor
+            ) if valor else None
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            valor = float(valor)
+        canonico[campo] = valor
+    serializado = json.dumps(canonico, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(serializado.encode("utf-8")).hexdigest()
+
+
+# ============================================================
+# Caché LRU con expiración
+# ============================================================
+
+class CacheCotizaciones:
+    """
+    Caché acotada (LRU) con TTL por entrada y contadores de uso.
+    Es segura entre hilos: los endpoints sync corren en el threadpool.
+
+    Cada entrada guarda las métricas y el cronograma codificado; obtener()
+    devuelve un resultado nuevo (con el cronograma como lista de dicts).
+    """
+
+    def __init__(self, max_entradas: int = CACHE_MAX_ENTRADAS, ttl_segundos: float = CACHE_TTL_SEGUNDOS,
+                 habilitado: bool = CACHE_HABILITADO):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self.habilitado = habilitado
+        self._entradas = OrderedDict()   # clave -> (expira_en, métricas, cronograma_bin)
+        self._bytes = 0                  # tamaño de los cronogramas guardados
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.expiraciones = 0
+
+    def obtener(self, clave: str):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            expira_en, metricas, cronograma_bin = entrada
+            if expira_en <= time.monotonic():
+                del self._entradas[clave]
+                self._bytes -= len(cronograma_bin)
+                self.expiraciones += 1
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+        # Fuera del lock: armar el cronograma no bloquea a los demás hilos
+        return dict(metricas, cronograma=cronograma_codec.decodificar_cronograma(cronograma_bin))
+
+    def guardar(self, clave: str, resultado: dict):
+        metricas = {k: v for k, v in resultado.items() if k != "cronograma"}
+        cronograma_bin = cronograma_codec.codificar_cronograma(resultado["cronograma"])
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior[2])
+            self._entradas[clave] = (time.monotonic() + self.ttl_segundos, metricas, cronograma_bin)
+            self._bytes += len(cronograma_bin)
+            while len(self._entradas) > self.max_entradas:
+                _, (_, _, desalojado) = self._entradas.popitem(last=False)
+                self._bytes -= len(desalojado)
+                self.desalojos += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def calcular(self, datos: CotizacionInput) -> dict:
+        """
+        Igual que logic.calcular_cotizacion, pero reutiliza resultados recientes.
+        Los errores de cálculo no se guardan.
+        """
+        if not self.habilitado or self.max_entradas <= 0:
+            return logic.calcular_cotizacion(datos)
+
+        clave = clave_cotizacion(datos)
+        resultado = self.obtener(clave)
+        if resultado is None:
+            resultado = logic.calcular_cotizacion(datos)
+            self.guardar(clave, resultado)
+        return resultado
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "habilitado": self.habilitado,
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "bytes_cronogramas": self._bytes,
+                "ttl_segundos": self.ttl_segundos,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "expiraciones": self.expiraciones,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+            }
+
+
+# Instancia única usada por la API
+cache_cotizaciones = CacheCotizaciones()
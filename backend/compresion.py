@@ -0,0 +1,94 @@
+# backend/compresion.py
+#
+# Compresión de respuestas: brotli si el cliente lo acepta y el paquete
+# `brotli` está instalado; si no, gzip (GZipMiddleware de Starlette).
+# Sólo se comprimen cuerpos de al menos COMPRESION_MINIMO_BYTES.
+
+import os
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él sólo se usa gzip
+    brotli = None
+
+COMPRESION_MINIMO_BYTES = int(os.getenv("COMPRESION_MINIMO_BYTES", "1000"))
+NIVEL_GZIP = int(os.getenv("COMPRESION_NIVEL_GZIP", "6"))
+CALIDAD_BROTLI = int(os.getenv("COMPRESION_CALIDAD_BROTLI", "5"))
+
+
+class CompresionMiddleware:
+    def __init__(self, app, minimo: int = COMPRESION_MINIMO_BYTES):
+        self.app = app
+        self.minimo = minimo
+        self.gzip = GZipMiddleware(app, minimum_size=minimo, compresslevel=NIVEL_GZIP)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and brotli is not None:
+            aceptadas = Headers(scope=scope).get("accept-encoding", "")
+            if "br" in aceptadas:
+                await _RespuestaBrotli(self.app, self.minimo)(scope, receive, send)
+                return
+        await self.gzip(scope, receive, send)
+
+
+class _RespuestaBrotli:
+    """
+    Comprime con brotli. Igual que GZipMiddleware: los cuerpos de un solo
+    bloque menores que `minimo` pasan sin comprimir y los que llegan en varios
+    bloques (streaming) se comprimen bloque a bloque.
+    """
+
+    def __init__(self, app, minimo: int):
+        self.app = app
+        self.minimo = minimo
+        self.inicio = None
+        self.compresor = None
+        self.decidido = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self._enviar)
+
+    async def _enviar(self, mensaje):
+        if mensaje["type"] == "http.response.start":
+            # Se retiene hasta ver el primer bloque del cuerpo
+            self.inicio = mensaje
+            return
+        if mensaje["type"] != "http.response.body":
+            await self.send(mensaje)
+            return
+
+        cuerpo = mensaje.get("body", b"")
+        mas = mensaje.get("more_body", False)
+
+        if not self.decidido:
+            self.decidido = True
+            headers = MutableHeaders(raw=self.inicio["headers"])
+            if "content-encoding" in headers or (not mas and len(cuerpo) < self.minimo):
+                await self.send(self.inicio)
+                await self.send(mensaje)
+                return
+            self.compresor = brotli.Compressor(quality=CALIDAD_BROTLI)
+            headers["Content-Encoding"] = "br"
+            headers.add_vary_header("Accept-Encoding")
+            if mas:
+                del headers["Content-Length"]
+            else:
+                cuerpo = self.compresor.process(cuerpo) + self.compresor.finish()
+                headers["Content-Length"] = str(len(cuerpo))
+                await self.send(self.inicio)
+                await self.send(dict(mensaje, body=cuerpo))
+                return
+            await self.send(self.inicio)
+
+        if self.compresor is None:
+            await self.send(mensaje)
+            return
+        if mas:
+            cuerpo = self.compresor.process(cuerpo) + self.compresor.flush()
+        else:
+            cuerpo = self.compresor.process(cuerpo) + self.compresor.finish()
+        await self.send(dict(mensaje, body=cuerpo))
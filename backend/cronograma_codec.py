@@ -0,0 +1,103 @@
+# backend/cronograma_codec.py
+#
+# Codificación binaria y columnar del cronograma de una cotización.
+# Reemplaza al JSON de 360 dicts con claves repetidas (~60 KB) por un blob
+# versionado de pocos KB.
+#
+# Formato v1 (little endian):
+#   cabecera  "<4sBBHH": b"CRON", versión, flags, filas, columnas
+#   cuerpo    una columna tras otra (COLUMNAS_CRONOGRAMA sin "n"), en
+#             céntimos enteros (int32 o int64 según flags); opcionalmente zlib.
+# La columna "n" no se guarda: es siempre 1..filas.
+
+import struct
+import zlib
+
+import numpy as np
+
+from logic import COLUMNAS_CRONOGRAMA
+
+MAGIA = b"CRON"
+VERSION = 1
+CABECERA = struct.Struct("<4sBBHH")
+
+FLAG_ZLIB = 0x01
+FLAG_INT64 = 0x02
+
+COLUMNAS_GUARDADAS = COLUMNAS_CRONOGRAMA[1:]
+
+
+class CronogramaCodecError(ValueError):
+    """El blob no es un cronograma válido o su versión no es soportada."""
+
+
+def _a_centimos(columnas: dict) -> np.ndarray:
+    valores = np.vstack([np.asarray(columnas[c], dtype=np.float64) for c in COLUMNAS_GUARDADAS])
+    return np.rint(valores * 100).astype(np.int64)
+
+
+def codificar_columnas(columnas: dict, comprimir: bool = True) -> bytes:
+    """
+    Codifica columnas (arrays de montos, ya redondeados a 2 decimales).
+    """
+    centimos = _a_centimos(columnas)
+    filas = centimos.shape[1]
+
+    flags = 0
+    if centimos.size and np.abs(centimos).max() > np.iinfo(np.int32).max:
+        flags |= FLAG_INT64
+        cuerpo = centimos.astype("<i8").tobytes()
+    else:
+        cuerpo = centimos.astype("<i4").tobytes()
+
+    if comprimir:
+        flags |= FLAG_ZLIB
+        cuerpo = zlib.compress(cuerpo, 6)
+
+    return CABECERA.pack(MAGIA, VERSION, flags, filas, len(COLUMNAS_GUARDADAS)) + cuerpo
+
+
+def codificar_cronograma(cronograma: list, comprimir: bool = True) -> bytes:
+    """
+    Codifica el cronograma en el formato de lista de dicts de logic.calcular_cotizacion.
+    """
+    columnas = {c: [fila[c] for fila in cronograma] for c in COLUMNAS_GUARDADAS}
+    return codificar_columnas(columnas, comprimir=comprimir)
+
+
+def decodificar_columnas(blob: bytes) -> dict:
+    """
+    Devuelve las columnas del cronograma como arrays (montos en float64, "n" en int).
+    """
+    if len(blob) < CABECERA.size:
+        raise CronogramaCodecError("Blob de cronograma truncado")
+
+    magia, version, flags, filas, n_columnas = CABECERA.unpack_from(blob)
+    if magia != MAGIA:
+        raise CronogramaCodecError("El blob no es un cronograma")
+    if version != VERSION or n_columnas != len(COLUMNAS_GUARDADAS):
+        raise CronogramaCodecError(f"Versión de cronograma no soportada: {version}")
+
+    cuerpo = blob[CABECERA.size:]
+    if flags & FLAG_ZLIB:
+        cuerpo = zlib.decompress(cuerpo)
+
+    tipo = "<i8" if flags & FLAG_INT64 else "<i4"
+    centimos = np.frombuffer(cuerpo, dtype=tipo)
+    if centimos.size != filas * n_columnas:
+        raise CronogramaCodecError("Blob de cronograma truncado")
+    montos = centimos.reshape(n_columnas, filas) / 100.0
+
+    columnas = {"n": np.arange(1, filas + 1)}
+    for c, valores in zip(COLUMNAS_GUARDADAS, montos):
+        columnas[c] = valores
+    return columnas
+
+
+def decodificar_cronograma(blob: bytes) -> list:
+    """
+    Devuelve el cronograma como lista de dicts (mismo formato que antes en cronograma_json).
+    """
+    columnas = decodificar_columnas(blob)
+    valores = [columnas[c].tolist() for c in COLUMNAS_CRONOGRAMA]
+    return [dict(zip(COLUMNAS_CRONOGRAMA, fila)) for fila in zip(*valores)]
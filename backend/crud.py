@@ -1,8 +1,15 @@
+import json
+import os
 from sqlalchemy.orm import Session
 from auth_utils import get_password_hash
+import cronograma_codec
 import models               # <-- necesario para referenciar modelos
 import schemas              # <-- necesario si usas anotaciones/objetos Pydantic
 
+# Si es "0", las cotizaciones no guardan el cronograma: se regenera desde sus
+# parámetros cuando se pide (ver logic.cronograma_cotizacion_guardada)
+GUARDAR_CRONOGRAMA = os.getenv("COTIZACION_GUARDAR_CRONOGRAMA", "1").lower() not in ("0", "false", "no")
+
 
 # ============================================================
 # 1. USUARIOS (Registro / Login)
@@ -45,7 +52,7 @@ def create_user(db: Session, user):
 # ============================================================
 
 def create_cliente(db: Session, cliente: schemas.ClienteCreate):
-    db_cliente = models.Cliente(**cliente.dict())
+    db_cliente = models.Cliente(**cliente.model_dump())
     db.add(db_cliente)
     db.commit()
     db.refresh(db_cliente)
@@ -63,7 +70,7 @@ def get_clientes(db: Session, skip: int = 0, limit: int = 100):
 def update_cliente(db: Session, cliente_id: int, cliente_update: schemas.ClienteCreate):
     db_cliente = db.query(models.Cliente).filter(models.Cliente.id == cliente_id).first()
     if db_cliente:
-        for key, value in cliente_update.dict().items():
+        for key, value in cliente_update.model_dump().items():
             setattr(db_cliente, key, value)
         db.commit()
         db.refresh(db_cliente)
@@ -75,7 +82,7 @@ def update_cliente(db: Session, cliente_id: int, cliente_update: schemas.Cliente
 # ============================================================
 
 def create_inmueble(db: Session, inmueble: schemas.InmuebleCreate):
-    db_inmueble = models.Inmueble(**inmueble.dict())
+    db_inmueble = models.Inmueble(**inmueble.model_dump())
     db.add(db_inmueble)
     db.commit()
     db.refresh(db_inmueble)
@@ -89,7 +96,7 @@ def get_inmuebles(db: Session, skip: int = 0, limit: int = 100):
 def update_inmueble(db: Session, inmueble_id: int, inmueble_update: schemas.InmuebleCreate):
     db_inmueble = db.query(models.Inmueble).filter(models.Inmueble.id == inmueble_id).first()
     if db_inmueble:
-        for key, value in inmueble_update.dict().items():
+        for key, value in inmueble_update.model_dump().items():
             setattr(db_inmueble, key, value)
         db.commit()
         db.refresh(db_inmueble)
@@ -103,9 +110,13 @@ def update_inmueble(db: Session, inmueble_id: int, inmueble_update: schemas.Inmu
 def get_cuenta_agente_by_email(db: Session, email: str):
     return db.query(models.CuentaAgente).filter(models.CuentaAgente.email == email).first()
 
-def create_cuenta_agente(db: Session, username: str, email: str, plain_password: str):
-    from auth_utils import get_password_hash
-    hashed = get_password_hash(plain_password)
+def create_cuenta_agente(db: Session, username: str, email: str, plain_password: str | None = None,
+                         hashed_password: str | None = None):
+    """
+    Crea la cuenta. Si ya se tiene el hash (p. ej. calculado en el pool de
+    hashing), se pasa en `hashed_password` y no se vuelve a hashear.
+    """
+    hashed = hashed_password or get_password_hash(plain_password)
     nueva = models.CuentaAgente(
         username=username,
         email=email,
@@ -115,3 +126,46 @@ def create_cuenta_agente(db: Session, username: str, email: str, plain_password:
     db.commit()
     db.refresh(nueva)
     return nueva
+
+
+# ============================================================
+# 5. COTIZACIONES
+# ============================================================
+
+def cotizacion_valores(datos: schemas.CotizacionInput, resultado: dict, vendedor_id: int) -> dict:
+    """
+    Columnas de una Cotizacion a partir de los datos de entrada
+    y el resultado de logic.calcular_cotizacion.
+    """
+    return dict(
+        vendedor_id=vendedor_id,
+        cliente_id=datos.cliente_id,
+        inmueble_id=datos.inmueble_id,
+        moneda_prestamo=datos.moneda_prestamo,
+        precio_final_inmueble=datos.precio_final_inmueble,
+        porcentaje_cuota_inicial=datos.porcentaje_cuota_inicial,
+        monto_cuota_inicial=datos.precio_final_inmueble * (datos.porcentaje_cuota_inicial / 100),
+        monto_bono_buen_pagador=datos.monto_bono_buen_pagador,
+        monto_prestamo=resultado["monto_prestamo"],
+        tipo_tasa=datos.tipo_tasa,
+        valor_tasa=datos.valor_tasa,
+        capitalizacion=datos.capitalizacion,
+        plazo_meses=datos.plazo_anios * 12,
+        tramos_tasa=(
+            json.dumps([t.model_dump() for t in datos.tramos_tasa]) if datos.tramos_tasa else None
+        ),
+        tipo_periodo_gracia=datos.tipo_periodo_gracia,
+        meses_gracia=datos.meses_gracia,
+        seguro_desgravamen_porc=datos.seguro_desgravamen_porc,
+        seguro_riesgo_porc=datos.seguro_riesgo_porc,
+        gastos_administrativos=datos.gastos_administrativos,
+        tcea=resultado["tcea"],
+        van=resultado["van"],
+        tir=resultado["tir"],
+        cuota_mensual_referencial=resultado["cuota_mensual_referencial"],
+        # cronograma en formato binario columnar (o nada: se regenera al leerlo)
+        cronograma_bin=(
+            cronograma_codec.codificar_cronograma(resultado["cronograma"])
+            if GUARDAR_CRONOGRAMA else None
+        ),
+    )
@@ -0,0 +1,303 @@
+# backend/crud_async.py
+#
+# Versiones async (AsyncSession) de las funciones de crud.py, usadas por la API.
+# crud.py se mantiene para scripts y tareas que usan la sesión sync.
+
+from datetime import date, datetime, time
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+
+import analitica
+import models
+import proyeccion
+import schemas
+
+
+# ============================================================
+# 1. USUARIOS (Registro / Login)
+# ============================================================
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.Usuario).where(models.Usuario.email == email))
+
+
+async def create_user(db: AsyncSession, username: str, email: str, hashed_password: str):
+    nuevo = models.Usuario(
+        username=username,
+        email=email,
+        password=hashed_password,
+    )
+    db.add(nuevo)
+    await db.commit()
+    return nuevo
+
+
+# ============================================================
+# 2. CLIENTES
+# ============================================================
+
+async def create_cliente(db: AsyncSession, cliente: schemas.ClienteCreate):
+    db_cliente = models.Cliente(**cliente.model_dump())
+    db.add(db_cliente)
+    await db.commit()
+    await db.refresh(db_cliente)
+    return db_cliente
+
+
+def filtros_cliente(calificacion_sentinel=None, ingreso_min=None, ingreso_max=None) -> list:
+    condiciones = []
+    if calificacion_sentinel is not None:
+        condiciones.append(models.Cliente.calificacion_sentinel == calificacion_sentinel)
+    if ingreso_min is not None:
+        condiciones.append(models.Cliente.ingreso_mensual >= ingreso_min)
+    if ingreso_max is not None:
+        condiciones.append(models.Cliente.ingreso_mensual <= ingreso_max)
+    return condiciones
+
+
+async def get_clientes(db: AsyncSession, skip: int = 0, limit: int = 100,
+                       despues_de: int | None = None, condiciones=()):
+    return await _listar(db, models.Cliente, skip, limit, despues_de, condiciones)
+
+
+async def get_clientes_columnas(db: AsyncSession, condiciones=()):
+    """Filas livianas (sin objetos ORM) para evaluar muchos clientes a la vez"""
+    C = models.Cliente
+    return (await db.execute(
+        select(C.id, C.nombres, C.apellidos, C.calificacion_sentinel, C.ingreso_mensual)
+        .where(*condiciones, C.ingreso_mensual > 0)
+        .order_by(C.id)
+    )).all()
+
+
+async def update_cliente(db: AsyncSession, cliente_id: int, cliente_update: schemas.ClienteCreate):
+    db_cliente = await db.get(models.Cliente, cliente_id)
+    if db_cliente:
+        for key, value in cliente_update.model_dump().items():
+            setattr(db_cliente, key, value)
+        await db.commit()
+        await db.refresh(db_cliente)
+    return db_cliente
+
+
+# ============================================================
+# 3. INMUEBLES
+# ============================================================
+
+async def create_inmueble(db: AsyncSession, inmueble: schemas.InmuebleCreate):
+    db_inmueble = models.Inmueble(**inmueble.model_dump())
+    db.add(db_inmueble)
+    await db.commit()
+    await db.refresh(db_inmueble)
+    return db_inmueble
+
+
+def filtros_inmueble(estado=None, moneda_venta=None, codigo_proyecto=None,
+                     precio_min=None, precio_max=None) -> list:
+    condiciones = []
+    if estado is not None:
+        condiciones.append(models.Inmueble.estado == estado)
+    if moneda_venta is not None:
+        condiciones.append(models.Inmueble.moneda_venta == moneda_venta)
+    if codigo_proyecto is not None:
+        condiciones.append(models.Inmueble.codigo_proyecto == codigo_proyecto)
+    if precio_min is not None:
+        condiciones.append(models.Inmueble.precio_venta >= precio_min)
+    if precio_max is not None:
+        condiciones.append(models.Inmueble.precio_venta <= precio_max)
+    return condiciones
+
+
+async def get_inmuebles(db: AsyncSession, skip: int = 0, limit: int = 100,
+                        despues_de: int | None = None, condiciones=()):
+    return await _listar(db, models.Inmueble, skip, limit, despues_de, condiciones)
+
+
+async def get_ids_inmuebles(db: AsyncSession, condiciones=()) -> list[int]:
+    return list((await db.scalars(select(models.Inmueble.id).where(*condiciones))).all())
+
+
+async def get_inmuebles_columnas(db: AsyncSession, condiciones=()):
+    """Filas livianas (sin objetos ORM) para evaluar muchos inmuebles a la vez"""
+    I = models.Inmueble
+    return (await db.execute(
+        select(I.id, I.codigo_proyecto, I.direccion, I.tipo, I.area_m2, I.precio_venta)
+        .where(*condiciones, I.precio_venta.is_not(None))
+        .order_by(I.id)
+    )).all()
+
+
+# ============================================================
+# Listados paginados
+# ============================================================
+
+# Tope del conteo con filtros: más allá de esto el total es "al menos N"
+MAX_CONTEO_EXACTO = 10000
+
+
+async def _listar(db: AsyncSession, modelo, skip, limit, despues_de, condiciones):
+    """
+    Con `despues_de` pagina por cursor (id > cursor, índice sobre id): el costo
+    no crece con la profundidad de la página. `skip` se mantiene por compatibilidad.
+    """
+    stmt = select(modelo).where(*condiciones).order_by(modelo.id).limit(limit)
+    if despues_de is not None:
+        stmt = stmt.where(modelo.id > despues_de)
+    elif skip:
+        stmt = stmt.offset(skip)
+    return (await db.scalars(stmt)).all()
+
+
+async def contar_aproximado(db: AsyncSession, modelo, condiciones=()) -> int:
+    """
+    Total aproximado y barato de filas:
+    - sin filtros: estadística del planner en PostgreSQL, max(id) en SQLite
+    - con filtros: conteo exacto acotado a MAX_CONTEO_EXACTO
+    """
+    if condiciones:
+        muestra = select(modelo.id).where(*condiciones).limit(MAX_CONTEO_EXACTO).subquery()
+        return await db.scalar(select(func.count()).select_from(muestra))
+
+    if db.bind.dialect.name == "postgresql":
+        estimado = await db.scalar(
+            text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:tabla)"),
+            {"tabla": modelo.__tablename__},
+        )
+        # -1 si la tabla nunca fue analizada
+        if estimado is not None and estimado >= 0:
+            return int(estimado)
+
+    return await db.scalar(select(func.max(modelo.id))) or 0
+
+
+# ============================================================
+# 4. CUENTAS AGENTE
+# ============================================================
+
+async def get_cuenta_agente_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.CuentaAgente).where(models.CuentaAgente.email == email))
+
+
+async def create_cuenta_agente(db: AsyncSession, username: str, email: str, hashed_password: str):
+    nueva = models.CuentaAgente(
+        username=username,
+        email=email,
+        password=hashed_password
+    )
+    db.add(nueva)
+    await db.commit()
+    await db.refresh(nueva)
+    return nueva
+
+
+# ============================================================
+# 5. COTIZACIONES
+# ============================================================
+
+async def get_ids_existentes(db: AsyncSession, modelo, ids) -> set:
+    """
+    Devuelve cuáles de los `ids` existen en la tabla de `modelo` (una sola consulta).
+    """
+    ids = set(ids)
+    if not ids:
+        return set()
+    return set((await db.scalars(select(modelo.id).where(modelo.id.in_(ids)))).all())
+
+
+async def create_cotizacion(db: AsyncSession, valores: dict):
+    """
+    Guarda una cotización (valores de crud.cotizacion_valores). Con
+    expire_on_commit=False el objeto conserva id y fecha sin refrescarlo.
+    """
+    valores = dict(valores)
+    await db.run_sync(analitica.actualizar_resumen, [valores])
+    nueva = models.Cotizacion(**valores)
+    db.add(nueva)
+    await db.commit()
+    proyeccion.registrar([dict(valores, id=nueva.id, fecha_cotizacion=nueva.fecha_cotizacion)])
+    return nueva
+
+
+async def create_cotizaciones(db: AsyncSession, filas: list[dict]):
+    """
+    Inserta varias cotizaciones con un solo INSERT ... RETURNING y un commit.
+    Devuelve (id, fecha_cotizacion) de cada fila, en el mismo orden.
+    """
+    if not filas:
+        return []
+    filas = [dict(f) for f in filas]
+    await db.run_sync(analitica.actualizar_resumen, filas)
+    stmt = insert(models.Cotizacion).returning(
+        models.Cotizacion.id,
+        models.Cotizacion.fecha_cotizacion,
+        sort_by_parameter_order=True,
+    )
+    creadas = (await db.execute(stmt, filas)).all()
+    await db.commit()
+    proyeccion.registrar([dict(f, id=id_, fecha_cotizacion=fecha) for f, (id_, fecha) in zip(filas, creadas)])
+    return creadas
+
+
+async def get_cotizacion(db: AsyncSession, cotizacion_id: int):
+    return await db.get(models.Cotizacion, cotizacion_id)
+
+
+def filtros_cotizacion(vendedor_id=None, cliente_id=None, inmueble_id=None,
+                       fecha_desde: date | None = None, fecha_hasta: date | None = None) -> list:
+    condiciones = []
+    if vendedor_id is not None:
+        condiciones.append(models.Cotizacion.vendedor_id == vendedor_id)
+    if cliente_id is not None:
+        condiciones.append(models.Cotizacion.cliente_id == cliente_id)
+    if inmueble_id is not None:
+        condiciones.append(models.Cotizacion.inmueble_id == inmueble_id)
+    if fecha_desde is not None:
+        condiciones.append(models.Cotizacion.fecha_cotizacion >= datetime.combine(fecha_desde, time.min))
+    if fecha_hasta is not None:
+        condiciones.append(models.Cotizacion.fecha_cotizacion <= datetime.combine(fecha_hasta, time.max))
+    return condiciones
+
+
+async def get_cotizaciones_resumen(db: AsyncSession, limit: int = 100,
+                                   antes_de: int | None = None, condiciones=()):
+    """
+    Resumen de cotizaciones, de la más reciente a la más antigua (cursor por id).
+    Sólo lee columnas escalares (nunca el cronograma) y trae los nombres de
+    vendedor, cliente e inmueble en la misma consulta con LEFT JOINs.
+    vendedor_id es el id de la CuentaAgente que cotizó (no de un Usuario).
+    """
+    C = models.Cotizacion
+    A = models.CuentaAgente
+    stmt = (
+        select(
+            C.id, C.fecha_cotizacion,
+            C.vendedor_id, C.cliente_id, C.inmueble_id,
+            C.moneda_prestamo, C.precio_final_inmueble, C.monto_prestamo,
+            C.tipo_tasa, C.valor_tasa, C.plazo_meses,
+            C.tcea, C.van, C.tir, C.cuota_mensual_referencial,
+            A.username.label("vendedor"),
+            models.Cliente.nombres.label("cliente_nombres"),
+            models.Cliente.apellidos.label("cliente_apellidos"),
+            models.Inmueble.codigo_proyecto,
+            models.Inmueble.direccion.label("inmueble_direccion"),
+        )
+        .outerjoin(A, A.id == C.vendedor_id)
+        .outerjoin(C.cliente)
+        .outerjoin(C.inmueble)
+        .where(*condiciones)
+        .order_by(C.id.desc())
+        .limit(limit)
+    )
+    if antes_de is not None:
+        stmt = stmt.where(C.id < antes_de)
+    return (await db.execute(stmt)).mappings().all()
+
+
+# ============================================================
+# Pruebas de estrés
+# ============================================================
+
+async def get_prueba_estres(db: AsyncSession, prueba_id: int):
+    return await db.get(models.PruebaEstres, prueba_id, options=[undefer(models.PruebaEstres.resultados)])
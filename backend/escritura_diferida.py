@@ -0,0 +1,377 @@
+# backend/escritura_diferida.py
+#
+# Escritura diferida (write-behind) de cotizaciones. Con el modo activo,
+# /api/cotizar responde apenas termina el cálculo con un ID ya reservado y
+# un escritor en segundo plano guarda las filas pendientes en lotes (un
+# INSERT y un commit por lote).
+#
+# - La cola es acotada: si se llena, los requests esperan (backpressure).
+# - Al apagar la app se vacía la cola antes de cerrar el engine.
+# - Los IDs salen de la secuencia en PostgreSQL; en SQLite de la tabla
+#   secuencias_id, reservados con un UPSERT atómico: sirve con varios
+#   procesos de la API.
+# - Una fila que sigue fallando tras los reintentos no se pierde (el cliente
+#   ya tiene su ID): se agrega a ARCHIVO_FALLIDAS, se sigue pudiendo leer con
+#   pendiente() y se vuelve a intentar al arrancar la app. Cada proceso toma
+#   el archivo con flock y lo renombra a uno propio; los que quedaron de un
+#   proceso que murió a mitad del reintento se toman en el próximo arranque.
+
+import asyncio
+import base64
+import glob
+import json
+import logging
+import os
+import secrets
+import time
+from contextlib import suppress
+from datetime import datetime
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import analitica
+import models
+import proyeccion
+from database import AsyncSessionLocal
+from pool_hashing import MetricaLatencia
+
+try:
+    import fcntl
+except ImportError:  # Windows: sólo el rename atómico decide qué proceso toma el archivo
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# Configuración (variables de entorno)
+# ============================================================
+
+ESCRITURA_DIFERIDA = os.getenv("COTIZACION_ESCRITURA_DIFERIDA", "0").lower() in ("1", "true", "si", "yes")
+COLA_MAX = int(os.getenv("COTIZACION_COLA_MAX", "1000"))
+LOTE_MAX = int(os.getenv("COTIZACION_LOTE_MAX", "200"))
+
+# Espera máxima para juntar más filas antes de escribir un lote
+ESPERA_LOTE_SEGUNDOS = float(os.getenv("COTIZACION_ESPERA_LOTE_SEGUNDOS", "0.01"))
+
+# Reintentos de un lote fallido antes de probar fila por fila
+REINTENTOS = 3
+
+# Filas que no se pudieron guardar (JSON por línea)
+ARCHIVO_FALLIDAS = os.getenv("COTIZACION_ARCHIVO_FALLIDAS", "cotizaciones_fallidas.jsonl")
+
+# Reserva `n` IDs: el próximo libre es el mayor entre lo ya reservado y
+# MAX(id) + 1 (por si se insertó sin reservar). El bloqueo de escritura de
+# SQLite hace atómica la sentencia entre procesos.
+SQL_RESERVAR_IDS = text(
+    "INSERT INTO secuencias_id (tabla, siguiente) "
+    "VALUES ('cotizaciones', (SELECT COALESCE(MAX(id), 0) + 1 FROM cotizaciones) + :n) "
+    "ON CONFLICT (tabla) DO UPDATE SET siguiente = "
+    "MAX(siguiente, (SELECT COALESCE(MAX(id), 0) + 1 FROM cotizaciones)) + :n "
+    "RETURNING siguiente"
+)
+
+
+class AsignadorIds:
+    """
+    Reserva IDs de cotización antes del INSERT.
+    """
+
+    async def reservar(self, db: AsyncSession, cantidad: int = 1) -> list[int]:
+        if db.bind.dialect.name == "postgresql":
+            return list((await db.scalars(
+                text("SELECT nextval(pg_get_serial_sequence('cotizaciones', 'id')) "
+                     "FROM generate_series(1, :n)"),
+                {"n": cantidad},
+            )).all())
+
+        # Transacción propia y corta: no depende de lo que tenga abierto `db`
+        async with AsyncSessionLocal() as sesion:
+            siguiente = (await sesion.execute(SQL_RESERVAR_IDS, {"n": cantidad})).scalar_one()
+            await sesion.commit()
+        return list(range(siguiente - cantidad, siguiente))
+
+
+def _a_linea(valores: dict, error: str) -> str:
+    fila = dict(valores)
+    fila["fecha_cotizacion"] = fila["fecha_cotizacion"].isoformat()
+    if fila.get("cronograma_bin") is not None:
+        fila["cronograma_bin"] = base64.b64encode(fila["cronograma_bin"]).decode("ascii")
+    return json.dumps({"valores": fila, "error": error}) + "\n"
+
+
+def _de_linea(linea: str) -> dict:
+    valores = json.loads(linea)["valores"]
+    valores["fecha_cotizacion"] = datetime.fromisoformat(valores["fecha_cotizacion"])
+    if valores.get("cronograma_bin") is not None:
+        valores["cronograma_bin"] = base64.b64decode(valores["cronograma_bin"])
+    return valores
+
+
+def _agregar_lineas(ruta: str, lineas: list[str]):
+    with open(ruta, "a", encoding="utf-8") as archivo:
+        archivo.write("".join(lineas))
+        archivo.flush()
+        os.fsync(archivo.fileno())
+
+
+def _tomar_archivo(ruta: str, destino: str):
+    """
+    Toma `ruta` para reintentarla: la bloquea con flock (sin esperar) y la
+    renombra a `destino`. Devuelve el archivo abierto, que mantiene el lock
+    hasta cerrarlo, o None si no existe o la está procesando otro proceso.
+    """
+    if fcntl is None:
+        try:
+            os.replace(ruta, destino)
+        except FileNotFoundError:
+            return None
+        return open(destino, "rb")
+    try:
+        archivo = open(ruta, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        # Entre el open y el lock otro proceso pudo procesarla y dejar otra en su lugar
+        if os.stat(ruta).st_ino != os.fstat(archivo.fileno()).st_ino:
+            raise FileNotFoundError(ruta)
+        os.replace(ruta, destino)
+    except OSError:     # BlockingIOError: la tiene otro proceso
+        archivo.close()
+        return None
+    return archivo
+
+
+def _leer_fallidas(ruta: str) -> list[dict]:
+    if not os.path.exists(ruta):
+        return []
+    with open(ruta, encoding="utf-8") as archivo:
+        return [_de_linea(linea) for linea in archivo if linea.strip()]
+
+
+class EscritorDiferido:
+    def __init__(self, cola_max: int = COLA_MAX, lote_max: int = LOTE_MAX,
+                 archivo_fallidas: str = ARCHIVO_FALLIDAS):
+        self.cola_max = cola_max
+        self.lote_max = lote_max
+        self.archivo_fallidas = archivo_fallidas
+        self.ids = AsignadorIds()
+        self._cola = None
+        self._tarea = None
+        # Filas encoladas y aún no guardadas, por id (para leerlas antes del commit)
+        self._pendientes = {}
+        # Filas que fallaron y esperan el próximo reintento, por id
+        self._fallidas = {}
+
+        self.escritas = 0
+        self.lotes = 0
+        self.errores = 0
+        self.fallidas = 0
+        self.recuperadas = 0
+        self.profundidad_max = 0
+        self.latencia_lote = MetricaLatencia()
+
+    # ------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------
+
+    def iniciar(self):
+        if self._tarea is None or self._tarea.done():
+            self._cola = asyncio.Queue(maxsize=self.cola_max)
+            self._tarea = asyncio.create_task(self._escribir())
+
+    async def detener(self):
+        """
+        Espera a que se guarde todo lo encolado y termina el escritor.
+        """
+        if self._tarea is None or self._tarea.done():
+            return
+        await self._cola.join()
+        self._tarea.cancel()
+        try:
+            await self._tarea
+        except asyncio.CancelledError:
+            pass
+        self._tarea = None
+
+    # ------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------
+
+    async def encolar(self, valores: dict):
+        """
+        `valores` debe traer id y fecha_cotizacion. Si la cola está llena,
+        espera a que el escritor libere espacio.
+        """
+        self.iniciar()
+        self._pendientes[valores["id"]] = valores
+        await self._cola.put(valores)
+        self.profundidad_max = max(self.profundidad_max, self._cola.qsize())
+
+    def pendiente(self, cotizacion_id: int):
+        """Cotización encolada o fallida, todavía no guardada (objeto sin sesión), o None"""
+        valores = self._pendientes.get(cotizacion_id) or self._fallidas.get(cotizacion_id)
+        return models.Cotizacion(**valores) if valores else None
+
+    def metricas(self) -> dict:
+        return {
+            "habilitado": ESCRITURA_DIFERIDA,
+            "en_cola": self._cola.qsize() if self._cola else 0,
+            "cola_max": self.cola_max,
+            "profundidad_max": self.profundidad_max,
+            "escritas": self.escritas,
+            "lotes": self.lotes,
+            "errores": self.errores,
+            # Filas enviadas a archivo_fallidas y las que se recuperaron después
+            "fallidas": self.fallidas,
+            "fallidas_pendientes": len(self._fallidas),
+            "recuperadas": self.recuperadas,
+            "archivo_fallidas": self.archivo_fallidas,
+            "latencia_lote": self.latencia_lote.resumen(),
+        }
+
+    # ------------------------------------------------------------
+    # Escritor
+    # ------------------------------------------------------------
+
+    async def _escribir(self):
+        while True:
+            lote = [await self._cola.get()]
+            # Junta lo que llegue en la ventana, hasta lote_max filas
+            limite = time.monotonic() + ESPERA_LOTE_SEGUNDOS
+            while len(lote) < self.lote_max:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except asyncio.QueueEmpty:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        break
+                    await asyncio.sleep(min(restante, 0.002))
+            try:
+                await self._guardar(lote)
+            finally:
+                for valores in lote:
+                    self._pendientes.pop(valores["id"], None)
+                    self._cola.task_done()
+
+    async def _guardar(self, lote: list[dict]):
+        for intento in range(REINTENTOS):
+            inicio = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.run_sync(analitica.actualizar_resumen, lote)
+                    await db.execute(insert(models.Cotizacion), lote)
+                    await db.commit()
+            except Exception:
+                self.errores += 1
+                logger.exception("Falló el lote de %d cotizaciones (intento %d)", len(lote), intento + 1)
+                await asyncio.sleep(0.05 * 2 ** intento)
+                continue
+            self.latencia_lote.registrar(time.perf_counter() - inicio)
+            self.lotes += 1
+            self.escritas += len(lote)
+            proyeccion.registrar(lote)
+            return
+
+        # El lote sigue fallando: se aíslan las filas con problemas
+        fallidas = []
+        for valores in lote:
+            error = await self._guardar_fila(valores)
+            if error is None:
+                self.escritas += 1
+            else:
+                fallidas.append((valores, error))
+        if fallidas:
+            await self._a_fallidas(fallidas)
+
+    async def _guardar_fila(self, valores: dict) -> str | None:
+        """Guarda una fila sola. Devuelve el error o None si quedó guardada"""
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.run_sync(analitica.actualizar_resumen, [valores])
+                await db.execute(insert(models.Cotizacion), [valores])
+                await db.commit()
+        except Exception as e:
+            logger.exception("No se pudo guardar la cotización %s", valores["id"])
+            # Un reintento que choca con esta misma fila ya guardada (otro proceso) no es error
+            if await self._ya_guardada(valores):
+                return None
+            return repr(e)
+        proyeccion.registrar([valores])
+        return None
+
+    async def _ya_guardada(self, valores: dict) -> bool:
+        try:
+            async with AsyncSessionLocal() as db:
+                guardada = await db.get(models.Cotizacion, valores["id"])
+        except Exception:
+            return False
+        return guardada is not None and guardada.fecha_cotizacion == valores["fecha_cotizacion"]
+
+    async def _a_fallidas(self, fallidas: list):
+        """
+        Guarda las filas en archivo_fallidas y las deja legibles en memoria
+        hasta el próximo reintento.
+        """
+        for valores, _ in fallidas:
+            self._fallidas[valores["id"]] = valores
+        self.fallidas += len(fallidas)
+        try:
+            await asyncio.to_thread(
+                _agregar_lineas, self.archivo_fallidas, [_a_linea(v, e) for v, e in fallidas]
+            )
+        except Exception:
+            logger.critical(
+                "No se pudieron escribir en %s las cotizaciones %s",
+                self.archivo_fallidas, [v["id"] for v, _ in fallidas], exc_info=True,
+            )
+
+    async def reintentar_fallidas(self) -> int:
+        """
+        Vuelve a intentar las filas de archivo_fallidas (al arrancar la app),
+        y antes las de archivos ".procesando" que dejó un proceso que murió.
+        Cada archivo se toma con _tomar_archivo: sólo un proceso procesa cada
+        fila, y lo que falle mientras tanto va a un archivo_fallidas nuevo.
+        Las que vuelven a fallar se agregan de nuevo. Devuelve las recuperadas.
+        """
+        huerfanos = sorted(glob.glob(glob.escape(self.archivo_fallidas) + ".*.procesando"))
+        tomados = []
+        for ruta in huerfanos + [self.archivo_fallidas]:
+            destino = f"{self.archivo_fallidas}.{os.getpid()}-{secrets.token_hex(4)}.procesando"
+            archivo = await asyncio.to_thread(_tomar_archivo, ruta, destino)
+            if archivo is not None:
+                tomados.append((destino, archivo))
+
+        recuperadas, total = 0, 0
+        for destino, archivo in tomados:
+            try:
+                filas = await asyncio.to_thread(_leer_fallidas, destino)
+                total += len(filas)
+                recuperadas += await self._reintentar(filas)
+                with suppress(FileNotFoundError):
+                    os.remove(destino)
+            finally:
+                archivo.close()
+
+        self.recuperadas += recuperadas
+        if total:
+            logger.warning("Cotizaciones fallidas recuperadas: %d de %d", recuperadas, total)
+        return recuperadas
+
+    async def _reintentar(self, filas: list[dict]) -> int:
+        recuperadas, fallidas = 0, []
+        for valores in filas:
+            error = await self._guardar_fila(valores)
+            if error is None:
+                recuperadas += 1
+                self._fallidas.pop(valores["id"], None)
+            else:
+                fallidas.append((valores, error))
+        if fallidas:
+            await self._a_fallidas(fallidas)
+            self.fallidas -= len(fallidas)   # ya estaban contadas
+        return recuperadas
+
+
+escritor_diferido = EscritorDiferido()
@@ -0,0 +1,533 @@
+# backend/estres.py
+#
+# Prueba de estrés de tasas (Monte Carlo) sobre las cotizaciones guardadas.
+#
+# Cada camino simulado es una trayectoria de la TEA del mercado: un shock
+# anual normal (deriva, volatilidad) acumulado. Los caminos se generan una
+# sola vez con la semilla y son los mismos para toda la cartera. Cada
+# préstamo mantiene su tasa pactada los primeros `meses_fijos` meses (y todo
+# el periodo de gracia) y luego reprecia cada 12 meses a su TEA pactada más el
+# shock acumulado, recalculando la cuota sobre el saldo y el plazo restantes.
+# Con tasa por tramos, lo pactado es el cronograma de sus tramos y la TEA de
+# cada reprecio es la del tramo vigente al empezar ese año.
+#
+# Por préstamo y camino se obtienen la cuota máxima (vs. la referencial), la
+# TCEA del flujo completo y la relación cuota / ingreso del cliente. El
+# trabajo se reparte por bloques de cartera en un pool de procesos; cada
+# bloque devuelve histogramas de ancho fijo por proyecto y por vendedor, así
+# la memoria no depende del tamaño de la cartera ni de las simulaciones.
+#
+# El pool es uno solo por proceso de la API y se crea con la primera prueba;
+# ESTRES_CORRIDAS_SIMULTANEAS acota las pruebas que lo comparten (la API
+# responde 429 cuando no hay lugar).
+#
+# Uso (desde backend/):
+#   python estres.py --simulaciones 2000 --semilla 7
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from sqlalchemy import select, update
+
+import logic
+import models
+import tcea as solver_tcea
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# Configuración (variables de entorno)
+# ============================================================
+
+# Procesos del pool (0 = en el mismo proceso)
+ESTRES_PROCESOS = int(os.getenv("ESTRES_PROCESOS", str(os.cpu_count() or 1)))
+
+# Pruebas que pueden correr a la vez en un proceso de la API
+ESTRES_CORRIDAS_SIMULTANEAS = int(os.getenv("ESTRES_CORRIDAS_SIMULTANEAS", "1"))
+
+# Préstamo x camino por bloque: acota la matriz de flujos de cada tarea
+ESTRES_FILAS_POR_BLOQUE = int(os.getenv("ESTRES_FILAS_POR_BLOQUE", "4000"))
+
+MAX_SIMULACIONES = 10000
+
+# Tolerancia de la TIR: suficiente para TCEA con 4 decimales
+TOLERANCIA_TIR_ESTRES = 1e-9
+
+# Histogramas de ancho fijo: (mínimo, máximo, ancho del bin), en %
+METRICAS = {
+    "variacion_cuota": (-100.0, 400.0, 0.1),
+    "tcea": (0.0, 60.0, 0.01),
+    "cuota_ingreso": (0.0, 400.0, 0.1),
+}
+PERCENTILES = (5, 50, 95, 99)
+
+# Dimensiones de agregación
+DIMENSIONES = ("cartera", "proyecto", "vendedor")
+
+
+# ============================================================
+# Cartera
+# ============================================================
+
+def cargar_cartera(db) -> dict:
+    """
+    Parámetros de todas las cotizaciones como arrays (una posición por
+    cotización). "tasas" tiene, por cotización, sus tasas por tramo
+    (logic.tasas_por_tramo) o None si tiene tasa única.
+    """
+    C = models.Cotizacion
+    filas = db.execute(
+        select(
+            C.id, C.monto_prestamo, C.tipo_tasa, C.valor_tasa, C.capitalizacion, C.plazo_meses,
+            C.tipo_periodo_gracia, C.meses_gracia, C.seguro_desgravamen_porc, C.seguro_riesgo_porc,
+            C.precio_final_inmueble, C.gastos_administrativos, C.cuota_mensual_referencial,
+            C.vendedor_id, models.Inmueble.codigo_proyecto, models.Cliente.ingreso_mensual, C.tramos_tasa,
+        )
+        .outerjoin(models.Inmueble, C.inmueble_id == models.Inmueble.id)
+        .outerjoin(models.Cliente, C.cliente_id == models.Cliente.id)
+        .where(C.plazo_meses > 0, C.monto_prestamo > 0)
+        .order_by(C.id)
+    ).all()
+
+    def columna(i, tipo=np.float64, defecto=0.0):
+        return np.array([f[i] if f[i] is not None else defecto for f in filas], dtype=tipo)
+
+    return {
+        "monto_prestamo": columna(1),
+        "tem": np.array(
+            [logic.tasa_efectiva_mensual(f.tipo_tasa, f.valor_tasa, f.capitalizacion or 30) for f in filas],
+            dtype=np.float64,
+        ),
+        "tasas": [
+            logic.tasas_por_tramo(
+                f.tipo_tasa, f.valor_tasa, f.capitalizacion or 30, json.loads(f.tramos_tasa), f.plazo_meses,
+            ) if f.tramos_tasa else None
+            for f in filas
+        ],
+        "total_cuotas": columna(5, np.int64, 0),
+        "tipo_gracia": np.array([logic.codigo_gracia(f.tipo_periodo_gracia) for f in filas], dtype=np.int64),
+        "meses_gracia": columna(7, np.int64, 0),
+        "seguro_desgravamen_porc": columna(8),
+        "seguro_riesgo_mensual": columna(10) * columna(9) / 12 / 100.0,  # Anual a mensual
+        "gastos": columna(11),
+        "cuota_referencial": columna(12),
+        "ingreso_mensual": columna(15, np.float64, np.nan),
+        "proyecto": [f.codigo_proyecto or "" for f in filas],
+        "vendedor": [str(f.vendedor_id) if f.vendedor_id is not None else "" for f in filas],
+    }
+
+
+def generar_caminos(simulaciones: int, anios: int, semilla: int, deriva: float, volatilidad: float) -> np.ndarray:
+    """
+    Shock acumulado de la TEA (puntos porcentuales) por camino y año de
+    reprecio: (simulaciones x anios).
+    """
+    rng = np.random.default_rng(semilla)
+    return np.cumsum(rng.normal(deriva, volatilidad, size=(simulaciones, anios)), axis=1)
+
+
+# ============================================================
+# Simulación de un bloque (en los procesos del pool)
+# ============================================================
+
+# Últimos caminos generados en este proceso: (parámetros, matriz). Cada
+# bloque trae los parámetros y no la matriz; los caminos se regeneran con la
+# semilla una vez por prueba y por proceso.
+_caminos = (None, None)
+
+
+def _caminos_de(parametros: tuple) -> np.ndarray:
+    global _caminos
+    if _caminos[0] != parametros:
+        _caminos = (parametros, generar_caminos(*parametros))
+    return _caminos[1]
+
+
+def _tea_pactada(bloque: dict, m0: np.ndarray, anios: int) -> np.ndarray:
+    """TEA pactada al empezar cada año de reprecio: (préstamos x anios)"""
+    tea = np.repeat(((1 + bloque["tem"]) ** 12 - 1)[:, None], anios, axis=1)
+    for i, tasas in enumerate(bloque["tasas"]):
+        if tasas is None:
+            continue
+        inicios = np.array([mes for mes, _ in tasas])
+        tems = np.array([tem for _, tem in tasas])
+        vigente = np.searchsorted(inicios, m0[i] + 12 * np.arange(anios), side="right") - 1
+        tea[i] = (1 + tems[vigente]) ** 12 - 1
+    return tea
+
+
+def _histograma(valores: np.ndarray, grupos: np.ndarray, n_grupos: int, metrica: str) -> np.ndarray:
+    """Conteos (grupos x bins); los valores no finitos se descartan"""
+    minimo, maximo, ancho = METRICAS[metrica]
+    n_bins = int(round((maximo - minimo) / ancho))
+    validos = np.isfinite(valores)
+    bins = np.clip(((valores[validos] - minimo) / ancho).astype(np.int64), 0, n_bins - 1)
+    combinados = grupos[validos] * n_bins + bins
+    return np.bincount(combinados, minlength=n_grupos * n_bins).reshape(n_grupos, n_bins)
+
+
+def simular_bloque(bloque: dict) -> dict:
+    """
+    Simula todos los caminos para los préstamos de `bloque` (arrays de
+    cargar_cartera ya recortados, más meses_fijos y umbral). Devuelve, por
+    dimensión y clave, histogramas, sumas y conteos.
+    """
+    caminos = _caminos_de(bloque["caminos"])
+    S, anios = caminos.shape
+    L = bloque["monto_prestamo"].size
+    n = bloque["total_cuotas"]
+    T = int(n.max())
+
+    # 1. TRAMO CON LA TASA PACTADA (igual en todos los caminos)
+    # ----------------------------------------------------------
+    g = np.clip(bloque["meses_gracia"], 0, n)
+    m0 = np.minimum(np.maximum(bloque["meses_fijos"], g), n)
+    m0_max = int(m0.max())
+    parametros = {k: bloque[k] for k in (
+        "monto_prestamo", "tem", "total_cuotas", "tipo_gracia", "meses_gracia",
+        "seguro_desgravamen_porc", "seguro_riesgo_mensual", "gastos",
+    )}
+    columnas, _ = logic.calcular_columnas_lote(**parametros, meses=np.arange(m0_max))
+    # Con tasa por tramos lo pactado es el cronograma de sus tramos
+    for i, tasas in enumerate(bloque["tasas"]):
+        if tasas is None or m0[i] == 0:
+            continue
+        fila, _ = logic.calcular_columnas_tramos({k: v[i] for k, v in parametros.items()}, tasas)
+        for c in ("cuota_total", "saldo_final"):
+            columnas[c][i, :m0[i]] = fila[c][0, :m0[i]]
+    meses = np.arange(m0_max)[None, :]
+    previas = np.where(meses < m0[:, None], columnas["cuota_total"], 0.0)
+    saldo_pactado = bloque["monto_prestamo"].astype(np.float64)
+    if m0_max:
+        saldo_al_reprecio = columnas["saldo_final"][np.arange(L), np.maximum(m0 - 1, 0)]
+        saldo_pactado = np.where(m0 > 0, saldo_al_reprecio, saldo_pactado)
+
+    # Flujos (préstamo, camino, mes); la última columna recibe las escrituras fuera de plazo
+    flujos = np.zeros((L, S, T + 2))
+    flujos[:, :, 0] = bloque["monto_prestamo"][:, None]
+    flujos[:, :, 1:m0_max + 1] = -previas[:, None, :]
+
+    # 2. REPRECIOS ANUALES (forma cerrada por año)
+    # --------------------------------------------
+    restantes = n - m0
+    anios_reprecio = int(np.ceil(restantes.max() / 12))
+    tea_pactada = _tea_pactada(bloque, m0, anios_reprecio)
+    desgravamen = bloque["seguro_desgravamen_porc"][:, None] / 100.0
+    cargos = (bloque["seguro_riesgo_mensual"] + bloque["gastos"])[:, None]
+    saldo = np.broadcast_to(saldo_pactado[:, None], (L, S)).copy()
+    cuota_maxima = np.zeros((L, S))
+    k = np.arange(12)
+
+    for anio in range(anios_reprecio):
+        meses_anio = restantes - 12 * anio
+        activo = meses_anio > 0
+        shock = caminos[:, min(anio, anios - 1)] / 100.0
+        tea = np.maximum(tea_pactada[:, anio][:, None] + shock[None, :], 0.0)
+        tem = (1 + tea) ** (1 / 12) - 1
+
+        with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+            # Cuota francesa sobre el saldo y el plazo restantes
+            plazo = np.maximum(meses_anio, 1)[:, None]
+            potencia = (1 + tem) ** plazo
+            cuota = np.where(tem > 0, saldo * tem * potencia / (potencia - 1), saldo / plazo)
+
+            # Saldo al inicio de cada mes del año: B_k = B (1+i)^k - R ((1+i)^k - 1) / i
+            crecimiento = (1 + tem)[:, :, None] ** np.arange(13)
+            saldos_mes = np.where(
+                (tem > 0)[:, :, None],
+                saldo[:, :, None] * crecimiento - cuota[:, :, None] * (crecimiento - 1) / tem[:, :, None],
+                saldo[:, :, None] - cuota[:, :, None] * np.arange(13),
+            )
+        saldos_mes = np.maximum(saldos_mes, 0.0)
+        ultimo = np.clip(meses_anio, 1, 12)
+        saldo_siguiente = np.take_along_axis(
+            saldos_mes, np.broadcast_to(ultimo[:, None, None], (L, S, 1)), axis=2
+        )[:, :, 0]
+        saldos_mes = saldos_mes[:, :, :12]
+        cuota_total = cuota[:, :, None] + desgravamen[:, :, None] * saldos_mes + cargos[:, :, None]
+
+        # Meses del año dentro del plazo; los demás van a la columna descartada
+        dentro = k[None, :] < meses_anio[:, None]
+        columna = np.where(dentro, 1 + m0[:, None] + 12 * anio + k[None, :], T + 1)
+        np.put_along_axis(flujos, np.broadcast_to(columna[:, None, :], cuota_total.shape), -cuota_total, axis=2)
+
+        # La cuota del año es máxima en su primer mes (el desgravamen baja con el saldo)
+        cuota_maxima = np.where(activo[:, None], np.maximum(cuota_maxima, cuota_total[:, :, 0]), cuota_maxima)
+        saldo = np.where(activo[:, None], saldo_siguiente, saldo)
+
+    # 3. MÉTRICAS POR PRÉSTAMO Y CAMINO
+    # ---------------------------------
+    tir, convergio = solver_tcea.calcular_tir_lote(flujos[:, :, :T + 1].reshape(L * S, T + 1), tol=TOLERANCIA_TIR_ESTRES)
+    tcea = np.where(convergio, solver_tcea.tir_a_tcea(tir) * 100, np.nan).reshape(L, S)
+
+    referencial = bloque["cuota_referencial"][:, None]
+    con_reprecio = (restantes > 0)[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variacion = np.where(con_reprecio, (cuota_maxima / referencial - 1) * 100, 0.0)
+        variacion = np.where(referencial > 0, variacion, np.nan)
+        cuota_final = np.where(con_reprecio, cuota_maxima, referencial)
+        cuota_ingreso = cuota_final / bloque["ingreso_mensual"][:, None] * 100
+    cuota_ingreso = np.where(bloque["ingreso_mensual"][:, None] > 0, cuota_ingreso, np.nan)
+    valores = {"variacion_cuota": variacion, "tcea": tcea, "cuota_ingreso": cuota_ingreso}
+
+    # 4. AGREGACIÓN POR DIMENSIÓN
+    # ---------------------------
+    parcial = {}
+    for dimension in DIMENSIONES:
+        claves = ["cartera"] * L if dimension == "cartera" else bloque[dimension]
+        unicas, grupos_prestamo = np.unique(np.asarray(claves, dtype=str), return_inverse=True)
+        unicas = unicas.tolist()
+        grupos = np.repeat(grupos_prestamo, S)
+        resultado = {clave: {"cotizaciones": int((grupos_prestamo == i).sum())} for i, clave in enumerate(unicas)}
+        for metrica, matriz in valores.items():
+            plano = matriz.ravel()
+            conteos = _histograma(plano, grupos, len(unicas), metrica)
+            finitos = np.isfinite(plano)
+            sumas = np.bincount(grupos[finitos], weights=plano[finitos], minlength=len(unicas))
+            for i, clave in enumerate(unicas):
+                resultado[clave][metrica] = {"conteos": conteos[i], "suma": float(sumas[i])}
+        no_asequibles = np.bincount(
+            grupos, weights=(cuota_ingreso.ravel() > bloque["umbral"]), minlength=len(unicas)
+        )
+        con_ingreso = np.bincount(grupos, weights=np.isfinite(cuota_ingreso.ravel()), minlength=len(unicas))
+        for i, clave in enumerate(unicas):
+            resultado[clave]["no_asequibles"] = int(no_asequibles[i])
+            resultado[clave]["con_ingreso"] = int(con_ingreso[i])
+        parcial[dimension] = resultado
+    return parcial
+
+
+# ============================================================
+# Orquestación
+# ============================================================
+
+_pool = None
+_pool_lock = threading.Lock()
+_corridas = threading.BoundedSemaphore(ESTRES_CORRIDAS_SIMULTANEAS)
+
+
+def _obtener_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: la API corre con hilos (event loop, aiosqlite) que no deben copiarse con fork
+            _pool = ProcessPoolExecutor(ESTRES_PROCESOS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def cerrar_pool(pool: ProcessPoolExecutor | None = None):
+    """Cierra el pool compartido (o sólo si sigue siendo `pool`); el próximo uso crea otro"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or (pool is not None and _pool is not pool):
+            return
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def reservar_corrida() -> bool:
+    """Toma un lugar para una prueba sin esperar; False si están todos ocupados"""
+    return _corridas.acquire(blocking=False)
+
+
+def liberar_corrida():
+    _corridas.release()
+
+
+def _bloques(cartera: dict, simulaciones: int, caminos: tuple, meses_fijos: int, umbral: float):
+    """Bloques de préstamos con a lo más ESTRES_FILAS_POR_BLOQUE préstamo x camino"""
+    por_bloque = max(ESTRES_FILAS_POR_BLOQUE // simulaciones, 1)
+    total = cartera["monto_prestamo"].size
+    for inicio in range(0, total, por_bloque):
+        corte = slice(inicio, inicio + por_bloque)
+        bloque = {k: v[corte] for k, v in cartera.items()}
+        bloque["caminos"] = caminos
+        bloque["meses_fijos"] = meses_fijos
+        bloque["umbral"] = umbral
+        yield bloque
+
+
+def _sumar(total: dict, parcial: dict):
+    for dimension, claves in parcial.items():
+        destino = total.setdefault(dimension, {})
+        for clave, datos in claves.items():
+            if clave not in destino:
+                destino[clave] = datos
+                continue
+            acumulado = destino[clave]
+            for campo, valor in datos.items():
+                if isinstance(valor, dict):
+                    acumulado[campo]["conteos"] += valor["conteos"]
+                    acumulado[campo]["suma"] += valor["suma"]
+                else:
+                    acumulado[campo] += valor
+
+
+def _resumir(datos: dict) -> dict:
+    """Percentiles (centro del bin) y promedio de cada métrica"""
+    resumen = {"cotizaciones": datos["cotizaciones"]}
+    for metrica, (minimo, _, ancho) in METRICAS.items():
+        conteos = datos[metrica]["conteos"]
+        cantidad = int(conteos.sum())
+        if cantidad == 0:
+            resumen[metrica] = None
+            continue
+        acumulados = np.cumsum(conteos)
+        resumen[metrica] = {
+            f"p{p}": round(minimo + (int(np.searchsorted(acumulados, p / 100 * cantidad)) + 0.5) * ancho, 4)
+            for p in PERCENTILES
+        }
+        resumen[metrica]["promedio"] = round(datos[metrica]["suma"] / cantidad, 4)
+    resumen["prob_no_asequible"] = (
+        round(datos["no_asequibles"] / datos["con_ingreso"], 4) if datos["con_ingreso"] else None
+    )
+    return resumen
+
+
+def ejecutar_estres(cartera: dict, simulaciones: int, semilla: int, deriva_anual: float = 0.0,
+                    volatilidad_anual: float = 1.0, meses_fijos: int = 12,
+                    umbral_cuota_ingreso: float = 30.0, en_pool: bool | None = None) -> dict:
+    """
+    Corre la prueba sobre `cartera` (cargar_cartera), en el pool compartido
+    o, con en_pool=False (o ESTRES_PROCESOS=0), en este proceso. Devuelve
+    los percentiles por cartera, proyecto y vendedor.
+    """
+    if cartera["monto_prestamo"].size == 0:
+        return {"cartera": None, "proyecto": {}, "vendedor": {}}
+
+    anios = max(int(np.ceil(cartera["total_cuotas"].max() / 12)), 1)
+    caminos = (simulaciones, anios, semilla, deriva_anual, volatilidad_anual)
+    bloques = _bloques(cartera, simulaciones, caminos, meses_fijos, umbral_cuota_ingreso)
+
+    if en_pool is None:
+        en_pool = ESTRES_PROCESOS > 0
+    total = {}
+    if not en_pool:
+        for bloque in bloques:
+            _sumar(total, simular_bloque(bloque))
+    else:
+        pool = _obtener_pool()
+        try:
+            for parcial in pool.map(simular_bloque, bloques):
+                _sumar(total, parcial)
+        except BrokenProcessPool:
+            # Murió un proceso del pool: se descarta para que la próxima prueba cree otro
+            cerrar_pool(pool)
+            raise
+
+    resultados = {
+        dimension: {clave: _resumir(datos) for clave, datos in sorted(total.get(dimension, {}).items())}
+        for dimension in DIMENSIONES
+    }
+    resultados["cartera"] = resultados["cartera"]["cartera"]
+    return resultados
+
+
+def correr_prueba(prueba_id: int):
+    """
+    Ejecuta la prueba `prueba_id` (models.PruebaEstres) y guarda el
+    resultado o el error. Pensada para correr fuera del event loop.
+    """
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        prueba = db.get(models.PruebaEstres, prueba_id)
+        parametros = json.loads(prueba.parametros)
+        prueba.estado = "en_curso"
+        db.commit()
+
+        inicio = time.perf_counter()
+        try:
+            cartera = cargar_cartera(db)
+            db.rollback()   # libera la conexión durante la simulación
+            resultados = ejecutar_estres(cartera, **parametros)
+        except Exception as e:
+            logger.exception("Falló la prueba de estrés %s", prueba_id)
+            prueba.estado = "error"
+            prueba.error = str(e)
+            db.commit()
+            return
+        prueba.estado = "completada"
+        prueba.error = None
+        prueba.cotizaciones = int(cartera["monto_prestamo"].size)
+        prueba.segundos = round(time.perf_counter() - inicio, 3)
+        prueba.resultados = json.dumps(resultados)
+        db.commit()
+
+
+def correr_prueba_reservada(prueba_id: int):
+    """correr_prueba y libera el lugar tomado con reservar_corrida"""
+    try:
+        correr_prueba(prueba_id)
+    finally:
+        liberar_corrida()
+
+
+def marcar_interrumpidas(db) -> int:
+    """
+    Pasa a "error" las pruebas que quedaron pendientes o en curso (el proceso
+    que las corría terminó). Se llama al arrancar la API; si otro worker sí la
+    estaba corriendo, al terminar la deja con su estado final.
+    Devuelve cuántas se marcaron.
+    """
+    marcadas = db.execute(
+        update(models.PruebaEstres)
+        .where(models.PruebaEstres.estado.in_(("pendiente", "en_curso")))
+        .values(estado="error", error="Interrumpida: la API se reinició durante la prueba")
+    ).rowcount
+    db.commit()
+    if marcadas:
+        logger.warning("Pruebas de estrés interrumpidas marcadas como error: %s", marcadas)
+    return marcadas
+
+
+def nueva_prueba(parametros: dict) -> models.PruebaEstres:
+    """
+    Prueba pendiente (sin guardar). Sin semilla se elige una y se guarda con
+    los parámetros, para poder repetir la corrida.
+    """
+    parametros = dict(parametros)
+    if parametros.get("semilla") is None:
+        parametros["semilla"] = secrets.randbits(32)
+    return models.PruebaEstres(estado="pendiente", parametros=json.dumps(parametros))
+
+
+if __name__ == "__main__":
+    from database import Base, SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Prueba de estrés de tasas sobre la cartera de cotizaciones")
+    parser.add_argument("--simulaciones", type=int, default=1000)
+    parser.add_argument("--semilla", type=int, default=None)
+    parser.add_argument("--deriva", type=float, default=0.0, help="deriva anual de la TEA (puntos porcentuales)")
+    parser.add_argument("--volatilidad", type=float, default=1.0, help="volatilidad anual de la TEA (puntos porcentuales)")
+    parser.add_argument("--meses-fijos", type=int, default=12)
+    parser.add_argument("--umbral", type=float, default=30.0, help="cuota / ingreso máximo asequible (%%)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        prueba = nueva_prueba({
+            "simulaciones": min(args.simulaciones, MAX_SIMULACIONES),
+            "semilla": args.semilla,
+            "deriva_anual": args.deriva,
+            "volatilidad_anual": args.volatilidad,
+            "meses_fijos": args.meses_fijos,
+            "umbral_cuota_ingreso": args.umbral,
+        })
+        db.add(prueba)
+        db.commit()
+    correr_prueba(prueba.id)
+    cerrar_pool()
+    with SessionLocal() as db:
+        prueba = db.get(models.PruebaEstres, prueba.id)
+        print(f"Prueba {prueba.id}: {prueba.estado}, {prueba.cotizaciones} cotizaciones en {prueba.segundos} s")
+        print(json.dumps(json.loads(prueba.resultados)["cartera"], indent=2))
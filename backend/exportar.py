@@ -0,0 +1,124 @@
+# backend/exportar.py
+#
+# Exportación en streaming (CSV / NDJSON) del historial de cotizaciones y de
+# sus cronogramas. Las filas se leen por bloques con un cursor del servidor y
+# cada cronograma se decodifica de a uno: la memoria no crece con el volumen.
+
+import csv
+import io
+import json
+from datetime import date
+
+from sqlalchemy.orm import undefer
+
+import models
+from crud_async import filtros_cotizacion
+from database import SessionLocal
+from logic import COLUMNAS_CRONOGRAMA
+
+TAMANO_BLOQUE_EXPORTACION = 200
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+COLUMNAS_COTIZACION = (
+    "id",
+    "fecha_cotizacion",
+    "vendedor_id",
+    "cliente_id",
+    "inmueble_id",
+    "moneda_prestamo",
+    "precio_final_inmueble",
+    "porcentaje_cuota_inicial",
+    "monto_bono_buen_pagador",
+    "monto_prestamo",
+    "tipo_tasa",
+    "valor_tasa",
+    "capitalizacion",
+    "plazo_meses",
+    "tipo_periodo_gracia",
+    "meses_gracia",
+    "tcea",
+    "van",
+    "tir",
+    "cuota_mensual_referencial",
+)
+
+COLUMNAS_CUOTA = ("cotizacion_id",) + COLUMNAS_CRONOGRAMA
+
+
+def _consulta_cotizaciones(db, vendedor_id=None, cliente_id=None, fecha_desde: date | None = None,
+                           fecha_hasta: date | None = None, con_cronograma: bool = False):
+    query = db.query(models.Cotizacion)
+    if con_cronograma:
+        query = query.options(
+            undefer(models.Cotizacion.cronograma_bin),
+            undefer(models.Cotizacion.cronograma_texto),
+        )
+    query = query.filter(*filtros_cotizacion(
+        vendedor_id, cliente_id, fecha_desde=fecha_desde, fecha_hasta=fecha_hasta
+    ))
+
+    # yield_per usa un cursor del servidor (stream_results) y trae bloques de filas
+    return query.order_by(models.Cotizacion.id).yield_per(TAMANO_BLOQUE_EXPORTACION)
+
+
+def _filas(con_cronograma: bool, **filtros):
+    """
+    Genera dicts (una cotización o una cuota por fila) con una sesión propia:
+    el streaming sigue después de que el endpoint retorna.
+    """
+    db = SessionLocal()
+    try:
+        for cotizacion in _consulta_cotizaciones(db, con_cronograma=con_cronograma, **filtros):
+            if con_cronograma:
+                for cuota in cotizacion.cronograma:
+                    yield {"cotizacion_id": cotizacion.id, **cuota}
+            else:
+                fila = {c: getattr(cotizacion, c) for c in COLUMNAS_COTIZACION}
+                fila["fecha_cotizacion"] = fila["fecha_cotizacion"].isoformat() if fila["fecha_cotizacion"] else None
+                yield fila
+            # Liberar la fila (y su cronograma) del identity map
+            db.expunge(cotizacion)
+    finally:
+        db.close()
+
+
+def _a_csv(filas, columnas, filas_por_bloque: int = TAMANO_BLOQUE_EXPORTACION):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columnas)
+    writer.writeheader()
+    pendientes = 0
+    for fila in filas:
+        writer.writerow(fila)
+        pendientes += 1
+        if pendientes >= filas_por_bloque:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pendientes = 0
+    yield buffer.getvalue()
+
+
+def _a_ndjson(filas, filas_por_bloque: int = TAMANO_BLOQUE_EXPORTACION):
+    bloque = []
+    for fila in filas:
+        bloque.append(json.dumps(fila, ensure_ascii=False))
+        if len(bloque) >= filas_por_bloque:
+            yield "\n".join(bloque) + "\n"
+            bloque = []
+    if bloque:
+        yield "\n".join(bloque) + "\n"
+
+
+def exportar(formato: str, con_cronograma: bool = False, **filtros):
+    """
+    Generador de texto para StreamingResponse.
+    Con `con_cronograma` exporta una fila por cuota; si no, una por cotización.
+    """
+    filas = _filas(con_cronograma, **filtros)
+    if formato == "csv":
+        return _a_csv(filas, COLUMNAS_CUOTA if con_cronograma else COLUMNAS_COTIZACION)
+    return _a_ndjson(filas)
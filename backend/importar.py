@@ -0,0 +1,152 @@
+# backend/importar.py
+#
+# Importación masiva (CSV) de clientes e inmuebles. El archivo se lee por
+# bloques: cada fila se valida con el esquema de creación y las válidas se
+# insertan con un INSERT por lotes y un commit por bloque.
+
+import asyncio
+import codecs
+import csv
+import time
+from itertools import islice
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import schemas
+
+TAMANO_BLOQUE_IMPORTACION = 500
+
+# Qué hacer con un DNI que ya existe en la BD
+MODOS_DNI = ("omitir", "actualizar")
+
+# Se reportan como mucho estas filas con error (el conteo sigue completo)
+MAX_ERRORES_REPORTE = 1000
+
+
+class ResultadoImportacion:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.filas = 0
+        self.insertadas = 0
+        self.actualizadas = 0
+        self.omitidas = 0
+        self.con_error = 0
+        self.errores = []
+
+    def error(self, fila: int, mensajes: list[str]):
+        self.con_error += 1
+        if len(self.errores) < MAX_ERRORES_REPORTE:
+            self.errores.append({"fila": fila, "errores": mensajes})
+
+    def resumen(self) -> dict:
+        segundos = time.perf_counter() - self.inicio
+        return {
+            "filas": self.filas,
+            "insertadas": self.insertadas,
+            "actualizadas": self.actualizadas,
+            "omitidas": self.omitidas,
+            "con_error": self.con_error,
+            "segundos": round(segundos, 3),
+            "filas_por_segundo": round(self.filas / segundos, 1) if segundos > 0 else 0.0,
+            "errores": self.errores,
+        }
+
+
+def _mensajes(error: ValidationError) -> list[str]:
+    return [
+        f"{'.'.join(str(p) for p in e['loc']) or 'fila'}: {e['msg']}"
+        for e in error.errors()
+    ]
+
+
+def _leer_bloque(lector, esquema, resultado: ResultadoImportacion, tamano: int) -> list | None:
+    """
+    Lee y valida hasta `tamano` filas. Devuelve [(número de fila, dict)]
+    con las válidas, o None cuando el archivo terminó.
+    """
+    crudas = list(islice(lector, tamano))
+    if not crudas:
+        return None
+
+    validas = []
+    for fila in crudas:
+        resultado.filas += 1
+        # Línea 1 = encabezado
+        numero = resultado.filas + 1
+        # Celdas vacías -> valor por defecto del esquema
+        datos = {k: v for k, v in fila.items() if k and v not in (None, "")}
+        try:
+            validas.append((numero, esquema(**datos).model_dump()))
+        except ValidationError as e:
+            resultado.error(numero, _mensajes(e))
+    return validas
+
+
+async def _bloques(archivo, esquema, resultado: ResultadoImportacion, tamano: int):
+    """
+    Recorre el CSV (binario, UTF-8 con o sin BOM) de a `tamano` filas.
+    La lectura y la validación corren fuera del event loop.
+    """
+    lector = csv.DictReader(codecs.iterdecode(archivo, "utf-8-sig"))
+    loop = asyncio.get_running_loop()
+    while True:
+        validas = await loop.run_in_executor(None, _leer_bloque, lector, esquema, resultado, tamano)
+        if validas is None:
+            return
+        if validas:
+            yield validas
+
+
+async def importar_inmuebles(db: AsyncSession, archivo, tamano: int = TAMANO_BLOQUE_IMPORTACION) -> dict:
+    resultado = ResultadoImportacion()
+    async for validas in _bloques(archivo, schemas.InmuebleCreate, resultado, tamano):
+        await db.execute(insert(models.Inmueble), [datos for _, datos in validas])
+        await db.commit()
+        resultado.insertadas += len(validas)
+    return resultado.resumen()
+
+
+async def importar_clientes(db: AsyncSession, archivo, modo_dni: str = "omitir",
+                            tamano: int = TAMANO_BLOQUE_IMPORTACION) -> dict:
+    """
+    Los DNI que ya existen se omiten o se actualizan según `modo_dni`. Un DNI
+    repetido dentro del mismo archivo se reporta como error en la segunda fila.
+    """
+    resultado = ResultadoImportacion()
+    vistos = set()
+    async for validas in _bloques(archivo, schemas.ClienteCreate, resultado, tamano):
+        nuevos = {}
+        for numero, datos in validas:
+            if datos["dni"] in vistos:
+                resultado.error(numero, [f"dni: {datos['dni']} repetido en el archivo"])
+                continue
+            vistos.add(datos["dni"])
+            nuevos[datos["dni"]] = datos
+
+        # Un SELECT por bloque para separar altas de existentes
+        existentes = dict(
+            (await db.execute(
+                select(models.Cliente.dni, models.Cliente.id).where(models.Cliente.dni.in_(nuevos))
+            )).all()
+        )
+
+        altas = [datos for dni, datos in nuevos.items() if dni not in existentes]
+        if altas:
+            await db.execute(insert(models.Cliente), altas)
+            resultado.insertadas += len(altas)
+
+        if existentes and modo_dni == "actualizar":
+            # UPDATE por clave primaria en lote (executemany)
+            await db.execute(
+                update(models.Cliente),
+                [dict(nuevos[dni], id=id_) for dni, id_ in existentes.items()],
+            )
+            resultado.actualizadas += len(existentes)
+        else:
+            resultado.omitidas += len(existentes)
+
+        await db.commit()
+    return resultado.resumen()
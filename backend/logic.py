@@ -1,146 +1,792 @@
-import numpy_financial as npf
+import numpy as np
 import json
+import tcea as solver_tcea
+from metricas import medir
 from schemas import CotizacionInput # <--- Nota que ahora importamos el esquema correcto
 
-def calcular_cotizacion(datos: CotizacionInput):
+# Columnas del cronograma, en el orden en que se devuelven al frontend
+COLUMNAS_CRONOGRAMA = (
+    "n",
+    "saldo_inicial",
+    "interes",
+    "amortizacion",
+    "seguro_desgravamen",
+    "seguro_riesgo",
+    "gastos",
+    "cuota_total",
+    "saldo_final",
+)
+
+# Códigos numéricos de tipo_periodo_gracia para el cálculo en lote
+GRACIA_NINGUNA = 0
+GRACIA_PARCIAL = 1
+GRACIA_TOTAL = 2
+
+MENSAJE_PLAZO_INVALIDO = "El plazo debe ser de al menos un año"
+MENSAJE_SIN_TIR = "No se pudo calcular la TCEA: el flujo de caja no tiene TIR"
+
+
+def codigo_gracia(tipo_periodo_gracia: str) -> int:
     """
-    Calcula el cronograma de pagos del Crédito MiVivienda (Método Francés)
-    considerando Bonos del Estado y Periodos de Gracia.
+    "Parcial" -> 1, "Total" -> 2. Cualquier otro valor ("Sin Gracia") -> 0.
+    """
+    if tipo_periodo_gracia == "Total":
+        return GRACIA_TOTAL
+    if tipo_periodo_gracia == "Parcial":
+        return GRACIA_PARCIAL
+    return GRACIA_NINGUNA
+
+
+def tasa_efectiva_mensual(tipo_tasa: str, valor_tasa, capitalizacion: int):
+    """
+    Convierte la tasa ingresada (TEA o TNA) a Tasa Efectiva Mensual (TEM).
+    `valor_tasa` puede ser un número o un array de NumPy.
+    """
+    tasa_decimal = valor_tasa / 100.0
+
+    if tipo_tasa == "Nominal":
+        # TNA a TEM: (1 + TNA/m)^(n) - 1
+        # Corrección común: Si capitalización es 30 (mensual) -> TNA/12
+        if capitalizacion > 0:
+            m = 360 / capitalizacion
+            return ((1 + (tasa_decimal / m)) ** (30 / capitalizacion)) - 1
+        # Default o error handling
+        return ((1 + tasa_decimal) ** (30 / 360)) - 1
+
+    # TEA a TEM: (1 + TEA)^(30/360) - 1
+    return ((1 + tasa_decimal) ** (30 / 360)) - 1
+
+
+# ============================================================
+# Motor vectorizado (escenarios x meses)
+# ============================================================
+
+def calcular_columnas_lote(
+    monto_prestamo,
+    tem,
+    total_cuotas,
+    tipo_gracia,
+    meses_gracia,
+    seguro_desgravamen_porc,
+    seguro_riesgo_mensual,
+    gastos,
+    meses=None,
+):
+    """
+    Calcula el cronograma de muchos escenarios a la vez. Cada parámetro es un
+    array de tamaño escenarios (o un escalar, que se repite); el resultado son
+    columnas NumPy de forma (escenarios x meses), sin recorrer los meses.
+
+    - Periodo de gracia: saldos en forma cerrada (S0 * (1+i)^k en gracia Total,
+      saldo constante en gracia Parcial).
+    - Periodo normal (Método Francés): la cuota es constante, así que el saldo
+      del mes k se obtiene con factores de descuento precalculados:
+      B_k = S * ((1+i)^m - (1+i)^k) / ((1+i)^m - 1)
+
+    Los escenarios con plazos más cortos quedan rellenos con ceros a la derecha.
+
+    `meses` (opcional) son los meses a calcular, en base 0: como cada saldo
+    sale de una fórmula cerrada, se puede pedir sólo una ventana del plazo.
+
+    Devuelve (columnas, cuota_mensual_referencial).
+    """
+    (monto, tem, n_cuotas, tipo, meses_gracia, desgravamen, riesgo, gastos) = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(x)) for x in (
+            monto_prestamo, tem, total_cuotas, tipo_gracia, meses_gracia,
+            seguro_desgravamen_porc, seguro_riesgo_mensual, gastos,
+        ))
+    )
+    monto = monto.astype(np.float64)
+    tem = tem.astype(np.float64)
+    n_cuotas = np.maximum(n_cuotas.astype(np.int64), 0)
+    n_max = int(n_cuotas.max()) if n_cuotas.size else 0
+
+    g = np.clip(meses_gracia.astype(np.int64), 0, n_cuotas)
+    m = n_cuotas - g
+
+    def col(x):
+        return x[:, None]
+
+    if meses is None:
+        meses = np.arange(n_max)
+    j = np.asarray(meses, dtype=np.float64)[None, :]    # mes (base 0)
+    dentro_plazo = j < col(n_cuotas)
+    en_gracia = j < col(g)
+    uno_mas_tem = 1 + tem
+    es_total = tipo == GRACIA_TOTAL
+
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        # 1. FASE DE GRACIA
+        # -----------------
+        # Total: el interés se capitaliza y el saldo crece geométricamente.
+        # Parcial: se paga sólo el interés. Cualquier otro tipo no paga ni capitaliza.
+        saldo_ini_gracia = np.where(col(es_total), col(monto) * col(uno_mas_tem) ** j, col(monto))
+        saldo_fin_gracia = np.where(col(es_total), saldo_ini_gracia * col(uno_mas_tem), col(monto))
+        interes_gracia = saldo_ini_gracia * col(tem)
+        cuota_fin_gracia = np.where(col(tipo == GRACIA_PARCIAL), interes_gracia, 0.0)
+        saldo_post_gracia = np.where(es_total, monto * uno_mas_tem ** g, monto)
+
+        # 2. FASE NORMAL (Método Francés)
+        # -------------------------------
+        saldo = np.maximum(saldo_post_gracia, 0.0)
+        activo = (m > 0) & (saldo > 0)
+        con_tasa = tem != 0
+
+        k = np.maximum(j - col(g), 0.0)                 # mes dentro de la fase normal
+        # Factores de descuento precalculados una sola vez
+        potencia_m = uno_mas_tem ** m
+        potencias = col(uno_mas_tem) ** k
+        potencias_sig = col(uno_mas_tem) ** (k + 1)
+        saldo_ini_normal = np.where(
+            col(con_tasa),
+            col(saldo) * (col(potencia_m) - potencias) / (col(potencia_m) - 1),
+            col(saldo) * (col(m) - k) / col(m),
+        )
+        saldo_fin_normal = np.where(
+            col(con_tasa),
+            col(saldo) * (col(potencia_m) - potencias_sig) / (col(potencia_m) - 1),
+            col(saldo) * (col(m) - (k + 1)) / col(m),
+        )
+        # Fórmula Renta (R) = P * [i(1+i)^n] / [(1+i)^n - 1]
+        cuota_fija = np.where(con_tasa, saldo * (tem * potencia_m) / (potencia_m - 1), saldo / m)
+
+    cuota_fija = np.where(activo, cuota_fija, 0.0)
+    saldo_ini_normal = np.where(col(activo), saldo_ini_normal, 0.0)
+    saldo_fin_normal = np.where(col(activo), saldo_fin_normal, 0.0)
+    interes_normal = saldo_ini_normal * col(tem)
+    cuota_fin_normal = np.broadcast_to(col(cuota_fija), saldo_ini_normal.shape)
+    amort_normal = cuota_fin_normal - interes_normal
+
+    # Ajuste final por redondeo: la última cuota cancela exactamente el saldo
+    ultimo_mes = (j == col(n_cuotas - 1)) & col(activo)
+    amort_normal = np.where(ultimo_mes, saldo_ini_normal, amort_normal)
+    cuota_fin_normal = np.where(ultimo_mes, interes_normal + saldo_ini_normal, cuota_fin_normal)
+
+    # 3. UNIÓN DE FASES Y CARGOS FIJOS
+    # --------------------------------
+    def unir(gracia, normal):
+        return np.where(dentro_plazo, np.where(en_gracia, gracia, normal), 0.0)
+
+    saldo_inicial = unir(saldo_ini_gracia, saldo_ini_normal)
+    saldo_final = unir(saldo_fin_gracia, saldo_fin_normal)
+    interes = unir(interes_gracia, interes_normal)
+    amortizacion = unir(0.0, amort_normal)
+    cuota_financiera = unir(cuota_fin_gracia, cuota_fin_normal)
+
+    seguro_desgravamen = saldo_inicial * col(desgravamen / 100.0)
+    seguro_riesgo = np.where(dentro_plazo, col(riesgo.astype(np.float64)), 0.0)
+    gastos_col = np.where(dentro_plazo, col(gastos.astype(np.float64)), 0.0)
+    cuota_total = cuota_financiera + seguro_desgravamen + seguro_riesgo + gastos_col
+
+    # Guardamos la primera cuota "normal" como referencia (sin el ajuste final).
+    # Su saldo es el de k=0, calculado igual que en la columna aunque el mes
+    # no esté dentro de `meses`.
+    with np.errstate(invalid="ignore", divide="ignore"):
+        saldo_primera = np.where(
+            con_tasa,
+            saldo * (potencia_m - uno_mas_tem ** 0.0) / (potencia_m - 1),
+            saldo * (m - 0.0) / m,
+        )
+    desgravamen_primera = np.where(activo, saldo_primera, 0.0) * (desgravamen / 100.0)
+    cuota_mensual_referencial = np.where(
+        m > 0, cuota_fija + desgravamen_primera + riesgo + gastos, 0.0
+    )
+
+    columnas = {
+        "n": np.where(dentro_plazo, j + 1, 0).astype(np.int64),
+        "saldo_inicial": saldo_inicial,
+        "interes": interes,
+        "amortizacion": amortizacion,
+        "seguro_desgravamen": seguro_desgravamen,
+        "seguro_riesgo": seguro_riesgo,
+        "gastos": gastos_col,
+        "cuota_total": cuota_total,
+        "saldo_final": np.maximum(saldo_final, 0.0),
+    }
+    return columnas, cuota_mensual_referencial
+
+
+def indicadores_lote(monto_prestamo, tem, cuota_total):
+    """
+    TIR, TCEA y VAN de cada escenario a partir de su flujo de caja
+    (desembolso en t=0 y cuotas totales como salidas).
+
+    Devuelve (tir_mensual, tcea, van, convergio).
+    """
+    monto_prestamo = np.atleast_1d(np.asarray(monto_prestamo, dtype=np.float64))
+    tem = np.broadcast_to(np.asarray(tem, dtype=np.float64), monto_prestamo.shape)
+
+    flujo_caja = np.concatenate((monto_prestamo[:, None], -cuota_total), axis=1)
+    tir_mensual, convergio = solver_tcea.calcular_tir_lote(flujo_caja)
+    tcea = solver_tcea.tir_a_tcea(tir_mensual)
+
+    t = np.arange(flujo_caja.shape[1], dtype=np.float64)
+    van = (flujo_caja / (1 + tem[:, None]) ** t).sum(axis=1)
+    return tir_mensual, tcea, van, convergio
+
+
+def columnas_a_cronograma(columnas: dict, fila: int = 0, total_cuotas: int | None = None) -> list:
+    """
+    Convierte las columnas NumPy de un escenario al formato de lista de dicts
+    que espera el frontend.
+    """
+    valores = []
+    for c in COLUMNAS_CRONOGRAMA:
+        columna = np.atleast_2d(columnas[c])[fila, :total_cuotas]
+        if c != "n":
+            columna = np.round(columna, 2)
+        valores.append(columna.tolist())
+    return [dict(zip(COLUMNAS_CRONOGRAMA, fila_valores)) for fila_valores in zip(*valores)]
+
+
+# ============================================================
+# Cotizaciones
+# ============================================================
+
+def parametros_lote(lista_datos: list[CotizacionInput]) -> dict:
+    """
+    Extrae de cada CotizacionInput los parámetros del motor como arrays
+    (uno por escenario).
     """
-    
     # 1. CÁLCULOS INICIALES DEL PRÉSTAMO
     # ----------------------------------
-    
+    precio = np.array([d.precio_final_inmueble for d in lista_datos], dtype=np.float64)
+    porcentaje_inicial = np.array([d.porcentaje_cuota_inicial for d in lista_datos], dtype=np.float64)
+    bono = np.array([d.monto_bono_buen_pagador for d in lista_datos], dtype=np.float64)
+
     # Monto de la Cuota Inicial
-    monto_inicial = datos.precio_final_inmueble * (datos.porcentaje_cuota_inicial / 100.0)
-    
+    monto_inicial = precio * (porcentaje_inicial / 100.0)
+
     # Monto a Financiar (El Préstamo)
     # FÓRMULA MIVIVIENDA: Precio - Inicial - Bono del Buen Pagador (BBP)
-    monto_prestamo = datos.precio_final_inmueble - monto_inicial - datos.monto_bono_buen_pagador
-    
+    monto_prestamo = precio - monto_inicial - bono
+
     # Conversión de Tasa a Efectiva Mensual (TEM)
-    tasa_decimal = datos.valor_tasa / 100.0
-    tem = 0.0
-    
-    if datos.tipo_tasa == "Nominal":
-        # TNA a TEM: (1 + TNA/m)^(n) - 1
-        # Asumiendo TNA con capitalización diaria (lo más común en bancos):
-        # m = 360 / datos.capitalizacion
-        # tem = ((1 + (tasa_decimal / m)) ** (30 / datos.capitalizacion)) - 1
-        
-        # Corrección común: Si capitalización es 30 (mensual) -> TNA/12
-        if datos.capitalizacion > 0:
-             m = 360 / datos.capitalizacion
-             tem = ((1 + (tasa_decimal / m)) ** (30 / datos.capitalizacion)) - 1
-        else:
-             # Default o error handling
-             tem = ((1 + tasa_decimal) ** (30 / 360)) - 1
-             
-    else:
-        # TEA a TEM: (1 + TEA)^(30/360) - 1
-        tem = ((1 + tasa_decimal) ** (30 / 360)) - 1
-
-    # Total de cuotas (meses)
-    total_cuotas = datos.plazo_anios * 12
-    
-    # 2. GENERACIÓN DEL CRONOGRAMA
-    # ----------------------------
-    cronograma = []
-    flujo_caja = [monto_prestamo] # Para el cálculo de la TCEA (VAN/TIR)
-    
-    saldo_capital = monto_prestamo
-    cuota_mensual_referencial = 0.0
-    
-    for n in range(1, total_cuotas + 1):
-        # A. Cálculo de Seguros y Gastos (Se pagan siempre)
-        seguro_desgravamen = saldo_capital * (datos.seguro_desgravamen_porc / 100.0)
-        seguro_riesgo = datos.precio_final_inmueble * (datos.seguro_riesgo_porc / 12 / 100.0) # Anual a mensual
-        gastos = datos.gastos_administrativos
-        
-        # B. Cálculo de Interés del Periodo
-        interes = saldo_capital * tem
-        
-        amortizacion = 0.0
-        cuota_financiera = 0.0
-        
-        # C. Lógica de Periodos de Gracia
-        if n <= datos.meses_gracia:
-            # ESTAMOS EN PERIODO DE GRACIA
-            if datos.tipo_periodo_gracia == "Total":
-                # Gracia Total: No se paga interés ni capital. El interés se suma a la deuda.
-                amortizacion = 0.0
-                cuota_financiera = 0.0 
-                saldo_capital += interes # Capitalización de intereses
-            elif datos.tipo_periodo_gracia == "Parcial":
-                # Gracia Parcial: Se paga el interés, pero no se amortiza capital.
-                amortizacion = 0.0
-                cuota_financiera = interes 
-        else:
-            # PERIODO NORMAL (Método Francés)
-            # Recalculamos la cuota fija con el saldo actual y los meses restantes
-            meses_restantes = total_cuotas - n + 1
-            
-            # Fórmula Renta (R) = P * [i(1+i)^n] / [(1+i)^n - 1]
-            if saldo_capital > 0:
-                factor = (tem * ((1 + tem) ** meses_restantes)) / (((1 + tem) ** meses_restantes) - 1)
-                cuota_financiera = saldo_capital * factor
-                amortizacion = cuota_financiera - interes
-            else:
-                cuota_financiera = 0
-                amortizacion = 0
-            
-            # Guardamos la primera cuota "normal" como referencia
-            if cuota_mensual_referencial == 0:
-                cuota_mensual_referencial = cuota_financiera + seguro_desgravamen + seguro_riesgo + gastos
-
-        # D. Cuota Total a Pagar (Cliente)
-        # En Gracia Total, asumimos que seguros se pagan (depende del banco, pero es estándar)
-        cuota_total = cuota_financiera + seguro_desgravamen + seguro_riesgo + gastos
-        
-        # E. Actualizar Saldo 
-        if datos.tipo_periodo_gracia != "Total" or n > datos.meses_gracia:
-            saldo_capital -= amortizacion
-            # Ajuste final por redondeo
-            if n == total_cuotas and abs(saldo_capital) < 10:
-                cuota_total += saldo_capital
-                amortizacion += saldo_capital
-                saldo_capital = 0.0
-        
-        # Corrección de saldo negativo pequeño por decimales
-        if saldo_capital < 0: saldo_capital = 0
-
-        # Guardar datos
-        cronograma.append({
-            "n": n,
-            "saldo_inicial": round(saldo_capital + amortizacion if (datos.tipo_periodo_gracia != "Total" or n > datos.meses_gracia) else saldo_capital - interes, 2),
-            "interes": round(interes, 2),
-            "amortizacion": round(amortizacion, 2),
-            "seguro_desgravamen": round(seguro_desgravamen, 2),
-            "seguro_riesgo": round(seguro_riesgo, 2),
-            "gastos": round(gastos, 2),
-            "cuota_total": round(cuota_total, 2),
-            "saldo_final": round(saldo_capital, 2)
-        })
-        
-        flujo_caja.append(-cuota_total)
+    tem = np.array(
+        [tasa_efectiva_mensual(d.tipo_tasa, d.valor_tasa, d.capitalizacion) for d in lista_datos],
+        dtype=np.float64,
+    )
+
+    return {
+        "monto_prestamo": monto_prestamo,
+        "tem": tem,
+        # Total de cuotas (meses)
+        "total_cuotas": np.array([d.plazo_anios * 12 for d in lista_datos], dtype=np.int64),
+        "tipo_gracia": np.array([codigo_gracia(d.tipo_periodo_gracia) for d in lista_datos]),
+        "meses_gracia": np.array([d.meses_gracia for d in lista_datos], dtype=np.int64),
+        "seguro_desgravamen_porc": np.array([d.seguro_desgravamen_porc for d in lista_datos], dtype=np.float64),
+        "seguro_riesgo_mensual": precio * (
+            np.array([d.seguro_riesgo_porc for d in lista_datos], dtype=np.float64) / 12 / 100.0
+        ), # Anual a mensual
+        "gastos": np.array([d.gastos_administrativos for d in lista_datos], dtype=np.float64),
+    }
+
+
+def parametros_cotizaciones_guardadas(cotizaciones: list) -> dict:
+    """
+    Parámetros del motor a partir de filas models.Cotizacion ya guardadas.
+    El monto del préstamo se recalcula sin redondear, igual que al cotizar.
+    """
+    precio = np.array([c.precio_final_inmueble for c in cotizaciones], dtype=np.float64)
+    porcentaje_inicial = np.array([c.porcentaje_cuota_inicial for c in cotizaciones], dtype=np.float64)
+    bono = np.array([c.monto_bono_buen_pagador or 0.0 for c in cotizaciones], dtype=np.float64)
+
+    return {
+        "monto_prestamo": precio - precio * (porcentaje_inicial / 100.0) - bono,
+        "tem": np.array(
+            [tasa_efectiva_mensual(c.tipo_tasa, c.valor_tasa, c.capitalizacion) for c in cotizaciones],
+            dtype=np.float64,
+        ),
+        "total_cuotas": np.array([c.plazo_meses for c in cotizaciones], dtype=np.int64),
+        "tipo_gracia": np.array([codigo_gracia(c.tipo_periodo_gracia) for c in cotizaciones]),
+        "meses_gracia": np.array([c.meses_gracia or 0 for c in cotizaciones], dtype=np.int64),
+        "seguro_desgravamen_porc": np.array([c.seguro_desgravamen_porc for c in cotizaciones], dtype=np.float64),
+        "seguro_riesgo_mensual": precio * (
+            np.array([c.seguro_riesgo_porc for c in cotizaciones], dtype=np.float64) / 12 / 100.0
+        ), # Anual a mensual
+        "gastos": np.array([c.gastos_administrativos or 0.0 for c in cotizaciones], dtype=np.float64),
+    }
+
+
+def columnas_cotizaciones_guardadas(cotizaciones: list):
+    """
+    Cronogramas completos de varias cotizaciones guardadas en una pasada
+    vectorizada (las de tasa por tramos se calculan aparte y reemplazan su
+    fila). Devuelve (columnas escenarios x meses, total_cuotas).
+    """
+    p = parametros_cotizaciones_guardadas(cotizaciones)
+    columnas, _ = calcular_columnas_lote(**p)
+    for i, cotizacion in enumerate(cotizaciones):
+        if getattr(cotizacion, "tramos_tasa", None) and p["total_cuotas"][i] > 0:
+            n = int(p["total_cuotas"][i])
+            p_i, tasas = _parametros_guardada(cotizacion)
+            fila = _columnas_cotizacion(p_i, tasas, 0, n)
+            for c in COLUMNAS_CRONOGRAMA:
+                columnas[c][i, :n] = fila[c][0]
+    return columnas, p["total_cuotas"]
+
+
+def cronograma_cotizacion_guardada(cotizacion, desde: int = 1, hasta: int | None = None) -> list:
+    """
+    Regenera las cuotas `desde`..`hasta` (base 1, inclusive) de una cotización
+    guardada a partir de sus parámetros, sin calcular el resto del plazo.
+    """
+    if hasta is None:
+        hasta = cotizacion.plazo_meses
+    p, tasas = _parametros_guardada(cotizacion)
+    return columnas_a_cronograma(_columnas_cotizacion(p, tasas, desde - 1, hasta))
+
+
+def calcular_cotizaciones_lote(lista_datos: list[CotizacionInput]):
+    """
+    Calcula varias cotizaciones en una sola pasada vectorizada
+    (escenarios x meses), incluyendo la TCEA de todas a la vez.
+
+    Devuelve (resultados, errores): resultados[i] es el dict de
+    calcular_cotizacion o None si el escenario i falló; errores mapea
+    índice -> mensaje.
+    """
+    if not lista_datos:
+        return [], {}
+
+    p = parametros_lote(lista_datos)
+
+    # 2. GENERACIÓN DE LOS CRONOGRAMAS (vectorizado)
+    # ----------------------------------------------
+    errores = {}
+    with medir("calculo.cronograma"):
+        columnas, cuota_referencial = calcular_columnas_lote(**p)
+
+        # Escenarios con tasa por tramos: se reemplaza su fila
+        for i, d in enumerate(lista_datos):
+            if not d.tramos_tasa or p["total_cuotas"][i] <= 0:
+                continue
+            n = int(p["total_cuotas"][i])
+            try:
+                tasas = tasas_por_tramo(
+                    d.tipo_tasa, d.valor_tasa, d.capitalizacion,
+                    [t.model_dump() for t in d.tramos_tasa], n,
+                )
+            except ValueError as e:
+                errores[i] = str(e)
+                continue
+            fila, cuota_referencial[i] = calcular_columnas_tramos({k: v[i] for k, v in p.items()}, tasas)
+            for c in COLUMNAS_CRONOGRAMA:
+                columnas[c][i, :n] = fila[c][0]
 
     # 3. CÁLCULO DE INDICADORES (TCEA, VAN)
     # -------------------------------------
-    
-    try:
-        tir_mensual = npf.irr(flujo_caja)
-        tcea = ((1 + tir_mensual) ** 12) - 1
-    except:
-        tcea = 0.0
-        tir_mensual = 0.0
+    with medir("calculo.tir"):
+        tir_mensual, tcea, van, convergio = indicadores_lote(
+            p["monto_prestamo"], p["tem"], columnas["cuota_total"]
+        )
+
+    resultados = []
+    # Resultados por escenario (cronograma como lista de dicts)
+    with medir("calculo.resultado"):
+        for i in range(len(lista_datos)):
+            if p["total_cuotas"][i] <= 0:
+                errores[i] = MENSAJE_PLAZO_INVALIDO
+                resultados.append(None)
+                continue
+            if i in errores:
+                resultados.append(None)
+                continue
+            if not convergio[i]:
+                errores[i] = MENSAJE_SIN_TIR
+                resultados.append(None)
+                continue
+
+            resultados.append({
+                "monto_prestamo": round(float(p["monto_prestamo"][i]), 2),
+                "cuota_mensual_referencial": round(float(cuota_referencial[i]), 2),
+                "tcea": round(float(tcea[i]) * 100, 7),
+                "van": round(float(van[i]), 2),
+                "tir": round(float(tir_mensual[i]) * 100, 7),
+                "cronograma": columnas_a_cronograma(columnas, i, int(p["total_cuotas"][i])),
+            })
+
+    return resultados, errores
+
+
+def calcular_cotizacion(datos: CotizacionInput):
+    """
+    Calcula el cronograma de pagos del Crédito MiVivienda (Método Francés)
+    considerando Bonos del Estado, Periodos de Gracia y tasa por tramos.
+
+    Lanza ValueError si el plazo o los tramos no son válidos y TIRNoConvergeError si el
+    flujo de caja no tiene TIR (en lugar de reportar una TCEA de 0%).
+    """
+    if datos.plazo_anios <= 0:
+        raise ValueError(MENSAJE_PLAZO_INVALIDO)
+    if datos.tramos_tasa:
+        # Valida los tramos antes de calcular
+        tasas_por_tramo(
+            datos.tipo_tasa, datos.valor_tasa, datos.capitalizacion,
+            [t.model_dump() for t in datos.tramos_tasa], datos.plazo_anios * 12,
+        )
+
+    with medir("calcular_cotizacion"):
+        resultados, errores = calcular_cotizaciones_lote([datos])
+    if errores:
+        raise solver_tcea.TIRNoConvergeError(errores[0])
+    return resultados[0]
+
+
+# ============================================================
+# Sensibilidad (grilla tasa x plazo x cuota inicial)
+# ============================================================
+
+# Escenarios por bloque: acota la memoria de las matrices (escenarios x meses)
+TAMANO_BLOQUE_SENSIBILIDAD = 2000
+
+
+def calcular_sensibilidad(base: CotizacionInput, valores_tasa, plazos_anios, porcentajes_cuota_inicial):
+    """
+    Calcula cuota referencial, TCEA e interés total para cada combinación de
+    tasa x plazo x cuota inicial, partiendo de los demás datos de `base`.
+
+    Sólo se guardan las métricas resumen: no se arman cronogramas en dicts.
+    Devuelve un dict con tres arrays de forma (tasas, plazos, iniciales);
+    las celdas sin TIR quedan en NaN.
+    """
+    tasa, plazo, inicial = (
+        x.ravel() for x in np.meshgrid(
+            np.asarray(valores_tasa, dtype=np.float64),
+            np.asarray(plazos_anios, dtype=np.int64),
+            np.asarray(porcentajes_cuota_inicial, dtype=np.float64),
+            indexing="ij",
+        )
+    )
+
+    # Mismas fórmulas que parametros_lote, con la grilla como arrays
+    precio = base.precio_final_inmueble
+    monto_prestamo = precio - precio * (inicial / 100.0) - base.monto_bono_buen_pagador
+    tem = tasa_efectiva_mensual(base.tipo_tasa, tasa, base.capitalizacion)
+
+    cuota = np.empty(tasa.size)
+    tcea = np.empty(tasa.size)
+    interes_total = np.empty(tasa.size)
+
+    for inicio in range(0, tasa.size, TAMANO_BLOQUE_SENSIBILIDAD):
+        bloque = slice(inicio, inicio + TAMANO_BLOQUE_SENSIBILIDAD)
+        columnas, cuota_referencial = calcular_columnas_lote(
+            monto_prestamo=monto_prestamo[bloque],
+            tem=tem[bloque],
+            total_cuotas=plazo[bloque] * 12,
+            tipo_gracia=codigo_gracia(base.tipo_periodo_gracia),
+            meses_gracia=base.meses_gracia,
+            seguro_desgravamen_porc=base.seguro_desgravamen_porc,
+            seguro_riesgo_mensual=precio * (base.seguro_riesgo_porc / 12 / 100.0), # Anual a mensual
+            gastos=base.gastos_administrativos,
+        )
+        _, tcea_bloque, _, convergio = indicadores_lote(
+            monto_prestamo[bloque], tem[bloque], columnas["cuota_total"]
+        )
+
+        cuota[bloque] = cuota_referencial
+        tcea[bloque] = np.where(convergio, tcea_bloque, np.nan)
+        interes_total[bloque] = columnas["interes"].sum(axis=1)
+
+    forma = (len(valores_tasa), len(plazos_anios), len(porcentajes_cuota_inicial))
+    return {
+        "cuota_mensual_referencial": np.round(cuota, 2).reshape(forma),
+        "tcea": np.round(tcea * 100, 7).reshape(forma),
+        "interes_total": np.round(interes_total, 2).reshape(forma),
+    }
+
+
+# ============================================================
+# Tramos (tasa variable y abonos)
+# ============================================================
+# Un tramo es un cronograma francés que arranca en el mes `inicio` (base 0)
+# con saldo `monto_prestamo` y su propia TEM, pactado a `total_cuotas` meses,
+# que rige hasta el mes `fin` (exclusivo), donde lo reemplaza otro tramo
+# (cambio de tasa o abono). Cada tramo se evalúa como un bloque de
+# calcular_columnas_lote: los factores de la anualidad se calculan una vez
+# por tramo y no mes a mes.
+
+def tasas_por_tramo(tipo_tasa: str, valor_tasa, capitalizacion: int, tramos_tasa, total_cuotas: int) -> list:
+    """
+    [(mes de inicio en base 0, TEM)] de cada tramo de tasa, ordenados.
+    La tasa base rige desde la cuota 1 hasta el primer tramo; un tramo con
+    desde_mes=1 la reemplaza. `tramos_tasa` son dicts con desde_mes,
+    tipo_tasa, valor_tasa y capitalizacion.
+
+    Lanza ValueError si un tramo cae fuera del plazo o se repite.
+    """
+    tasas = {0: tasa_efectiva_mensual(tipo_tasa, valor_tasa, capitalizacion)}
+    vistos = set()
+    for tramo in tramos_tasa or ():
+        desde = tramo["desde_mes"]
+        if not 1 <= desde <= total_cuotas:
+            raise ValueError(f"El tramo de tasa desde la cuota {desde} está fuera del plazo")
+        if desde in vistos:
+            raise ValueError(f"Hay dos tramos de tasa desde la cuota {desde}")
+        vistos.add(desde)
+        tasas[desde - 1] = tasa_efectiva_mensual(
+            tramo["tipo_tasa"], tramo["valor_tasa"], tramo.get("capitalizacion", 30)
+        )
+    return sorted(tasas.items())
+
+
+def _tramo_inicial(p: dict, tem: float) -> dict:
+    total = int(p["total_cuotas"])
+    return {
+        "inicio": 0,
+        "fin": total,
+        "monto_prestamo": float(p["monto_prestamo"]),
+        "tem": float(tem),
+        "total_cuotas": total,
+        "tipo_gracia": int(p["tipo_gracia"]),
+        "meses_gracia": int(min(max(p["meses_gracia"], 0), total)),
+    }
+
+
+def _columnas_tramo(tramo: dict, p: dict, desde: int, hasta: int):
+    """
+    Columnas de los meses `desde`..`hasta`-1 (base 0, absolutos) de un tramo.
+    Devuelve (columnas, cuota_mensual_referencial del tramo).
+    """
+    inicio = tramo["inicio"]
+    columnas, cuota_referencial = calcular_columnas_lote(
+        monto_prestamo=tramo["monto_prestamo"],
+        tem=tramo["tem"],
+        total_cuotas=tramo["total_cuotas"],
+        tipo_gracia=tramo["tipo_gracia"],
+        meses_gracia=tramo["meses_gracia"],
+        seguro_desgravamen_porc=p["seguro_desgravamen_porc"],
+        seguro_riesgo_mensual=p["seguro_riesgo_mensual"],
+        gastos=p["gastos"],
+        meses=np.arange(desde - inicio, hasta - inicio),
+    )
+    columnas["n"] = np.where(columnas["n"] > 0, columnas["n"] + inicio, 0)
+    return columnas, float(cuota_referencial[0])
+
+
+def _unir_columnas(bloques: list) -> dict:
+    if not bloques:
+        return {c: np.zeros((1, 0)) for c in COLUMNAS_CRONOGRAMA}
+    return {c: np.concatenate([b[c] for b in bloques], axis=1) for c in COLUMNAS_CRONOGRAMA}
+
+
+def _cambiar_tramo(tramos: list, p: dict, mes: int, **cambios) -> float:
+    """
+    Corta el último tramo al cierre de la cuota `mes` y agrega el que lo
+    continúa desde ahí con el saldo de ese momento, el mismo fin y los
+    `cambios` indicados (la cuota se recalcula). Devuelve el saldo al corte.
+    """
+    tramo = tramos[-1]
+    fin = tramo["fin"]
+    if mes == tramo["inicio"]:
+        # El tramo empieza justo ahí: se reemplaza
+        tramos.pop()
+        saldo = tramo["monto_prestamo"]
+    else:
+        columnas, _ = _columnas_tramo(tramo, p, mes - 1, mes)
+        saldo = float(columnas["saldo_final"][0, 0])
+        tramo["fin"] = mes
+    tramos.append(dict(
+        tramo,
+        inicio=mes,
+        fin=fin,
+        monto_prestamo=saldo,
+        total_cuotas=fin - mes,
+        meses_gracia=max(tramo["meses_gracia"] - (mes - tramo["inicio"]), 0),
+        **cambios,
+    ))
+    return saldo
+
+
+def _tramos_de_tasa(p: dict, tasas: list) -> list:
+    tramos = [_tramo_inicial(p, tasas[0][1])]
+    for mes, tem in tasas[1:]:
+        _cambiar_tramo(tramos, p, mes, tem=tem)
+    return tramos
+
+
+def calcular_columnas_tramos(p: dict, tasas: list):
+    """
+    Cronograma de un escenario con tasa por tramos (`tasas` de
+    tasas_por_tramo; `p` con los parámetros de calcular_columnas_lote como
+    escalares). En cada cambio de tasa la cuota se recalcula sobre el saldo y
+    el plazo restantes; el periodo de gracia se respeta aunque cruce tramos.
+    La cuota referencial es la del tramo donde empieza la fase normal.
+
+    Devuelve (columnas de 1 x total_cuotas, cuota_mensual_referencial).
+    """
+    tramos = _tramos_de_tasa(p, tasas)
+    inicio_normal = tramos[0]["meses_gracia"]
+    bloques = []
+    cuota_referencial = 0.0
+    for tramo in tramos:
+        columnas, referencial = _columnas_tramo(tramo, p, tramo["inicio"], tramo["fin"])
+        bloques.append(columnas)
+        if tramo["inicio"] <= inicio_normal < tramo["fin"]:
+            cuota_referencial = referencial
+    return _unir_columnas(bloques), cuota_referencial
+
+
+def _columnas_cotizacion(p: dict, tasas: list, desde: int, hasta: int) -> dict:
+    """Meses `desde`..`hasta`-1 (base 0) del cronograma original de un escenario"""
+    if len(tasas) == 1:
+        columnas, _ = calcular_columnas_lote(**dict(p, tem=tasas[0][1]), meses=np.arange(desde, hasta))
+        return columnas
+    return _unir_columnas([
+        _columnas_tramo(t, p, max(t["inicio"], desde), min(t["fin"], hasta))[0]
+        for t in _tramos_de_tasa(p, tasas) if t["inicio"] < hasta and t["fin"] > desde
+    ])
+
+
+def _parametros_guardada(cotizacion):
+    """(parámetros escalares, tasas por tramo) de una cotización guardada"""
+    p = {k: v[0] for k, v in parametros_cotizaciones_guardadas([cotizacion]).items()}
+    tramos_tasa = getattr(cotizacion, "tramos_tasa", None)
+    tasas = tasas_por_tramo(
+        cotizacion.tipo_tasa, cotizacion.valor_tasa, cotizacion.capitalizacion,
+        json.loads(tramos_tasa) if tramos_tasa else None, int(p["total_cuotas"]),
+    )
+    return p, tasas
+
+
+# ============================================================
+# Abonos extraordinarios (prepagos)
+# ============================================================
+
+ABONO_REDUCIR_PLAZO = "reducir_plazo"
+ABONO_REDUCIR_CUOTA = "reducir_cuota"
+MODALIDADES_ABONO = (ABONO_REDUCIR_PLAZO, ABONO_REDUCIR_CUOTA)
+
+
+def cuota_francesa(saldo: float, tem: float, meses: int) -> float:
+    """Cuota constante que amortiza `saldo` en `meses` a la tasa `tem`"""
+    if meses <= 0 or saldo <= 0:
+        return 0.0
+    if tem == 0:
+        return saldo / meses
+    potencia = (1 + tem) ** meses
+    return saldo * tem * potencia / (potencia - 1)
+
+
+def _saldo_tras_gracia(tramo: dict) -> float:
+    if tramo["tipo_gracia"] == GRACIA_TOTAL:
+        return tramo["monto_prestamo"] * (1 + tramo["tem"]) ** tramo["meses_gracia"]
+    return tramo["monto_prestamo"]
+
+
+def _meses_para_cancelar(saldo: float, tem: float, cuota: float) -> int:
+    """Meses que toma cancelar `saldo` pagando `cuota` (sin pasar del entero necesario)"""
+    if saldo <= 0:
+        return 0
+    if tem == 0:
+        return int(np.ceil(saldo / cuota - 1e-9))
+    return int(np.ceil(np.log(cuota / (cuota - saldo * tem)) / np.log(1 + tem) - 1e-9))
+
+
+def simular_abonos(cotizacion, abonos: list[dict]) -> dict:
+    """
+    Aplica abonos extraordinarios ({"mes", "monto", "modalidad"}) a una
+    cotización guardada. El abono del mes k se paga junto con la cuota k y
+    reduce el saldo final de ese mes; desde k+1 el préstamo sigue como un
+    nuevo tramo:
+      - reducir_plazo: se mantiene la cuota y se acorta el plazo
+      - reducir_cuota: se mantiene el plazo y se recalcula la cuota
+    Los cambios de tasa de la cotización (tramos_tasa) se aplican igual que
+    en el cronograma original.
+
+    Cada saldo sale de la fórmula cerrada del tramo vigente, así que sólo se
+    generan los meses desde el primer abono. La TCEA necesita el flujo
+    completo: las cuotas previas se toman del cronograma original en columnas.
+
+    Lanza ValueError si un abono no es válido.
+    """
+    p, tasas = _parametros_guardada(cotizacion)
+    plazo_original = int(p["total_cuotas"])
+
+    for abono in abonos:
+        if abono["modalidad"] not in MODALIDADES_ABONO:
+            raise ValueError(f"Modalidad de abono inválida: use {' o '.join(MODALIDADES_ABONO)}")
+        if abono["monto"] <= 0:
+            raise ValueError("El monto del abono debe ser mayor que cero")
+
+    # Cambios de tasa y abonos en orden; en el mismo mes, primero la tasa
+    eventos = sorted(
+        [(mes, 0, {"tem": tem}) for mes, tem in tasas[1:]]
+        + [(a["mes"], 1, a) for a in abonos],
+        key=lambda e: e[:2],
+    )
+    tramos = [_tramo_inicial(p, tasas[0][1])]
+    aplicados = []
+    for mes, es_abono, evento in eventos:
+        fin = tramos[-1]["fin"]
+        if not es_abono:
+            if mes < fin:
+                _cambiar_tramo(tramos, p, mes, tem=evento["tem"])
+            continue
+        if not 1 <= mes < fin:
+            raise ValueError(f"El abono del mes {mes} debe caer entre la cuota 1 y la {fin - 1}")
+
+        vigente = tramos[-1]
+        saldo = _cambiar_tramo(tramos, p, mes)
+        nuevo = tramos[-1]
+        aplicado = min(evento["monto"], saldo)
+        nuevo["monto_prestamo"] = saldo - aplicado
+        if nuevo["monto_prestamo"] <= 0.005:
+            # Cancelación total
+            nuevo["monto_prestamo"] = 0.0
+            nuevo["total_cuotas"] = 0
+        elif evento["modalidad"] == ABONO_REDUCIR_PLAZO:
+            # La cuota del tramo vigente se mantiene; el plazo es el entero
+            # necesario para cancelar (la cuota se recalcula y queda igual o menor)
+            cuota = cuota_francesa(
+                _saldo_tras_gracia(vigente), vigente["tem"], vigente["total_cuotas"] - vigente["meses_gracia"]
+            )
+            if cuota > 0:
+                gracia = nuevo["meses_gracia"]
+                meses = _meses_para_cancelar(_saldo_tras_gracia(nuevo), nuevo["tem"], cuota)
+                nuevo["total_cuotas"] = gracia + min(meses, nuevo["total_cuotas"] - gracia)
+        nuevo["fin"] = mes + nuevo["total_cuotas"]
+        aplicados.append({
+            "mes": mes,
+            "modalidad": evento["modalidad"],
+            "monto_solicitado": round(evento["monto"], 2),
+            "monto_aplicado": round(aplicado, 2),
+            "saldo_antes": round(saldo, 2),
+            "saldo_despues": round(saldo - aplicado, 2),
+        })
+
+    # Meses afectados: desde la cuota siguiente al primer abono
+    desde = aplicados[0]["mes"] if aplicados else plazo_original
+    plazo_nuevo = tramos[-1]["fin"]
+    columnas = _unir_columnas([
+        _columnas_tramo(t, p, max(t["inicio"], desde), t["fin"])[0] for t in tramos if t["fin"] > desde
+    ])
+    previas = _columnas_cotizacion(p, tasas, 0, desde)
+    originales = _columnas_cotizacion(p, tasas, desde, plazo_original)
 
-    van = npf.npv(tem, flujo_caja)
+    # Flujo del cliente: cuotas + abonos
+    cuotas = np.concatenate((previas["cuota_total"][0], columnas["cuota_total"][0]))
+    for a in aplicados:
+        cuotas[a["mes"] - 1] += a["monto_aplicado"]
+    tir_mensual, tcea, _, convergio = indicadores_lote(p["monto_prestamo"], p["tem"], cuotas[None, :])
+    if not convergio[0]:
+        raise solver_tcea.TIRNoConvergeError(MENSAJE_SIN_TIR)
 
+    ultimo = aplicados[-1]["mes"] if aplicados else desde
+    interes_original = float(originales["interes"].sum())
+    interes_nuevo = float(columnas["interes"].sum())
     return {
-        "monto_prestamo": round(monto_prestamo, 2),
-        "cuota_mensual_referencial": round(cuota_mensual_referencial, 2),
-        "tcea": round(tcea * 100, 7),
-        "van": round(van, 2),
-        "tir": round(tir_mensual * 100, 7),
-        "cronograma": cronograma 
-    }
\ No newline at end of file
+        "cotizacion_id": cotizacion.id,
+        "plazo_original": plazo_original,
+        "plazo_nuevo": plazo_nuevo,
+        # Primera cuota después del último abono
+        "cuota_mensual_nueva": round(float(columnas["cuota_total"][0, ultimo - desde]), 2) if plazo_nuevo > ultimo else 0.0,
+        "tcea_original": cotizacion.tcea,
+        "tcea_nueva": round(float(tcea[0]) * 100, 7),
+        "interes_original": round(interes_original, 2),
+        "interes_nuevo": round(interes_nuevo, 2),
+        "interes_ahorrado": round(interes_original - interes_nuevo, 2),
+        "abonos": aplicados,
+        "desde": desde + 1,
+        "cronograma": columnas_a_cronograma(columnas),
+    }
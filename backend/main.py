@@ -1,19 +1,149 @@
 # backend/main.py   (antes lo llamaste schemas.py, pero este es tu archivo principal)
 
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import BackgroundTasks, FastAPI, Depends, File, HTTPException, Request, Response, UploadFile, status
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from datetime import date, datetime
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from database import engine, Base, get_db
-import models, schemas, crud, logic, auth_utils
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import engine, async_engine, Base, SessionLocal, get_async_db
+import models, schemas, crud, crud_async, logic, auth_utils, migraciones, exportar, importar, escritura_diferida, analitica, metricas, estres, proyeccion, asequibilidad
+import numpy as np
+import asyncio
+import contextvars
+import functools
 import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from cache import cache_cotizaciones
+from escritura_diferida import escritor_diferido
+from pool_hashing import pool_hashing, latencia_login
 from fastapi.middleware.cors import CORSMiddleware
+from compresion import CompresionMiddleware
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json de la librería estándar
+    orjson = None
 
 # ============================================================
 # Inicializar BD
 # ============================================================
 Base.metadata.create_all(bind=engine)
+migraciones.agregar_columnas_faltantes(engine)
+migraciones.corregir_fk_vendedor(engine)
+migraciones.crear_indices_faltantes(engine, Base.metadata)
+
+# ============================================================
+# Pool para el cálculo financiero
+# ============================================================
+# El cálculo (NumPy) es CPU: corre fuera del event loop para que un
+# cronograma largo no frene a los demás requests.
+CALCULO_WORKERS = int(os.getenv("CALCULO_WORKERS", str(os.cpu_count() or 1)))
+executor_calculo = ThreadPoolExecutor(max_workers=CALCULO_WORKERS, thread_name_prefix="calculo")
+
+
+async def en_executor_calculo(funcion, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # Con el contexto del request: los spans del cálculo van a su desglose
+    contexto = contextvars.copy_context()
+    return await loop.run_in_executor(
+        executor_calculo, functools.partial(contexto.run, funcion, *args, **kwargs)
+    )
+
+
+def _sincronizar_proyeccion():
+    with SessionLocal() as db:
+        proyeccion.sincronizar(db)
+
+
+def _marcar_pruebas_interrumpidas():
+    with SessionLocal() as db:
+        estres.marcar_interrumpidas(db)
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    # Almacén de flujos desfasado de la BD (BD recreada, registros perdidos)
+    await asyncio.to_thread(_sincronizar_proyeccion)
+    # Pruebas de estrés que quedaron en curso al caerse la corrida anterior
+    await asyncio.to_thread(_marcar_pruebas_interrumpidas)
+    # Cotizaciones que no se pudieron guardar en la corrida anterior
+    await escritor_diferido.reintentar_fallidas()
+    if escritura_diferida.ESCRITURA_DIFERIDA:
+        escritor_diferido.iniciar()
+    yield
+    # Guarda las cotizaciones pendientes antes de cerrar las conexiones
+    await escritor_diferido.detener()
+    await asyncio.to_thread(proyeccion.esperar_registros)
+    # Cierra las conexiones async (aiosqlite mantiene un hilo por conexión)
+    await async_engine.dispose()
+    executor_calculo.shutdown(wait=False)
+    estres.cerrar_pool()
+
 
-app = FastAPI(title="API Inmobiliaria - Crédito MiVivienda")
+class RespuestaJSON(JSONResponse):
+    """
+    JSONResponse con orjson (si está instalado) que mide la serialización
+    como una fase más.
+    """
+
+    def render(self, content) -> bytes:
+        with metricas.medir("serializacion_json"):
+            if orjson is not None:
+                return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+            return super().render(content)
+
+
+app = FastAPI(
+    title="API Inmobiliaria - Crédito MiVivienda",
+    lifespan=ciclo_de_vida,
+    default_response_class=RespuestaJSON,
+)
+
+# ============================================================
+# Métricas (latencia por ruta, consultas a la BD, spans)
+# ============================================================
+metricas.instrumentar_engine(engine)
+metricas.instrumentar_engine(async_engine.sync_engine)
+
+
+@app.middleware("http")
+async def medir_request(request: Request, call_next):
+    if not metricas.METRICAS_HABILITADAS:
+        return await call_next(request)
+    desglose = metricas.nuevo_desglose()
+    inicio = time.perf_counter()
+    estado = 500
+    try:
+        respuesta = await call_next(request)
+        estado = respuesta.status_code
+        return respuesta
+    finally:
+        # Plantilla de la ruta (no la URL) para no multiplicar las series
+        ruta = request.scope.get("route")
+        metricas.registrar_request(
+            request.method, ruta.path if ruta else "sin_ruta", estado,
+            time.perf_counter() - inicio, desglose,
+        )
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def exponer_metricas():
+    """Formato de texto de Prometheus"""
+    cache = cache_cotizaciones.estadisticas()
+    hashing = pool_hashing.metricas()
+    escritura = escritor_diferido.metricas()
+    extras = (
+        metricas.contador("cotizacion_cache_aciertos_total", "Aciertos de la caché de cotizaciones", cache["aciertos"])
+        + metricas.contador("cotizacion_cache_fallos_total", "Fallos de la caché de cotizaciones", cache["fallos"])
+        + metricas.gauge("cotizacion_cache_bytes", "Bytes de cronogramas en la caché", cache["bytes_cronogramas"])
+        + metricas.gauge("hashing_en_cola", "Requests esperando el pool de hashing", hashing["en_cola"])
+        + metricas.gauge("hashing_en_proceso", "Hashes en ejecución", hashing["en_proceso"])
+        + metricas.gauge("escritura_diferida_en_cola", "Cotizaciones pendientes de guardar", escritura["en_cola"])
+    )
+    return PlainTextResponse(metricas.exponer(extras), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # ============================================================
 # CORS para permitir conexión desde Angular
@@ -29,19 +159,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Metadatos de paginación de los listados
+    expose_headers=["X-Siguiente-Cursor", "X-Total-Aproximado"],
 )
 
+# gzip / brotli para respuestas grandes (cronogramas, lotes, listados)
+app.add_middleware(CompresionMiddleware)
+
 # ============================================================
 # Seguridad - Token OAuth2
 # ============================================================
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = auth_utils.decode_access_token(token, db)
+    user = await auth_utils.decode_access_token(token, db)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -56,52 +191,72 @@ def get_current_user(
 # ============================================================
 
 @app.post("/api/registrar-usuario", tags=["Seguridad"])
-def registrar_agente(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    if crud.get_cuenta_agente_by_email(db, user.email):
+async def registrar_agente(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await crud_async.get_cuenta_agente_by_email(db, user.email):
         raise HTTPException(status_code=400, detail="Email ya registrado")
-    nueva = crud.create_cuenta_agente(db, username=user.username, email=user.email, plain_password=user.password)
+    # El hash corre en el pool de hashing, no en el threadpool de la API
+    hashed = await auth_utils.get_password_hash_async(user.password)
+    nueva = await crud_async.create_cuenta_agente(
+        db, username=user.username, email=user.email, hashed_password=hashed
+    )
     return {"id": nueva.id, "username": nueva.username, "email": nueva.email}
 
 
 @app.post("/api/usuarios", tags=["Usuarios"])
-def crear_usuario_interno(
+async def crear_usuario_interno(
     user_data: schemas.UserCreate,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crea un NUEVO USUARIO INTERNO (solo agentes autenticados)"""
-    if crud.get_user_by_email(db, user_data.email):
+    if await crud_async.get_user_by_email(db, user_data.email):
         raise HTTPException(status_code=400, detail="Email ya existe en usuarios")
-    
-    nuevo_usuario = crud.create_user(db, user_data)
+
+    hashed = await auth_utils.get_password_hash_async(user_data.password)
+    nuevo_usuario = await crud_async.create_user(
+        db, username=user_data.username, email=user_data.email, hashed_password=hashed
+    )
     return {"id": nuevo_usuario.id, "username": nuevo_usuario.username, "email": nuevo_usuario.email}
 
 
 @app.post("/token", response_model=schemas.Token, tags=["Seguridad"])
-def login_para_token(
+async def login_para_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Login con EMAIL y PASSWORD"""
-    # El frontend envía el email en form_data.username (estándar OAuth2)
-    user = crud.get_cuenta_agente_by_email(db, form_data.username)
+    inicio = time.perf_counter()
+    try:
+        # El frontend envía el email en form_data.username (estándar OAuth2)
+        user = await crud_async.get_cuenta_agente_by_email(db, form_data.username)
 
-    if not user or not auth_utils.verify_password(form_data.password, user.password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Email o contraseña incorrectos",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        if not user or not await auth_utils.verify_password_async(form_data.password, user.password):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Email o contraseña incorrectos",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
 
-    # Token generado con EMAIL como identificador
-    access_token = auth_utils.create_access_token(data={"sub": user.email})
-    
-    # Devolver el token + el username para mostrar en UI
+        # Token generado con EMAIL como identificador
+        access_token = auth_utils.create_access_token(data={"sub": user.email})
+
+        # Devolver el token + el username para mostrar en UI
+        return {
+            "access_token": access_token,
+            "token_type": "bearer",
+            "username": user.username,  # <-- Para mostrar en dashboard
+            "email": user.email
+        }
+    finally:
+        latencia_login.registrar(time.perf_counter() - inicio)
+
+
+@app.get("/api/seguridad/metricas", tags=["Seguridad"])
+async def metricas_login(current_user: models.Usuario = Depends(get_current_user)):
+    """Latencia de /token y estado de la cola del pool de hashing"""
     return {
-        "access_token": access_token, 
-        "token_type": "bearer",
-        "username": user.username,  # <-- Para mostrar en dashboard
-        "email": user.email
+        "login": latencia_login.resumen(),
+        "pool_hashing": pool_hashing.metricas(),
     }
 
 
@@ -110,22 +265,58 @@ def login_para_token(
 # ============================================================
 
 @app.post("/api/clientes", response_model=schemas.ClienteResponse, tags=["Gestión"])
-def crear_cliente(
+async def crear_cliente(
     cliente: schemas.ClienteCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
-    return crud.create_cliente(db=db, cliente=cliente)
+    return await crud_async.create_cliente(db=db, cliente=cliente)
+
+
+MAX_POR_PAGINA = 1000
+
+
+async def _paginar(response: Response, db, modelo, filas, limit, condiciones, con_total):
+    """
+    El cuerpo sigue siendo la lista de filas; el cursor de la página
+    siguiente y el total aproximado van en headers.
+    """
+    if len(filas) == limit:
+        response.headers["X-Siguiente-Cursor"] = str(filas[-1].id)
+    if con_total:
+        total = await crud_async.contar_aproximado(db, modelo, condiciones)
+        response.headers["X-Total-Aproximado"] = str(total)
+    return filas
+
+
+def _validar_limite(limit: int):
+    if not 1 <= limit <= MAX_POR_PAGINA:
+        raise HTTPException(status_code=422, detail=f"limit debe estar entre 1 y {MAX_POR_PAGINA}")
 
 
 @app.get("/api/clientes", response_model=list[schemas.ClienteResponse], tags=["Gestión"])
-def listar_clientes(
+async def listar_clientes(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    despues_de: int | None = None,
+    calificacion_sentinel: str | None = None,
+    ingreso_min: float | None = None,
+    ingreso_max: float | None = None,
+    con_total: bool = False,
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
-    return crud.get_clientes(db, skip=skip, limit=limit)
+    """
+    Paginación por cursor: pasar en `despues_de` el valor del header
+    X-Siguiente-Cursor de la página anterior.
+    """
+    _validar_limite(limit)
+    condiciones = crud_async.filtros_cliente(calificacion_sentinel, ingreso_min, ingreso_max)
+    filas = await crud_async.get_clientes(
+        db, skip=skip, limit=limit, despues_de=despues_de, condiciones=condiciones
+    )
+    return await _paginar(response, db, models.Cliente, filas, limit, condiciones, con_total)
 
 
 # ============================================================
@@ -133,79 +324,368 @@ def listar_clientes(
 # ============================================================
 
 @app.post("/api/inmuebles", response_model=schemas.InmuebleResponse, tags=["Gestión"])
-def crear_inmueble(
+async def crear_inmueble(
     inmueble: schemas.InmuebleCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
-    return crud.create_inmueble(db=db, inmueble=inmueble)
+    return await crud_async.create_inmueble(db=db, inmueble=inmueble)
 
 
 @app.get("/api/inmuebles", response_model=list[schemas.InmuebleResponse], tags=["Gestión"])
-def listar_inmuebles(
+async def listar_inmuebles(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    despues_de: int | None = None,
+    estado: str | None = None,
+    moneda_venta: str | None = None,
+    codigo_proyecto: str | None = None,
+    precio_min: float | None = None,
+    precio_max: float | None = None,
+    con_total: bool = False,
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
-    return crud.get_inmuebles(db, skip=skip, limit=limit)
+    """Misma paginación por cursor que /api/clientes"""
+    _validar_limite(limit)
+    condiciones = crud_async.filtros_inmueble(estado, moneda_venta, codigo_proyecto, precio_min, precio_max)
+    filas = await crud_async.get_inmuebles(
+        db, skip=skip, limit=limit, despues_de=despues_de, condiciones=condiciones
+    )
+    return await _paginar(response, db, models.Inmueble, filas, limit, condiciones, con_total)
 
 
 # ============================================================
 # 4. MOTOR DE COTIZACIÓN (Protegido)
 # ============================================================
 
-@app.post("/api/cotizar", response_model=schemas.CotizacionResponse, tags=["Cotización"])
-def generar_cotizacion(
+# Formatos del cronograma en la respuesta:
+#   json     -> cronograma_json, texto JSON (formato original)
+#   lista    -> cronograma, lista de cuotas
+#   columnas -> cronograma_columnas, un arreglo por campo
+FORMATOS_CRONOGRAMA = ("json", "lista", "columnas")
+
+
+def _validar_formato_cronograma(formato: str):
+    if formato not in FORMATOS_CRONOGRAMA:
+        raise HTTPException(status_code=422, detail="formato_cronograma inválido: use 'json', 'lista' o 'columnas'")
+
+
+def _cotizacion_salida(id_, fecha_cotizacion, valores: dict, cronograma: list, formato: str, incluir: bool) -> dict:
+    """Cotización lista para serializar, con el cronograma en el formato pedido"""
+    salida = schemas.CotizacionMetricas(
+        id=id_, fecha_cotizacion=fecha_cotizacion, **valores
+    ).model_dump(mode="json")
+    if not incluir:
+        return salida
+    if formato == "lista":
+        salida["cronograma"] = cronograma
+    elif formato == "columnas":
+        salida["cronograma_columnas"] = {c: [cuota[c] for cuota in cronograma] for c in logic.COLUMNAS_CRONOGRAMA}
+    else:
+        salida["cronograma_json"] = json.dumps(cronograma)
+    return salida
+
+
+@app.post(
+    "/api/cotizar",
+    response_model=schemas.CotizacionResponse | schemas.CotizacionEstructurada,
+    tags=["Cotización"],
+)
+async def generar_cotizacion(
     datos: schemas.CotizacionInput,
-    db: Session = Depends(get_db),
+    formato_cronograma: str = "json",
+    incluir_cronograma: bool = True,
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
+    """
+    `formato_cronograma`: json (texto, formato original), lista o columnas.
+    Con `incluir_cronograma=false` sólo se devuelven los indicadores.
+    """
+    _validar_formato_cronograma(formato_cronograma)
+
     # validar existencia
-    cliente = db.query(models.Cliente).filter(models.Cliente.id == datos.cliente_id).first()
-    inmueble = db.query(models.Inmueble).filter(models.Inmueble.id == datos.inmueble_id).first()
+    cliente = await db.get(models.Cliente, datos.cliente_id)
+    inmueble = await db.get(models.Inmueble, datos.inmueble_id)
 
     if not cliente or not inmueble:
         raise HTTPException(status_code=404, detail="Cliente o inmueble no encontrados")
 
-    # ejecutar cálculo financiero
-    resultado_calculo = logic.calcular_cotizacion(datos)
+    # Libera la conexión mientras dura el cálculo
+    await db.close()
 
-    # cronograma en JSON
-    cronograma_str = json.dumps(resultado_calculo["cronograma"])
+    # ejecutar cálculo financiero (fuera del event loop)
+    try:
+        resultado_calculo = await en_executor_calculo(cache_cotizaciones.calcular, datos)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
     # crear objeto cotización
-    nueva_cotizacion = models.Cotizacion(
-        vendedor_id=current_user.id,
-        cliente_id=datos.cliente_id,
-        inmueble_id=datos.inmueble_id,
-        moneda_prestamo=datos.moneda_prestamo,
-        precio_final_inmueble=datos.precio_final_inmueble,
-        porcentaje_cuota_inicial=datos.porcentaje_cuota_inicial,
-        monto_cuota_inicial=datos.precio_final_inmueble * (datos.porcentaje_cuota_inicial / 100),
-        monto_bono_buen_pagador=datos.monto_bono_buen_pagador,
-        monto_prestamo=resultado_calculo["monto_prestamo"],
-        tipo_tasa=datos.tipo_tasa,
-        valor_tasa=datos.valor_tasa,
-        capitalizacion=datos.capitalizacion,
-        plazo_meses=datos.plazo_anios * 12,
-        tipo_periodo_gracia=datos.tipo_periodo_gracia,
-        meses_gracia=datos.meses_gracia,
-        seguro_desgravamen_porc=datos.seguro_desgravamen_porc,
-        seguro_riesgo_porc=datos.seguro_riesgo_porc,
-        gastos_administrativos=datos.gastos_administrativos,
-        tcea=resultado_calculo["tcea"],
-        van=resultado_calculo["van"],
-        tir=resultado_calculo["tir"],
-        cuota_mensual_referencial=resultado_calculo["cuota_mensual_referencial"],
-        cronograma_json=cronograma_str
-    )
-
-    db.add(nueva_cotizacion)
-    db.commit()
-    db.refresh(nueva_cotizacion)
-
-    return nueva_cotizacion
+    valores = await en_executor_calculo(
+        crud.cotizacion_valores, datos, resultado_calculo, vendedor_id=current_user.id
+    )
+    if escritura_diferida.ESCRITURA_DIFERIDA:
+        # Se responde con el ID reservado; el escritor la guarda en su lote
+        [id_reservado] = await escritor_diferido.ids.reservar(db)
+        pendiente = dict(valores, id=id_reservado, fecha_cotizacion=datetime.utcnow())
+        # Sin conexión tomada: si la cola está llena se espera sin bloquear al escritor
+        await db.close()
+        await escritor_diferido.encolar(pendiente)
+        nueva_cotizacion = models.Cotizacion(**pendiente)
+    else:
+        nueva_cotizacion = await crud_async.create_cotizacion(db, valores)
+
+    # Se arma y serializa una sola vez (sin revalidar el cronograma con Pydantic)
+    return RespuestaJSON(_cotizacion_salida(
+        nueva_cotizacion.id, nueva_cotizacion.fecha_cotizacion, valores,
+        resultado_calculo["cronograma"], formato_cronograma, incluir_cronograma,
+    ))
+
+
+MAX_COTIZACIONES_LOTE = 500
+
+
+@app.post("/api/cotizar/lote", response_model=schemas.CotizacionLoteResponse, tags=["Cotización"])
+async def generar_cotizaciones_lote(
+    lote: list[schemas.CotizacionInput],
+    formato_cronograma: str = "json",
+    incluir_cronograma: bool = True,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """
+    Calcula y guarda varias cotizaciones en una sola llamada.
+    Los errores de cada escenario se reportan sin cancelar el lote.
+    `formato_cronograma` e `incluir_cronograma` como en /api/cotizar.
+    """
+    _validar_formato_cronograma(formato_cronograma)
+    if len(lote) > MAX_COTIZACIONES_LOTE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El lote admite como máximo {MAX_COTIZACIONES_LOTE} cotizaciones",
+        )
+
+    # validar existencia (una consulta por tabla)
+    clientes = await crud_async.get_ids_existentes(db, models.Cliente, (d.cliente_id for d in lote))
+    inmuebles = await crud_async.get_ids_existentes(db, models.Inmueble, (d.inmueble_id for d in lote))
+
+    errores = {}
+    validos = []
+    for i, datos in enumerate(lote):
+        if datos.cliente_id not in clientes or datos.inmueble_id not in inmuebles:
+            errores[i] = "Cliente o inmueble no encontrados"
+        else:
+            validos.append(i)
+
+    # ejecutar cálculo financiero de todos los escenarios en una pasada
+    resultados, errores_calculo = await en_executor_calculo(
+        logic.calcular_cotizaciones_lote, [lote[i] for i in validos]
+    )
+    for j, mensaje in errores_calculo.items():
+        errores[validos[j]] = mensaje
+
+    calculados = [(i, r) for i, r in zip(validos, resultados) if r is not None]
+    filas = await en_executor_calculo(lambda: [
+        crud.cotizacion_valores(lote[i], resultado, vendedor_id=current_user.id)
+        for i, resultado in calculados
+    ])
+    if escritura_diferida.ESCRITURA_DIFERIDA:
+        # IDs del mismo asignador, para no chocar con los encolados
+        ids = await escritor_diferido.ids.reservar(db, len(filas))
+        creadas = await crud_async.create_cotizaciones(
+            db, [dict(fila, id=id_) for fila, id_ in zip(filas, ids)]
+        )
+    else:
+        creadas = await crud_async.create_cotizaciones(db, filas)
+
+    items = {i: {"indice": i, "cotizacion": None, "error": mensaje} for i, mensaje in errores.items()}
+    for (i, resultado), fila, creada in zip(calculados, filas, creadas):
+        items[i] = {
+            "indice": i,
+            "cotizacion": _cotizacion_salida(
+                creada.id, creada.fecha_cotizacion, fila,
+                resultado["cronograma"], formato_cronograma, incluir_cronograma,
+            ),
+            "error": None,
+        }
+
+    return RespuestaJSON({
+        "total": len(lote),
+        "exitosas": len(creadas),
+        "fallidas": len(errores),
+        "resultados": [items[i] for i in range(len(lote))],
+    })
+
+
+MAX_CELDAS_SENSIBILIDAD = 20000
+
+
+@app.post("/api/cotizar/sensibilidad", response_model=schemas.SensibilidadResponse, tags=["Cotización"])
+async def calcular_sensibilidad(
+    datos: schemas.SensibilidadInput,
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """
+    Grilla de cuota referencial, TCEA e interés total para cada combinación
+    de tasa, plazo y cuota inicial. No guarda ninguna cotización.
+    """
+    tasas = datos.valores_tasa or [datos.base.valor_tasa]
+    plazos = datos.plazos_anios or [datos.base.plazo_anios]
+    iniciales = datos.porcentajes_cuota_inicial or [datos.base.porcentaje_cuota_inicial]
+
+    if min(plazos) <= 0:
+        raise HTTPException(status_code=422, detail=logic.MENSAJE_PLAZO_INVALIDO)
+    if datos.base.tramos_tasa:
+        raise HTTPException(status_code=422, detail="La sensibilidad no admite tasa por tramos")
+    celdas = len(tasas) * len(plazos) * len(iniciales)
+    if celdas > MAX_CELDAS_SENSIBILIDAD:
+        raise HTTPException(
+            status_code=400,
+            detail=f"La grilla admite como máximo {MAX_CELDAS_SENSIBILIDAD} combinaciones",
+        )
+
+    grilla = await en_executor_calculo(logic.calcular_sensibilidad, datos.base, tasas, plazos, iniciales)
+
+    return {
+        "valores_tasa": tasas,
+        "plazos_anios": plazos,
+        "porcentajes_cuota_inicial": iniciales,
+        "cuota_mensual_referencial": grilla["cuota_mensual_referencial"].tolist(),
+        # NaN no es JSON válido: las celdas sin TIR van como null
+        "tcea": [
+            [[None if np.isnan(v) else v for v in fila] for fila in plano]
+            for plano in grilla["tcea"].tolist()
+        ],
+        "interes_total": grilla["interes_total"].tolist(),
+    }
+
+
+@app.get("/api/cotizar/cache", response_model=schemas.CacheEstadisticas, tags=["Cotización"])
+async def estadisticas_cache(current_user: models.Usuario = Depends(get_current_user)):
+    """Aciertos, fallos y desalojos de la caché de cotizaciones"""
+    return cache_cotizaciones.estadisticas()
+
+
+@app.delete("/api/cotizar/cache", response_model=schemas.CacheEstadisticas, tags=["Cotización"])
+async def limpiar_cache(current_user: models.Usuario = Depends(get_current_user)):
+    """Vacía la caché de cotizaciones (los contadores se mantienen)"""
+    cache_cotizaciones.limpiar()
+    return cache_cotizaciones.estadisticas()
+
+
+@app.get("/api/cotizar/escritura", tags=["Cotización"])
+async def metricas_escritura(current_user: models.Usuario = Depends(get_current_user)):
+    """Profundidad de la cola y latencia de los lotes de la escritura diferida"""
+    return escritor_diferido.metricas()
+
+
+@app.get("/api/cotizaciones", response_model=list[schemas.CotizacionResumen], tags=["Cotización"])
+async def listar_cotizaciones(
+    response: Response,
+    limit: int = 100,
+    antes_de: int | None = None,
+    vendedor_id: int | None = None,
+    cliente_id: int | None = None,
+    inmueble_id: int | None = None,
+    fecha_desde: date | None = None,
+    fecha_hasta: date | None = None,
+    con_total: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """
+    Historial de cotizaciones, de la más reciente a la más antigua, sin
+    cronograma. Para la página siguiente pasar en `antes_de` el header
+    X-Siguiente-Cursor.
+    """
+    _validar_limite(limit)
+    condiciones = crud_async.filtros_cotizacion(vendedor_id, cliente_id, inmueble_id, fecha_desde, fecha_hasta)
+    filas = await crud_async.get_cotizaciones_resumen(db, limit=limit, antes_de=antes_de, condiciones=condiciones)
+    resumen = [
+        schemas.CotizacionResumen(
+            **fila,
+            cliente=" ".join(p for p in (fila["cliente_nombres"], fila["cliente_apellidos"]) if p) or None,
+        )
+        for fila in filas
+    ]
+    return await _paginar(response, db, models.Cotizacion, resumen, limit, condiciones, con_total)
+
+
+CUOTAS_POR_PAGINA = 60
+
+
+@app.get(
+    "/api/cotizaciones/{cotizacion_id}/cronograma",
+    response_model=schemas.CronogramaPaginaResponse,
+    tags=["Cotización"],
+)
+async def ver_cronograma(
+    cotizacion_id: int,
+    desde: int = 1,
+    hasta: int | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """
+    Cuotas `desde`..`hasta` de una cotización, regeneradas desde sus
+    parámetros (no se lee ni se parsea el cronograma completo).
+    """
+    cotizacion = escritor_diferido.pendiente(cotizacion_id) or await crud_async.get_cotizacion(db, cotizacion_id)
+    if not cotizacion:
+        raise HTTPException(status_code=404, detail="Cotización no encontrada")
+
+    total = cotizacion.plazo_meses
+    if hasta is None:
+        hasta = min(desde + CUOTAS_POR_PAGINA - 1, total)
+    if desde < 1 or hasta < desde or hasta > total:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Rango de cuotas inválido: debe cumplirse 1 <= desde <= hasta <= {total}",
+        )
+
+    return {
+        "cotizacion_id": cotizacion.id,
+        "total_cuotas": total,
+        "desde": desde,
+        "hasta": hasta,
+        "cuotas": await en_executor_calculo(logic.cronograma_cotizacion_guardada, cotizacion, desde, hasta),
+    }
+
+
+MAX_ABONOS = 120
+
+
+@app.post(
+    "/api/cotizaciones/{cotizacion_id}/abonos",
+    response_model=schemas.SimulacionAbonosResponse,
+    tags=["Cotización"],
+)
+async def simular_abonos(
+    cotizacion_id: int,
+    datos: schemas.SimulacionAbonosInput,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """
+    Qué pasa si el cliente hace abonos extraordinarios: nuevo cronograma
+    (desde el primer abono), TCEA e intereses ahorrados. No modifica la
+    cotización guardada.
+    """
+    if len(datos.abonos) > MAX_ABONOS:
+        raise HTTPException(status_code=422, detail=f"Máximo {MAX_ABONOS} abonos por simulación")
+
+    cotizacion = escritor_diferido.pendiente(cotizacion_id) or await crud_async.get_cotizacion(db, cotizacion_id)
+    if not cotizacion:
+        raise HTTPException(status_code=404, detail="Cotización no encontrada")
+    await db.close()
+
+    abonos = [a.model_dump() for a in datos.abonos]
+    try:
+        return await en_executor_calculo(logic.simular_abonos, cotizacion, abonos)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 
 # ============================================================
@@ -213,10 +693,352 @@ def generar_cotizacion(
 # ============================================================
 
 @app.put("/api/clientes/{cliente_id}", response_model=schemas.ClienteResponse, tags=["Gestión"])
-def actualizar_cliente(
+async def actualizar_cliente(
     cliente_id: int,
     cliente: schemas.ClienteCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    return await crud_async.update_cliente(db, cliente_id, cliente)
+
+
+# ============================================================
+# 5.1 IMPORTACIÓN MASIVA (CSV)
+# ============================================================
+
+@app.post("/api/importar/clientes", response_model=schemas.ImportacionResponse, tags=["Gestión"])
+async def importar_clientes(
+    archivo: UploadFile = File(...),
+    modo_dni: str = "omitir",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """
+    CSV con las columnas de ClienteCreate. `modo_dni`: 'omitir' u
+    'actualizar' los clientes cuyo DNI ya existe.
+    """
+    if modo_dni not in importar.MODOS_DNI:
+        raise HTTPException(status_code=422, detail="modo_dni inválido: use 'omitir' o 'actualizar'")
+    return await importar.importar_clientes(db, archivo.file, modo_dni=modo_dni)
+
+
+@app.post("/api/importar/inmuebles", response_model=schemas.ImportacionResponse, tags=["Gestión"])
+async def importar_inmuebles(
+    archivo: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """CSV con las columnas de InmuebleCreate"""
+    return await importar.importar_inmuebles(db, archivo.file)
+
+
+# ============================================================
+# 5.2 ANALÍTICA (lee sólo la tabla de resumen)
+# ============================================================
+
+async def _resumen_analitica(dimension: str, db: AsyncSession, fecha_desde, fecha_hasta):
+    filas = (await db.execute(analitica.consultar_resumen(dimension, fecha_desde, fecha_hasta))).mappings().all()
+    return [schemas.ResumenAnalitica(**fila) for fila in filas]
+
+
+@app.get("/api/analitica/vendedores", response_model=list[schemas.ResumenAnalitica], tags=["Analítica"])
+async def analitica_vendedores(
+    fecha_desde: date | None = None,
+    fecha_hasta: date | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """Cotizaciones, embudo de clientes y promedios por vendedor (clave = vendedor_id)"""
+    return await _resumen_analitica("vendedor", db, fecha_desde, fecha_hasta)
+
+
+@app.get("/api/analitica/proyectos", response_model=list[schemas.ResumenAnalitica], tags=["Analítica"])
+async def analitica_proyectos(
+    fecha_desde: date | None = None,
+    fecha_hasta: date | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """Mismo resumen por codigo_proyecto del inmueble"""
+    return await _resumen_analitica("proyecto", db, fecha_desde, fecha_hasta)
+
+
+# ============================================================
+# 5.3 PRUEBA DE ESTRÉS DE TASAS (Monte Carlo sobre la cartera)
+# ============================================================
+
+def _prueba_estres_respuesta(prueba: models.PruebaEstres, con_resultados: bool = True) -> dict:
+    return {
+        "id": prueba.id,
+        "fecha_creacion": prueba.fecha_creacion,
+        "estado": prueba.estado,
+        "parametros": json.loads(prueba.parametros),
+        "cotizaciones": prueba.cotizaciones,
+        "segundos": prueba.segundos,
+        "error": prueba.error,
+        "resultados": json.loads(prueba.resultados) if con_resultados and prueba.resultados else None,
+    }
+
+
+@app.post(
+    "/api/estres",
+    response_model=schemas.PruebaEstresResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Analítica"],
+)
+async def lanzar_prueba_estres(
+    datos: schemas.EstresInput,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """
+    Registra la prueba y la corre en segundo plano (pool de procesos).
+    Consultar el resultado con GET /api/estres/{id}. Responde 429 si ya
+    corren ESTRES_CORRIDAS_SIMULTANEAS pruebas.
+    """
+    if not estres.reservar_corrida():
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Hay una prueba de estrés en curso, intente más tarde",
+            headers={"Retry-After": "30"},
+        )
+    try:
+        prueba = estres.nueva_prueba(datos.model_dump())
+        db.add(prueba)
+        await db.commit()
+    except BaseException:
+        estres.liberar_corrida()
+        raise
+    background_tasks.add_task(estres.correr_prueba_reservada, prueba.id)
+    return _prueba_estres_respuesta(prueba, con_resultados=False)
+
+
+@app.get("/api/estres/{prueba_id}", response_model=schemas.PruebaEstresResponse, tags=["Analítica"])
+async def ver_prueba_estres(
+    prueba_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    prueba = await crud_async.get_prueba_estres(db, prueba_id)
+    if not prueba:
+        raise HTTPException(status_code=404, detail="Prueba de estrés no encontrada")
+    return _prueba_estres_respuesta(prueba)
+
+
+# ============================================================
+# 5.4 PROYECCIÓN DE FLUJOS (almacén columnar, ver proyeccion.py)
+# ============================================================
+
+def _mes_parametro(valor: str | None, nombre: str) -> int | None:
+    if valor is None:
+        return None
+    try:
+        return proyeccion.mes_calendario(datetime.strptime(valor, "%Y-%m"))
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"{nombre} debe tener el formato YYYY-MM")
+
+
+@app.get("/api/proyeccion/flujos", response_model=schemas.ProyeccionFlujosResponse, tags=["Analítica"])
+async def proyeccion_flujos(
+    codigo_proyecto: str | None = None,
+    moneda: str | None = None,
+    desde: str | None = None,
+    hasta: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """
+    Cobranza proyectada de la cartera por mes calendario (cuota total,
+    interés y amortización), filtrada por proyecto y/o moneda del préstamo.
+    """
+    if not proyeccion.PROYECCION_HABILITADA:
+        raise HTTPException(status_code=503, detail="La proyección de flujos está deshabilitada")
+    mes_desde = _mes_parametro(desde, "desde")
+    mes_hasta = _mes_parametro(hasta, "hasta")
+
+    inmuebles = None
+    if codigo_proyecto is not None:
+        inmuebles = await crud_async.get_ids_inmuebles(
+            db, crud_async.filtros_inmueble(codigo_proyecto=codigo_proyecto)
+        )
+    return await en_executor_calculo(
+        proyeccion.almacen_flujos.proyectar, inmuebles, moneda, mes_desde, mes_hasta
+    )
+
+
+# ============================================================
+# 5.5 ASEQUIBILIDAD (cuota / ingreso, sin guardar nada)
+# ============================================================
+
+def _validar_condiciones(condiciones: schemas.CondicionesFinanciamiento, limit: int) -> float:
+    """Devuelve el límite de cuota / ingreso a usar"""
+    _validar_limite(limit)
+    if condiciones.plazo_anios < 1:
+        raise HTTPException(status_code=422, detail=logic.MENSAJE_PLAZO_INVALIDO)
+    return condiciones.limite_cuota_ingreso or asequibilidad.LIMITE_CUOTA_INGRESO
+
+
+def _inmuebles_asequibles(cliente, filas, condiciones, limite, maximo) -> dict:
+    precios = np.fromiter((f.precio_venta for f in filas), dtype=np.float64, count=len(filas))
+    r = asequibilidad.inmuebles_asequibles(cliente.ingreso_mensual or 0.0, precios, condiciones, limite, maximo)
+    inmuebles = []
+    for i, posicion in enumerate(r["posiciones"].tolist()):
+        f = filas[posicion]
+        inmuebles.append({
+            "inmueble_id": f.id,
+            "codigo_proyecto": f.codigo_proyecto,
+            "direccion": f.direccion,
+            "tipo": f.tipo,
+            "area_m2": f.area_m2,
+            "precio_venta": f.precio_venta,
+            "monto_prestamo": round(float(r["monto_prestamo"][i]), 2),
+            "cuota_mensual_referencial": round(float(r["cuota_mensual_referencial"][i]), 2),
+            "cuota_ingreso": round(float(r["cuota_ingreso"][i]), 2),
+        })
+    return {
+        "cliente_id": cliente.id,
+        "ingreso_mensual": cliente.ingreso_mensual or 0.0,
+        "moneda": condiciones.moneda,
+        "limite_cuota_ingreso": limite,
+        "evaluados": r["evaluados"],
+        "asequibles": r["asequibles"],
+        "inmuebles": inmuebles,
+    }
+
+
+def _clientes_elegibles(codigo_proyecto, clientes, inmuebles, condiciones, limite, maximo) -> dict:
+    ingresos = np.fromiter((f.ingreso_mensual for f in clientes), dtype=np.float64, count=len(clientes))
+    precios = np.fromiter((f.precio_venta for f in inmuebles), dtype=np.float64, count=len(inmuebles))
+    r = asequibilidad.clientes_elegibles(ingresos, precios, condiciones, limite, maximo)
+    elegibles = []
+    for i, posicion in enumerate(r["posiciones"].tolist()):
+        f = clientes[posicion]
+        elegibles.append({
+            "cliente_id": f.id,
+            "nombres": f.nombres,
+            "apellidos": f.apellidos,
+            "calificacion_sentinel": f.calificacion_sentinel,
+            "ingreso_mensual": f.ingreso_mensual,
+            "cuota_maxima": round(float(r["cuota_maxima"][i]), 2),
+            "inmuebles_asequibles": int(r["inmuebles_asequibles"][i]),
+            "cuota_ingreso_minima": round(float(r["cuota_ingreso_minima"][i]), 2),
+        })
+    return {
+        "codigo_proyecto": codigo_proyecto,
+        "moneda": condiciones.moneda,
+        "limite_cuota_ingreso": limite,
+        "inmuebles": r["inmuebles"],
+        "cuota_desde": r["cuota_desde"],
+        "cuota_hasta": r["cuota_hasta"],
+        "evaluados": r["evaluados"],
+        "elegibles": r["elegibles"],
+        "clientes": elegibles,
+    }
+
+
+@app.post(
+    "/api/clientes/{cliente_id}/inmuebles-asequibles",
+    response_model=schemas.InmueblesAsequiblesResponse,
+    tags=["Cotización"],
+)
+async def inmuebles_asequibles(
+    cliente_id: int,
+    condiciones: schemas.CondicionesFinanciamiento,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
-    return crud.update_cliente(db, cliente_id, cliente)
+    """
+    Cuota referencial de todos los inmuebles Disponibles en la moneda pedida y
+    los que quedan dentro del límite de cuota / ingreso del cliente.
+    """
+    limite = _validar_condiciones(condiciones, limit)
+    cliente = await db.get(models.Cliente, cliente_id)
+    if not cliente:
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    filas = await crud_async.get_inmuebles_columnas(
+        db, crud_async.filtros_inmueble(estado="Disponible", moneda_venta=condiciones.moneda)
+    )
+    return await en_executor_calculo(_inmuebles_asequibles, cliente, filas, condiciones, limite, limit)
+
+
+@app.post(
+    "/api/proyectos/{codigo_proyecto}/clientes-elegibles",
+    response_model=schemas.ClientesElegiblesResponse,
+    tags=["Cotización"],
+)
+async def clientes_elegibles(
+    codigo_proyecto: str,
+    condiciones: schemas.CondicionesFinanciamiento,
+    calificacion_sentinel: str | None = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """
+    Modo inverso: clientes con al menos un inmueble Disponible del proyecto
+    dentro del límite de cuota / ingreso.
+    """
+    limite = _validar_condiciones(condiciones, limit)
+    inmuebles = await crud_async.get_inmuebles_columnas(
+        db, crud_async.filtros_inmueble(
+            estado="Disponible", moneda_venta=condiciones.moneda, codigo_proyecto=codigo_proyecto
+        )
+    )
+    if not inmuebles:
+        raise HTTPException(status_code=404, detail="El proyecto no tiene inmuebles disponibles en esa moneda")
+    clientes = await crud_async.get_clientes_columnas(
+        db, crud_async.filtros_cliente(calificacion_sentinel=calificacion_sentinel)
+    )
+    return await en_executor_calculo(
+        _clientes_elegibles, codigo_proyecto, clientes, inmuebles, condiciones, limite, limit
+    )
+
+
+# ============================================================
+# 6. EXPORTACIÓN (streaming CSV / NDJSON)
+# ============================================================
+
+def _respuesta_exportacion(formato: str, nombre: str, con_cronograma: bool, **filtros):
+    if formato not in exportar.FORMATOS:
+        raise HTTPException(status_code=422, detail="Formato inválido: use 'csv' o 'ndjson'")
+    return StreamingResponse(
+        exportar.exportar(formato, con_cronograma=con_cronograma, **filtros),
+        media_type=exportar.FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'},
+    )
+
+
+@app.get("/api/exportar/cotizaciones", tags=["Exportación"])
+async def exportar_cotizaciones(
+    formato: str = "csv",
+    vendedor_id: int | None = None,
+    cliente_id: int | None = None,
+    fecha_desde: date | None = None,
+    fecha_hasta: date | None = None,
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """Historial de cotizaciones (una fila por cotización)"""
+    return _respuesta_exportacion(
+        formato, "cotizaciones", con_cronograma=False,
+        vendedor_id=vendedor_id, cliente_id=cliente_id,
+        fecha_desde=fecha_desde, fecha_hasta=fecha_hasta,
+    )
+
+
+@app.get("/api/exportar/cronogramas", tags=["Exportación"])
+async def exportar_cronogramas(
+    formato: str = "csv",
+    vendedor_id: int | None = None,
+    cliente_id: int | None = None,
+    fecha_desde: date | None = None,
+    fecha_hasta: date | None = None,
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    """Cronogramas de las cotizaciones (una fila por cuota)"""
+    return _respuesta_exportacion(
+        formato, "cronogramas", con_cronograma=True,
+        vendedor_id=vendedor_id, cliente_id=cliente_id,
+        fecha_desde=fecha_desde, fecha_hasta=fecha_hasta,
+    )
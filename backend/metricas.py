@@ -0,0 +1,205 @@
+# backend/metricas.py
+#
+# Instrumentación de la API sin dependencias externas:
+#   - histogramas de latencia por ruta, de fases ("spans") y de consultas a la BD
+#   - desglose por request (fases + consultas) en un ContextVar, para el log
+#     de requests lentos
+#   - exposición en formato de texto de Prometheus (ver /metrics en main.py)
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# Configuración (variables de entorno)
+# ============================================================
+
+METRICAS_HABILITADAS = os.getenv("METRICAS_HABILITADAS", "1").lower() not in ("0", "false", "no")
+
+# Requests más lentos que esto se registran con su desglose (0 = desactivado)
+LOG_REQUEST_LENTO_MS = float(os.getenv("LOG_REQUEST_LENTO_MS", "0"))
+
+# Límites (segundos) de los buckets de latencia
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Límites de consultas a la BD por request
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+# ============================================================
+# Primitivas
+# ============================================================
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(nombres: tuple, valores: tuple) -> str:
+    pares = ",".join(f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores))
+    return "{" + pares + "}" if pares else ""
+
+
+class Histograma:
+    """
+    Histograma acumulativo (estilo Prometheus) con una serie por combinación de etiquetas.
+    """
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = (), buckets: tuple = BUCKETS_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observar(self, valor: float, *etiquetas):
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = {"buckets": [0] * len(self.buckets), "suma": 0.0, "cantidad": 0}
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie["buckets"][i] += 1
+            serie["suma"] += valor
+            serie["cantidad"] += 1
+
+    def exponer(self) -> list[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            for valores, serie in sorted(self._series.items()):
+                for limite, cantidad in zip(self.buckets, serie["buckets"]):
+                    etiquetas = _etiquetas(self.etiquetas + ("le",), valores + (limite,))
+                    lineas.append(f"{self.nombre}_bucket{etiquetas} {cantidad}")
+                etiquetas = _etiquetas(self.etiquetas + ("le",), valores + ("+Inf",))
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {serie['cantidad']}")
+                etiquetas = _etiquetas(self.etiquetas, valores)
+                lineas.append(f"{self.nombre}_sum{etiquetas} {serie['suma']}")
+                lineas.append(f"{self.nombre}_count{etiquetas} {serie['cantidad']}")
+        return lineas
+
+
+def gauge(nombre: str, ayuda: str, valor) -> list[str]:
+    return [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} gauge", f"{nombre} {valor}"]
+
+
+def contador(nombre: str, ayuda: str, valor) -> list[str]:
+    return [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} counter", f"{nombre} {valor}"]
+
+
+# ============================================================
+# Métricas de la API
+# ============================================================
+
+latencia_requests = Histograma(
+    "http_request_duration_seconds", "Latencia de los requests por ruta",
+    etiquetas=("metodo", "ruta", "estado"),
+)
+latencia_fases = Histograma(
+    "fase_duration_seconds", "Duración de cada fase instrumentada (spans)",
+    etiquetas=("fase",),
+)
+consultas_por_request = Histograma(
+    "db_queries_per_request", "Consultas a la BD por request",
+    etiquetas=("ruta",), buckets=BUCKETS_CONSULTAS,
+)
+tiempo_db_por_request = Histograma(
+    "db_time_per_request_seconds", "Tiempo en la BD por request",
+    etiquetas=("ruta",),
+)
+
+# Desglose del request en curso: {"fases": {fase: s}, "db_consultas": n, "db_segundos": s}
+_desglose: ContextVar[dict | None] = ContextVar("desglose_request", default=None)
+
+
+def nuevo_desglose() -> dict:
+    desglose = {"fases": {}, "db_consultas": 0, "db_segundos": 0.0}
+    _desglose.set(desglose)
+    return desglose
+
+
+@contextmanager
+def medir(fase: str):
+    """
+    Span: suma la duración al histograma de la fase y al desglose del request
+    (si hay uno en el contexto).
+    """
+    if not METRICAS_HABILITADAS:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        latencia_fases.observar(duracion, fase)
+        desglose = _desglose.get()
+        if desglose is not None:
+            fases = desglose["fases"]
+            fases[fase] = fases.get(fase, 0.0) + duracion
+
+
+# ============================================================
+# Consultas a la BD (eventos del engine)
+# ============================================================
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_consulta", []).append(time.perf_counter())
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    duracion = time.perf_counter() - conn.info["inicio_consulta"].pop()
+    desglose = _desglose.get()
+    if desglose is not None:
+        desglose["db_consultas"] += 1
+        desglose["db_segundos"] += duracion
+
+
+def _al_fallar(contexto):
+    """Una consulta que falla no llega a after_cursor_execute: se saca su inicio igual"""
+    conn = contexto.connection
+    if conn is None or contexto.execution_context is None or not conn.info.get("inicio_consulta"):
+        return
+    _despues_de_ejecutar(conn, None, contexto.statement, contexto.parameters,
+                         contexto.execution_context, False)
+
+
+def instrumentar_engine(engine):
+    """Cuenta y cronometra las consultas de `engine` (sync; para async usar .sync_engine)"""
+    if METRICAS_HABILITADAS:
+        event.listen(engine, "before_cursor_execute", _antes_de_ejecutar)
+        event.listen(engine, "after_cursor_execute", _despues_de_ejecutar)
+        event.listen(engine, "handle_error", _al_fallar)
+
+
+# ============================================================
+# Request completo
+# ============================================================
+
+def registrar_request(metodo: str, ruta: str, estado: int, duracion: float, desglose: dict):
+    latencia_requests.observar(duracion, metodo, ruta, str(estado))
+    consultas_por_request.observar(desglose["db_consultas"], ruta)
+    tiempo_db_por_request.observar(desglose["db_segundos"], ruta)
+
+    if LOG_REQUEST_LENTO_MS and duracion * 1000 >= LOG_REQUEST_LENTO_MS:
+        fases = ", ".join(f"{f}={s * 1000:.1f}ms" for f, s in desglose["fases"].items())
+        logger.warning(
+            "Request lento: %s %s -> %s en %.1f ms | BD: %d consultas, %.1f ms | %s",
+            metodo, ruta, estado, duracion * 1000,
+            desglose["db_consultas"], desglose["db_segundos"] * 1000, fases or "sin fases",
+        )
+
+
+def exponer(extras: list[str] = ()) -> str:
+    """Texto en formato de exposición de Prometheus (0.0.4)"""
+    lineas = []
+    for histograma in (latencia_requests, latencia_fases, consultas_por_request, tiempo_db_por_request):
+        lineas.extend(histograma.exponer())
+    lineas.extend(extras)
+    return "\n".join(lineas) + "\n"
@@ -0,0 +1,128 @@
+# backend/migraciones.py
+#
+# Migraciones livianas de la BD (el proyecto no usa Alembic).
+#
+# Uso (desde backend/):
+#   python migraciones.py                 # pasa cronograma_json -> cronograma_bin
+#   python migraciones.py --conservar-json
+#   python migraciones.py --vacuum        # además compacta el archivo SQLite
+
+import argparse
+import json
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+import cronograma_codec
+
+TAMANO_BLOQUE_MIGRACION = 500
+
+
+def agregar_columnas_faltantes(engine):
+    """
+    create_all no altera tablas existentes: agrega las columnas nuevas
+    que falten en BDs creadas con versiones anteriores.
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table("cotizaciones"):
+        return
+
+    existentes = {c["name"] for c in inspector.get_columns("cotizaciones")}
+    if "cronograma_bin" not in existentes:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE cotizaciones ADD COLUMN cronograma_bin BLOB"))
+    if "tramos_tasa" not in existentes:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE cotizaciones ADD COLUMN tramos_tasa TEXT"))
+
+
+def corregir_fk_vendedor(engine):
+    """
+    cotizaciones.vendedor_id guarda ids de cuentas_agente (el agente del
+    token), no de usuarios. SQLite no aplica las FK; en PostgreSQL las BDs
+    creadas antes apuntan a usuarios: se cambia la restricción (NOT VALID,
+    sin revisar las filas que ya existen).
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    inspector = inspect(engine)
+    if not inspector.has_table("cotizaciones"):
+        return
+    for fk in inspector.get_foreign_keys("cotizaciones"):
+        if fk["constrained_columns"] == ["vendedor_id"] and fk["referred_table"] == "usuarios":
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE cotizaciones DROP CONSTRAINT "{fk["name"]}"'))
+                conn.execute(text(
+                    "ALTER TABLE cotizaciones ADD CONSTRAINT cotizaciones_vendedor_id_fkey "
+                    "FOREIGN KEY (vendedor_id) REFERENCES cuentas_agente (id) NOT VALID"
+                ))
+
+
+def crear_indices_faltantes(engine, metadata):
+    """
+    create_all tampoco crea índices nuevos en tablas que ya existen:
+    crea los índices declarados en los modelos que falten en la BD.
+    """
+    inspector = inspect(engine)
+    for tabla in metadata.sorted_tables:
+        if not tabla.indexes or not inspector.has_table(tabla.name):
+            continue
+        existentes = {i["name"] for i in inspector.get_indexes(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name not in existentes:
+                indice.create(engine)
+
+
+def migrar_cronogramas(db: Session, conservar_json: bool = False, bloque: int = TAMANO_BLOQUE_MIGRACION) -> int:
+    """
+    Codifica en binario los cronogramas guardados como texto JSON, por bloques
+    de `bloque` filas con un commit por bloque. Devuelve las filas migradas.
+    """
+    migradas = 0
+    ultimo_id = 0
+    while True:
+        filas = db.execute(
+            text(
+                "SELECT id, cronograma_json FROM cotizaciones "
+                "WHERE id > :ultimo AND cronograma_bin IS NULL AND cronograma_json IS NOT NULL "
+                "ORDER BY id LIMIT :bloque"
+            ),
+            {"ultimo": ultimo_id, "bloque": bloque},
+        ).all()
+        if not filas:
+            break
+
+        cambios = [
+            {"id": fila.id, "blob": cronograma_codec.codificar_cronograma(json.loads(fila.cronograma_json))}
+            for fila in filas
+        ]
+        if conservar_json:
+            sentencia = "UPDATE cotizaciones SET cronograma_bin = :blob WHERE id = :id"
+        else:
+            sentencia = "UPDATE cotizaciones SET cronograma_bin = :blob, cronograma_json = NULL WHERE id = :id"
+        db.execute(text(sentencia), cambios)
+        db.commit()
+
+        migradas += len(filas)
+        ultimo_id = filas[-1].id
+
+    return migradas
+
+
+if __name__ == "__main__":
+    from database import engine, SessionLocal
+
+    parser = argparse.ArgumentParser(description="Migra los cronogramas a formato binario")
+    parser.add_argument("--conservar-json", action="store_true", help="no borrar el texto JSON original")
+    parser.add_argument("--vacuum", action="store_true", help="compactar el archivo SQLite al terminar")
+    args = parser.parse_args()
+
+    agregar_columnas_faltantes(engine)
+    corregir_fk_vendedor(engine)
+    with SessionLocal() as db:
+        total = migrar_cronogramas(db, conservar_json=args.conservar_json)
+    print(f"Cronogramas migrados: {total}")
+
+    if args.vacuum and engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            conn.execute(text("VACUUM"))
@@ -1,7 +1,10 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Text, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Text, DateTime, LargeBinary, Index, UniqueConstraint
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
+import json
 from database import Base
+import cronograma_codec
+import logic
 
 # --- 1. SEGURIDAD (Login) ---
 class Rol(Base):
@@ -27,9 +30,6 @@ class Usuario(Base):
     rol_id = Column(Integer, ForeignKey("roles.id"))
     rol = relationship("Rol", back_populates="usuarios")
 
-    # Relación con las cotizaciones que haga el vendedor
-    cotizaciones = relationship("Cotizacion", back_populates="vendedor")
-
 
 # --- 2. GESTIÓN INMOBILIARIA (Requisitos del Enunciado) ---
 
@@ -49,6 +49,13 @@ class Cliente(Base):
 
     cotizaciones = relationship("Cotizacion", back_populates="cliente")
 
+    # Filtros del listado (paginado por id)
+    __table_args__ = (
+        Index("ix_clientes_sentinel_id", "calificacion_sentinel", "id"),
+        Index("ix_clientes_sentinel_ingreso", "calificacion_sentinel", "ingreso_mensual"),
+        Index("ix_clientes_ingreso", "ingreso_mensual"),
+    )
+
 
 class Inmueble(Base):
     __tablename__ = "inmuebles"
@@ -63,15 +70,22 @@ class Inmueble(Base):
 
     cotizaciones = relationship("Cotizacion", back_populates="inmueble")
 
+    # Filtros del listado (paginado por id)
+    __table_args__ = (
+        Index("ix_inmuebles_estado_id", "estado", "id"),
+        Index("ix_inmuebles_estado_moneda_precio", "estado", "moneda_venta", "precio_venta"),
+        Index("ix_inmuebles_proyecto_id", "codigo_proyecto", "id"),
+    )
+
 
 # --- 3. MOTOR FINANCIERO (Crédito MiVivienda) ---
 
 class Cotizacion(Base):
     __tablename__ = "cotizaciones"
     id = Column(Integer, primary_key=True, index=True)
-    fecha_cotizacion = Column(DateTime, default=datetime.utcnow)
+    fecha_cotizacion = Column(DateTime, default=datetime.utcnow, index=True)
 
-    vendedor_id = Column(Integer, ForeignKey("usuarios.id"))
+    vendedor_id = Column(Integer, ForeignKey("cuentas_agente.id"))   # agente autenticado que cotizó
     cliente_id = Column(Integer, ForeignKey("clientes.id"))
     inmueble_id = Column(Integer, ForeignKey("inmuebles.id"))
 
@@ -86,6 +100,8 @@ class Cotizacion(Base):
     valor_tasa = Column(Float)
     capitalizacion = Column(Integer, default=30)
     plazo_meses = Column(Integer)
+    # Tasa variable: lista de tramos (schemas.TramoTasa) en JSON, o NULL
+    tramos_tasa = Column(Text)
 
     tipo_periodo_gracia = Column(String(20))
     meses_gracia = Column(Integer, default=0)
@@ -99,12 +115,45 @@ class Cotizacion(Base):
     tir = Column(Float)
     cuota_mensual_referencial = Column(Float)
 
-    cronograma_json = Column(Text)
+    # Cronograma: blob columnar (cronograma_codec). Las filas antiguas pueden
+    # tener todavía el texto JSON en la columna "cronograma_json", y si no se
+    # guardó ninguno se regenera desde los parámetros de la cotización.
+    # Ambos son diferidos: no se leen al listar cotizaciones.
+    cronograma_bin = deferred(Column(LargeBinary))
+    cronograma_texto = deferred(Column("cronograma_json", Text))
 
-    vendedor = relationship("Usuario", back_populates="cotizaciones")
+    vendedor = relationship("CuentaAgente", back_populates="cotizaciones")
     cliente = relationship("Cliente", back_populates="cotizaciones")
     inmueble = relationship("Inmueble", back_populates="cotizaciones")
 
+    # Filtros del listado (paginado por id)
+    __table_args__ = (
+        Index("ix_cotizaciones_vendedor_id", "vendedor_id", "id"),
+        Index("ix_cotizaciones_cliente_id", "cliente_id", "id"),
+        Index("ix_cotizaciones_inmueble_id", "inmueble_id", "id"),
+    )
+
+    @property
+    def cronograma(self):
+        """
+        Cronograma como lista de dicts. Se decodifica sólo cuando se pide.
+        """
+        if self.cronograma_bin is not None:
+            return cronograma_codec.decodificar_cronograma(self.cronograma_bin)
+        if self.cronograma_texto is not None:
+            return json.loads(self.cronograma_texto)
+        # No se guardó el cronograma: se regenera desde los parámetros
+        return logic.cronograma_cotizacion_guardada(self)
+
+    @property
+    def cronograma_json(self):
+        """
+        Compatibilidad con CotizacionResponse: el cronograma como texto JSON.
+        """
+        if self.cronograma_bin is None and self.cronograma_texto is not None:
+            return self.cronograma_texto
+        return json.dumps(self.cronograma)
+
 
 class CuentaAgente(Base):
     __tablename__ = "cuentas_agente"
@@ -113,3 +162,82 @@ class CuentaAgente(Base):
     email = Column(String(120), unique=True, nullable=False, index=True)  # <-- PRINCIPAL
     password = Column(String(255), nullable=False)
     creado_en = Column(DateTime, default=datetime.utcnow)
+
+    # Relación con las cotizaciones que haga el vendedor
+    cotizaciones = relationship("Cotizacion", back_populates="vendedor")
+
+
+class SecuenciaId(Base):
+    """
+    Próximo ID a reservar por tabla (escritura diferida sin secuencias nativas,
+    p. ej. SQLite): compartido por todos los procesos de la API.
+    """
+    __tablename__ = "secuencias_id"
+    tabla = Column(String(50), primary_key=True)
+    siguiente = Column(Integer, nullable=False)
+
+
+# --- 4. ANALÍTICA (resumen incremental, ver analitica.py) ---
+
+class ResumenCotizacion(Base):
+    """
+    Sumas y conteos corridos de cotizaciones por día y por clave:
+    dimension "vendedor" (clave = vendedor_id) o "proyecto" (clave = codigo_proyecto).
+    """
+    __tablename__ = "resumen_cotizaciones"
+    id = Column(Integer, primary_key=True)
+    dimension = Column(String(10), nullable=False)
+    clave = Column(String(50), nullable=False)
+    moneda = Column(String(3), nullable=False)
+    dia = Column(Date, nullable=False)
+
+    cotizaciones = Column(Integer, nullable=False, default=0)
+
+    suma_tcea = Column(Float, nullable=False, default=0.0)
+    suma_monto_prestamo = Column(Float, nullable=False, default=0.0)
+    suma_cuota = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        UniqueConstraint("dimension", "clave", "moneda", "dia", name="uq_resumen_cotizaciones"),
+    )
+
+
+class ResumenCliente(Base):
+    """
+    Embudo de clientes por clave (misma dimension/clave que ResumenCotizacion):
+    cuántas cotizaciones tiene cada cliente y el día y la moneda de la primera
+    y la segunda. Los nuevos y recurrentes de un rango se cuentan al consultar.
+    """
+    __tablename__ = "resumen_clientes"
+    dimension = Column(String(10), primary_key=True)
+    clave = Column(String(50), primary_key=True)
+    cliente_id = Column(Integer, primary_key=True)
+
+    cotizaciones = Column(Integer, nullable=False)
+    primer_dia = Column(Date, nullable=False)
+    primera_moneda = Column(String(3), nullable=False)
+    segundo_dia = Column(Date)
+    segunda_moneda = Column(String(3))
+
+    __table_args__ = (
+        Index("ix_resumen_clientes_primer_dia", "dimension", "primer_dia"),
+        Index("ix_resumen_clientes_segundo_dia", "dimension", "segundo_dia"),
+    )
+
+
+class PruebaEstres(Base):
+    """
+    Corrida de la prueba de estrés de tasas sobre la cartera (ver estres.py).
+    """
+    __tablename__ = "pruebas_estres"
+    id = Column(Integer, primary_key=True)
+    fecha_creacion = Column(DateTime, default=datetime.utcnow)
+    estado = Column(String(12), nullable=False, default="pendiente")  # pendiente, en_curso, completada, error
+
+    parametros = Column(Text, nullable=False)   # JSON de schemas.EstresInput (con la semilla usada)
+    cotizaciones = Column(Integer)
+    segundos = Column(Float)
+    error = Column(Text)
+
+    # Percentiles por cartera, proyecto y vendedor (JSON); diferido al listar
+    resultados = deferred(Column(Text))
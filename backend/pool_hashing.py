@@ -0,0 +1,119 @@
+# backend/pool_hashing.py
+#
+# Pool dedicado y acotado para hashear / verificar contraseñas.
+# sha256_crypt hace miles de rondas: si corre en el threadpool de Starlette,
+# una ráfaga de logins lo llena y frena al resto de endpoints.
+#
+# Los requests que encuentran el pool ocupado esperan su turno en el event
+# loop (backpressure con un semáforo), sin ocupar hilos ni ser rechazados.
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Cantidad de latencias recientes que se guardan para los percentiles
+MUESTRAS_LATENCIA = 1000
+
+
+def _percentil(valores, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+class MetricaLatencia:
+    """
+    Contador, suma y ventana de las últimas muestras (en segundos).
+    """
+
+    def __init__(self, muestras: int = MUESTRAS_LATENCIA):
+        self._lock = threading.Lock()
+        self._recientes = deque(maxlen=muestras)
+        self.cantidad = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, segundos: float):
+        with self._lock:
+            self._recientes.append(segundos)
+            self.cantidad += 1
+            self.suma += segundos
+            self.maximo = max(self.maximo, segundos)
+
+    def resumen(self) -> dict:
+        with self._lock:
+            recientes = list(self._recientes)
+            return {
+                "cantidad": self.cantidad,
+                "promedio_ms": round(self.suma / self.cantidad * 1000, 3) if self.cantidad else 0.0,
+                "p50_ms": round(_percentil(recientes, 50) * 1000, 3),
+                "p95_ms": round(_percentil(recientes, 95) * 1000, 3),
+                "p99_ms": round(_percentil(recientes, 99) * 1000, 3),
+                "max_ms": round(self.maximo * 1000, 3),
+            }
+
+
+class PoolHashing:
+    """
+    Ejecuta funciones de hashing en un ThreadPoolExecutor de `workers` hilos.
+    Como mucho `workers` tareas están en el pool; el resto espera en cola.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hashing")
+        self._semaforo = None
+        self._loop = None
+        self.en_cola = 0
+        self.en_proceso = 0
+        self.espera = MetricaLatencia()
+
+    def _obtener_semaforo(self):
+        # Un semáforo por event loop (los tests levantan un loop por cliente)
+        loop = asyncio.get_running_loop()
+        if self._semaforo is None or self._loop is not loop:
+            self._semaforo = asyncio.Semaphore(self.workers)
+            self._loop = loop
+        return self._semaforo
+
+    async def ejecutar(self, funcion, *args):
+        # Los contadores sólo se tocan desde el event loop: no necesitan lock
+        inicio = time.perf_counter()
+        self.en_cola += 1
+        esperando = True
+        try:
+            async with self._obtener_semaforo():
+                self.en_cola -= 1
+                esperando = False
+                self.espera.registrar(time.perf_counter() - inicio)
+                self.en_proceso += 1
+                try:
+                    loop = asyncio.get_running_loop()
+                    return await loop.run_in_executor(self._executor, funcion, *args)
+                finally:
+                    self.en_proceso -= 1
+        finally:
+            # Cancelado mientras esperaba turno
+            if esperando:
+                self.en_cola -= 1
+
+    def metricas(self) -> dict:
+        return {
+            "workers": self.workers,
+            "en_cola": self.en_cola,
+            "en_proceso": self.en_proceso,
+            "espera_cola": self.espera.resumen(),
+        }
+
+
+pool_hashing = PoolHashing()
+
+# Latencia total de /token (incluye la espera en el pool)
+latencia_login = MetricaLatencia()
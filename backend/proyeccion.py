@@ -0,0 +1,458 @@
+# backend/proyeccion.py
+#
+# Almacén columnar de flujos de la cartera para proyectar la cobranza mensual
+# sin leer ni parsear cronogramas. Cada archivo es un array plano que se abre
+# con np.memmap (no se carga en memoria):
+#
+#   cuota_total.f8, interes.f8, amortizacion.f8   valores de cada cuota
+#   mes.i4                                        mes calendario de la cuota (año * 12 + mes - 1)
+#   indice.bin                                    una fila por cotización (dtype INDICE):
+#                                                 id, desde qué posición y cuántas cuotas tiene,
+#                                                 inmueble y moneda para los filtros
+#
+# Las cotizaciones nuevas se agregan al final (ver registrar, llamado después
+# del commit) con el cronograma que ya se calculó al cotizar (cronograma_bin).
+# registrar sólo encola: un hilo agrega las cotizaciones por lotes, así el
+# request no espera el lock de los archivos. Primero se escriben las cuotas y
+# al final la fila del índice: un lector sólo ve cotizaciones completas.
+#
+# Cada cotización está una sola vez: las que ya están en el índice se omiten
+# (reintentos, escrituras repetidas). La reconstrucción toma el lock durante
+# todo el proceso; lo que se registra mientras tanto se agrega al terminar.
+#
+# Uso (desde backend/):
+#   python proyeccion.py --reconstruir     # regenera el almacén desde la BD
+
+import argparse
+import logging
+import os
+import queue
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+import cronograma_codec
+import logic
+import models
+
+try:
+    import fcntl
+except ImportError:  # Windows: sólo el lock entre hilos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# Configuración (variables de entorno)
+# ============================================================
+
+PROYECCION_HABILITADA = os.getenv("PROYECCION_HABILITADA", "1").lower() not in ("0", "false", "no")
+PROYECCION_DIRECTORIO = os.getenv("PROYECCION_DIRECTORIO", "proyeccion_flujos")
+
+# Cuotas por bloque al reducir: acota la memoria de cada pasada
+TAMANO_BLOQUE_CUOTAS = 2_000_000
+
+TAMANO_BLOQUE_RECONSTRUCCION = 2000
+
+INDICE = np.dtype([
+    ("id", "<i8"),
+    ("inicio", "<i8"),
+    ("meses", "<i4"),
+    ("mes_inicio", "<i4"),
+    ("inmueble_id", "<i8"),     # -1 si no tiene
+    ("moneda", "S3"),
+])
+
+# Los montos se guardan redondeados a céntimos, como en el cronograma
+COLUMNAS = {
+    "cuota_total": np.dtype("<f8"),
+    "interes": np.dtype("<f8"),
+    "amortizacion": np.dtype("<f8"),
+    "mes": np.dtype("<i4"),
+}
+
+
+def mes_calendario(fecha: datetime) -> int:
+    return fecha.year * 12 + fecha.month - 1
+
+
+def mes_texto(mes: int) -> str:
+    return f"{mes // 12:04d}-{mes % 12 + 1:02d}"
+
+
+class AlmacenFlujos:
+    def __init__(self, directorio: str = PROYECCION_DIRECTORIO):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+
+    def _ruta(self, nombre: str) -> str:
+        return os.path.join(self.directorio, nombre)
+
+    @contextmanager
+    def _bloquear(self):
+        """Lock entre hilos y, donde hay fcntl, entre procesos (workers de la API)"""
+        with self._lock:
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(self._ruta(".lock"), "a") as archivo:
+                if fcntl is not None:
+                    fcntl.flock(archivo, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(archivo, fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------
+
+    def _abrir(self, nombre: str, dtype, cantidad: int):
+        if cantidad == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._ruta(nombre), dtype=dtype, mode="r", shape=(cantidad,))
+
+    def indice(self) -> np.ndarray:
+        ruta = self._ruta("indice.bin")
+        if not os.path.exists(ruta):
+            return np.zeros(0, dtype=INDICE)
+        return self._abrir("indice.bin", INDICE, os.path.getsize(ruta) // INDICE.itemsize)
+
+    def _cuotas_indexadas(self, indice: np.ndarray) -> int:
+        """Cuotas cubiertas por el índice (las posteriores son de una escritura incompleta)"""
+        if indice.size == 0:
+            return 0
+        return int(indice["inicio"][-1]) + int(indice["meses"][-1])
+
+    def proyectar(self, inmuebles=None, moneda: str | None = None,
+                  desde: int | None = None, hasta: int | None = None) -> dict:
+        """
+        Suma por mes calendario de cuota_total, interes y amortizacion de las
+        cotizaciones que cumplen los filtros (`inmuebles`: ids de inmueble
+        permitidos; `desde`/`hasta`: meses calendario, inclusive).
+        """
+        indice = self.indice()
+        total_cuotas = self._cuotas_indexadas(indice)
+        seleccion = np.ones(indice.size, dtype=bool)
+        if inmuebles is not None:
+            seleccion &= np.isin(indice["inmueble_id"], np.fromiter(inmuebles, dtype=np.int64))
+        if moneda is not None:
+            seleccion &= indice["moneda"] == moneda.encode()
+
+        columnas = {nombre: self._abrir(_archivo(nombre), dtype, total_cuotas)
+                    for nombre, dtype in COLUMNAS.items()}
+        return _reducir(indice, seleccion, columnas, desde, hasta)
+
+    # ------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------
+
+    def agregar(self, ids, fechas, inmuebles, monedas, columnas: dict, meses,
+                omitir_registradas: bool = True) -> int:
+        """
+        Agrega cotizaciones al final: `columnas` (escenarios x meses) como
+        las devuelve logic.columnas_cotizaciones_guardadas. Omite los ids
+        repetidos en `ids` y, con omitir_registradas, los que ya están en el
+        almacén. Devuelve cuántas agregó.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        meses = np.asarray(meses, dtype=np.int64)
+        validas = meses > 0
+        validas[np.setdiff1d(np.arange(ids.size), np.unique(ids, return_index=True)[1])] = False
+        if not validas.any():
+            return 0
+        mes_inicio = np.array([mes_calendario(f) + 1 for f in fechas], dtype=np.int64)  # primera cuota: mes siguiente
+
+        with self._bloquear():
+            indice = self.indice()
+            inicio = self._cuotas_indexadas(indice)
+            if omitir_registradas:
+                validas &= ~np.isin(ids, indice["id"])
+            del indice
+            if not validas.any():
+                return 0
+            mascara = np.arange(columnas["cuota_total"].shape[1])[None, :] < meses[:, None]
+            mascara &= validas[:, None]
+
+            # Descarta cuotas de una escritura anterior que no llegó al índice
+            for nombre, dtype in COLUMNAS.items():
+                ruta = self._ruta(_archivo(nombre))
+                if os.path.exists(ruta) and os.path.getsize(ruta) != inicio * dtype.itemsize:
+                    with open(ruta, "r+b") as archivo:
+                        archivo.truncate(inicio * dtype.itemsize)
+
+            mes = mes_inicio[:, None] + np.arange(mascara.shape[1])[None, :]
+            valores = {
+                "cuota_total": np.round(columnas["cuota_total"][mascara], 2),
+                "interes": np.round(columnas["interes"][mascara], 2),
+                "amortizacion": np.round(columnas["amortizacion"][mascara], 2),
+                "mes": mes[mascara],
+            }
+            for nombre, dtype in COLUMNAS.items():
+                with open(self._ruta(_archivo(nombre)), "ab") as archivo:
+                    archivo.write(np.ascontiguousarray(valores[nombre], dtype=dtype).tobytes())
+
+            filas = np.zeros(int(validas.sum()), dtype=INDICE)
+            meses_validos = meses[validas]
+            filas["id"] = ids[validas]
+            filas["inicio"] = inicio + np.concatenate(([0], np.cumsum(meses_validos)[:-1]))
+            filas["meses"] = meses_validos
+            filas["mes_inicio"] = mes_inicio[validas]
+            filas["inmueble_id"] = np.array([-1 if i is None else i for i in inmuebles], dtype=np.int64)[validas]
+            filas["moneda"] = np.array([(m or "PEN").encode() for m in monedas], dtype="S3")[validas]
+            with open(self._ruta("indice.bin"), "ab") as archivo:
+                archivo.write(filas.tobytes())
+        return int(validas.sum())
+
+    def _reemplazar(self, otro: "AlmacenFlujos"):
+        """Reemplaza los archivos por los de `otro` (el índice al final); con el lock tomado"""
+        for nombre in [_archivo(n) for n in COLUMNAS] + ["indice.bin"]:
+            os.replace(otro._ruta(nombre), self._ruta(nombre))
+        shutil.rmtree(otro.directorio, ignore_errors=True)
+
+    def estadisticas(self) -> dict:
+        indice = self.indice()
+        return {
+            "habilitado": PROYECCION_HABILITADA,
+            "cotizaciones": int(indice.size),
+            "cuotas": self._cuotas_indexadas(indice),
+            "bytes": sum(
+                os.path.getsize(self._ruta(n)) for n in [_archivo(c) for c in COLUMNAS] + ["indice.bin"]
+                if os.path.exists(self._ruta(n))
+            ),
+        }
+
+
+def _archivo(nombre: str) -> str:
+    return f"{nombre}.i4" if nombre == "mes" else f"{nombre}.f8"
+
+
+def _reducir(indice: np.ndarray, seleccion: np.ndarray, columnas: dict, desde, hasta) -> dict:
+    """
+    Reducción por mes calendario recorriendo el índice en bloques de a lo
+    más TAMANO_BLOQUE_CUOTAS cuotas (las cuotas de un bloque son contiguas).
+    """
+    sumas = {}
+    fines = indice["inicio"].astype(np.int64) + indice["meses"]
+    primera = 0
+    while primera < indice.size:
+        limite = int(indice["inicio"][primera]) + TAMANO_BLOQUE_CUOTAS
+        ultima = max(int(np.searchsorted(fines, limite, side="right")), primera + 1)
+        filas = slice(primera, ultima)
+        primera = ultima
+
+        elegidas = seleccion[filas]
+        if not elegidas.any():
+            continue
+        inicio, fin = int(indice["inicio"][filas.start]), int(fines[filas.stop - 1])
+        mascara = np.repeat(elegidas, indice["meses"][filas])
+        mes = np.asarray(columnas["mes"][inicio:fin])[mascara]
+        if desde is not None or hasta is not None:
+            en_rango = np.ones(mes.size, dtype=bool)
+            if desde is not None:
+                en_rango &= mes >= desde
+            if hasta is not None:
+                en_rango &= mes <= hasta
+            mascara[mascara] = en_rango
+            mes = mes[en_rango]
+        if mes.size == 0:
+            continue
+
+        base = int(mes.min())
+        posicion = mes - base
+        parcial = {"cuotas": np.bincount(posicion)}
+        for nombre in ("cuota_total", "interes", "amortizacion"):
+            parcial[nombre] = np.bincount(posicion, weights=np.asarray(columnas[nombre][inicio:fin])[mascara])
+        for i in np.flatnonzero(parcial["cuotas"]):
+            acumulado = sumas.setdefault(base + int(i), dict.fromkeys(parcial, 0))
+            for nombre, valores in parcial.items():
+                acumulado[nombre] += valores[i]
+
+    meses = [
+        {
+            "mes": mes_texto(mes),
+            "cuotas": int(s["cuotas"]),
+            "cuota_total": round(float(s["cuota_total"]), 2),
+            "interes": round(float(s["interes"]), 2),
+            "amortizacion": round(float(s["amortizacion"]), 2),
+        }
+        for mes, s in sorted(sumas.items())
+    ]
+    return {
+        "cotizaciones": int(seleccion.sum()),
+        "meses": meses,
+        "total": {
+            nombre: round(sum(m[nombre] for m in meses), 2)
+            for nombre in ("cuota_total", "interes", "amortizacion")
+        },
+    }
+
+
+almacen_flujos = AlmacenFlujos()
+
+
+# ============================================================
+# Registro de cotizaciones
+# ============================================================
+
+_pendientes = queue.Queue()
+_hilo = None
+_hilo_lock = threading.Lock()
+
+
+def registrar(filas: list[dict], almacen: AlmacenFlujos = almacen_flujos):
+    """
+    Encola cotizaciones ya guardadas (valores con id y fecha_cotizacion)
+    para agregarlas al almacén. Se llama después del commit y no espera la
+    escritura; un fallo se registra en el log y se corrige con --reconstruir
+    (o con sincronizar al arrancar).
+    """
+    global _hilo
+    if not PROYECCION_HABILITADA or not filas:
+        return
+    _pendientes.put((almacen, filas))
+    with _hilo_lock:
+        if _hilo is None:
+            _hilo = threading.Thread(target=_agregar_pendientes, name="proyeccion", daemon=True)
+            _hilo.start()
+
+
+def esperar_registros():
+    """Espera a que se agreguen las cotizaciones encoladas"""
+    _pendientes.join()
+
+
+def _agregar_pendientes():
+    while True:
+        lotes = [_pendientes.get()]
+        while True:
+            try:
+                lotes.append(_pendientes.get_nowait())
+            except queue.Empty:
+                break
+        # Lo encolado mientras se escribía va en un solo lote por almacén
+        por_almacen = {}
+        for almacen, filas in lotes:
+            por_almacen.setdefault(almacen, []).extend(filas)
+        for almacen, filas in por_almacen.items():
+            try:
+                almacen.agregar(
+                    [f["id"] for f in filas],
+                    [f["fecha_cotizacion"] for f in filas],
+                    [f.get("inmueble_id") for f in filas],
+                    [f.get("moneda_prestamo") for f in filas],
+                    *_columnas_filas(filas),
+                )
+            except Exception:
+                logger.exception("No se pudieron agregar %d cotizaciones al almacén de flujos", len(filas))
+        for _ in lotes:
+            _pendientes.task_done()
+
+
+def _columnas_filas(filas: list[dict]):
+    """
+    (columnas, meses) de los valores de cotizaciones: se decodifica el
+    cronograma_bin calculado al cotizar y sólo se recalculan las que no lo
+    guardaron.
+    """
+    meses = np.array([f.get("plazo_meses") or 0 for f in filas], dtype=np.int64)
+    ancho = int(meses.max(initial=0))
+    columnas = {c: np.zeros((len(filas), ancho)) for c in ("cuota_total", "interes", "amortizacion")}
+    sin_cronograma = []
+    for i, f in enumerate(filas):
+        if f.get("cronograma_bin") is None:
+            sin_cronograma.append(i)
+            continue
+        decodificadas = cronograma_codec.decodificar_columnas(f["cronograma_bin"])
+        for c, matriz in columnas.items():
+            matriz[i, :decodificadas[c].size] = decodificadas[c]
+    if sin_cronograma:
+        calculadas, _ = logic.columnas_cotizaciones_guardadas([models.Cotizacion(**filas[i]) for i in sin_cronograma])
+        for c, matriz in columnas.items():
+            matriz[sin_cronograma, :calculadas[c].shape[1]] = calculadas[c]
+    return columnas, meses
+
+
+def reconstruir(db: Session, almacen: AlmacenFlujos = almacen_flujos,
+                bloque: int = TAMANO_BLOQUE_RECONSTRUCCION) -> int:
+    """
+    Regenera el almacén desde la BD (por bloques de id, sin leer cronogramas)
+    en un directorio aparte y luego reemplaza los archivos, todo con el lock
+    del almacén tomado: lo que se registre mientras tanto espera y se agrega
+    sobre el almacén nuevo. Devuelve la cantidad de cotizaciones.
+    """
+    with almacen._bloquear():
+        return _reconstruir(db, almacen, bloque)
+
+
+def _reconstruir(db: Session, almacen: AlmacenFlujos, bloque: int) -> int:
+    nuevo = AlmacenFlujos(almacen.directorio.rstrip("/\\") + ".nuevo")
+    shutil.rmtree(nuevo.directorio, ignore_errors=True)
+    os.makedirs(nuevo.directorio)
+    for nombre in [_archivo(n) for n in COLUMNAS] + ["indice.bin"]:
+        open(nuevo._ruta(nombre), "wb").close()
+
+    C = models.Cotizacion
+    procesadas = 0
+    ultimo_id = 0
+    while True:
+        cotizaciones = db.scalars(
+            select(C).where(C.id > ultimo_id, C.fecha_cotizacion.is_not(None)).order_by(C.id).limit(bloque)
+        ).all()
+        if not cotizaciones:
+            break
+        columnas, meses = logic.columnas_cotizaciones_guardadas(cotizaciones)
+        nuevo.agregar(
+            [c.id for c in cotizaciones],
+            [c.fecha_cotizacion for c in cotizaciones],
+            [c.inmueble_id for c in cotizaciones],
+            [c.moneda_prestamo for c in cotizaciones],
+            columnas,
+            meses,
+            omitir_registradas=False,   # bloques por id creciente: no hay repetidas
+        )
+        procesadas += len(cotizaciones)
+        ultimo_id = cotizaciones[-1].id
+        db.expunge_all()
+
+    almacen._reemplazar(nuevo)
+    return procesadas
+
+
+def sincronizar(db: Session, almacen: AlmacenFlujos = almacen_flujos) -> bool:
+    """
+    Reconstruye el almacén si no tiene las mismas cotizaciones que la BD
+    (BD recreada, registros perdidos en una caída). Devuelve si reconstruyó.
+    """
+    if not PROYECCION_HABILITADA:
+        return False
+    C = models.Cotizacion
+    cantidad, ultimo_id = db.execute(
+        select(func.count(), func.max(C.id)).where(C.fecha_cotizacion.is_not(None), C.plazo_meses > 0)
+    ).one()
+    ids = almacen.indice()["id"]
+    if ids.size == cantidad and (ids.size == 0 or int(ids.max()) == ultimo_id):
+        return False
+    logger.warning("El almacén de flujos tiene %d cotizaciones y la BD %d: se reconstruye", ids.size, cantidad)
+    reconstruir(db, almacen)
+    return True
+
+
+if __name__ == "__main__":
+    from database import Base, SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Almacén columnar de flujos de la cartera")
+    parser.add_argument("--reconstruir", action="store_true", help="regenerar el almacén desde la BD")
+    args = parser.parse_args()
+
+    if args.reconstruir:
+        Base.metadata.create_all(bind=engine)
+        with SessionLocal() as db:
+            total = reconstruir(db)
+        print(f"Cotizaciones en el almacén: {total} ({almacen_flujos.estadisticas()['bytes']} bytes)")
+    else:
+        parser.print_help()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import date, datetime
 
 # ============================================================
@@ -79,6 +79,12 @@ class InmuebleResponse(InmuebleBase):
 # 4. COTIZACIÓN
 # ============================================================
 
+class TramoTasa(BaseModel):
+    desde_mes: int                    # primera cuota con esta tasa (base 1)
+    tipo_tasa: str
+    valor_tasa: float
+    capitalizacion: int = 30
+
 class CotizacionInput(BaseModel):
     cliente_id: int
     inmueble_id: int
@@ -94,6 +100,10 @@ class CotizacionInput(BaseModel):
     capitalizacion: int = 30
     plazo_anios: int
 
+    # Tasa variable: cambios de tasa a partir de una cuota (la tasa de
+    # arriba rige hasta el primero; un tramo desde la cuota 1 la reemplaza)
+    tramos_tasa: Optional[List[TramoTasa]] = None
+
     tipo_periodo_gracia: str = "Sin Gracia"
     meses_gracia: int = 0
 
@@ -104,7 +114,7 @@ class CotizacionInput(BaseModel):
     class Config:
         from_attributes = True
 
-class CotizacionResponse(BaseModel):
+class CotizacionMetricas(BaseModel):
     id: int
     fecha_cotizacion: datetime
 
@@ -113,7 +123,271 @@ class CotizacionResponse(BaseModel):
     tcea: float
     van: float
     tir: float
-    cronograma_json: str
 
     class Config:
         from_attributes = True
+
+class CotizacionResponse(CotizacionMetricas):
+    # Formato original: el cronograma como texto JSON
+    cronograma_json: str
+
+
+class CuotaCronograma(BaseModel):
+    n: int
+    saldo_inicial: float
+    interes: float
+    amortizacion: float
+    seguro_desgravamen: float
+    seguro_riesgo: float
+    gastos: float
+    cuota_total: float
+    saldo_final: float
+
+class CotizacionEstructurada(CotizacionMetricas):
+    # Según formato_cronograma: lista de cuotas o un arreglo por campo.
+    # Ninguno de los dos con incluir_cronograma=false.
+    cronograma: Optional[List[CuotaCronograma]] = None
+    cronograma_columnas: Optional[Dict[str, list]] = None
+
+
+class CotizacionLoteItem(BaseModel):
+    indice: int
+    cotizacion: Optional[Union[CotizacionResponse, CotizacionEstructurada]] = None
+    error: Optional[str] = None
+
+class CotizacionLoteResponse(BaseModel):
+    total: int
+    exitosas: int
+    fallidas: int
+    resultados: List[CotizacionLoteItem]
+
+
+class SensibilidadInput(BaseModel):
+    base: CotizacionInput
+
+    # Valores a combinar; si una lista viene vacía se usa el valor de `base`
+    valores_tasa: List[float] = []
+    plazos_anios: List[int] = []
+    porcentajes_cuota_inicial: List[float] = []
+
+class SensibilidadResponse(BaseModel):
+    valores_tasa: List[float]
+    plazos_anios: List[int]
+    porcentajes_cuota_inicial: List[float]
+
+    # Grillas [tasa][plazo][cuota inicial]; None donde no hay TCEA
+    cuota_mensual_referencial: List[List[List[float]]]
+    tcea: List[List[List[Optional[float]]]]
+    interes_total: List[List[List[float]]]
+
+
+class CondicionesFinanciamiento(BaseModel):
+    # Mismas condiciones que CotizacionInput, sin cliente ni inmueble: el
+    # precio es el precio_venta de cada inmueble y el préstamo va en su moneda
+    moneda: str = "PEN"
+    porcentaje_cuota_inicial: float
+    monto_bono_buen_pagador: float = 0.0
+
+    tipo_tasa: str
+    valor_tasa: float
+    capitalizacion: int = 30
+    plazo_anios: int
+
+    tipo_periodo_gracia: str = "Sin Gracia"
+    meses_gracia: int = 0
+
+    seguro_desgravamen_porc: float
+    seguro_riesgo_porc: float
+    gastos_administrativos: float = 0.0
+
+    # Cuota / ingreso (%) máximo; sin valor, asequibilidad.LIMITE_CUOTA_INGRESO
+    limite_cuota_ingreso: Optional[float] = Field(None, gt=0)
+
+class InmuebleAsequible(BaseModel):
+    inmueble_id: int
+    codigo_proyecto: Optional[str] = None
+    direccion: Optional[str] = None
+    tipo: Optional[str] = None
+    area_m2: Optional[float] = None
+    precio_venta: float
+    monto_prestamo: float
+    cuota_mensual_referencial: float
+    cuota_ingreso: float              # %
+
+class InmueblesAsequiblesResponse(BaseModel):
+    cliente_id: int
+    ingreso_mensual: float
+    moneda: str
+    limite_cuota_ingreso: float
+    evaluados: int                    # inmuebles disponibles en la moneda
+    asequibles: int
+    # De menor a mayor cuota / ingreso, a lo más `limit`
+    inmuebles: List[InmuebleAsequible]
+
+class ClienteElegible(BaseModel):
+    cliente_id: int
+    nombres: Optional[str] = None
+    apellidos: Optional[str] = None
+    calificacion_sentinel: Optional[str] = None
+    ingreso_mensual: float
+    cuota_maxima: float               # ingreso * límite
+    inmuebles_asequibles: int
+    cuota_ingreso_minima: float       # % con el inmueble de menor cuota
+
+class ClientesElegiblesResponse(BaseModel):
+    codigo_proyecto: str
+    moneda: str
+    limite_cuota_ingreso: float
+    inmuebles: int                    # disponibles del proyecto en la moneda
+    cuota_desde: Optional[float] = None
+    cuota_hasta: Optional[float] = None
+    evaluados: int                    # clientes
+    elegibles: int
+    # De más a menos inmuebles asequibles, a lo más `limit`
+    clientes: List[ClienteElegible]
+
+
+class CacheEstadisticas(BaseModel):
+    habilitado: bool
+    entradas: int
+    max_entradas: int
+    ttl_segundos: float
+    aciertos: int
+    fallos: int
+    desalojos: int
+    expiraciones: int
+    tasa_aciertos: float
+
+
+class CronogramaPaginaResponse(BaseModel):
+    cotizacion_id: int
+    total_cuotas: int
+    desde: int
+    hasta: int
+    cuotas: List[CuotaCronograma]
+
+
+class AbonoExtraordinario(BaseModel):
+    mes: int                          # se paga junto con la cuota de este mes
+    monto: float = Field(..., gt=0)
+    modalidad: str = "reducir_plazo"  # o "reducir_cuota"
+
+class SimulacionAbonosInput(BaseModel):
+    abonos: List[AbonoExtraordinario] = Field(..., min_length=1)
+
+class AbonoAplicado(BaseModel):
+    mes: int
+    modalidad: str
+    monto_solicitado: float
+    monto_aplicado: float             # a lo más el saldo de ese mes
+    saldo_antes: float
+    saldo_despues: float
+
+class SimulacionAbonosResponse(BaseModel):
+    cotizacion_id: int
+    plazo_original: int
+    plazo_nuevo: int
+    cuota_mensual_nueva: float
+    tcea_original: float
+    tcea_nueva: float
+
+    # Intereses desde la cuota `desde` hasta el final, sin y con abonos
+    interes_original: float
+    interes_nuevo: float
+    interes_ahorrado: float
+
+    abonos: List[AbonoAplicado]
+
+    # Cronograma nuevo desde la primera cuota afectada
+    desde: int
+    cronograma: List[CuotaCronograma]
+
+
+class EstresInput(BaseModel):
+    simulaciones: int = Field(1000, ge=1, le=10000)
+    semilla: Optional[int] = None          # sin semilla se elige una (queda guardada)
+    # Shock anual de la TEA, en puntos porcentuales
+    deriva_anual: float = 0.0
+    volatilidad_anual: float = Field(1.0, ge=0)
+    # Meses con la tasa pactada antes del primer reprecio (como mínimo, la gracia)
+    meses_fijos: int = Field(12, ge=0)
+    # Cuota / ingreso (%) por encima del cual el préstamo deja de ser asequible
+    umbral_cuota_ingreso: float = Field(30.0, gt=0)
+
+class PruebaEstresResponse(BaseModel):
+    id: int
+    fecha_creacion: datetime
+    estado: str
+    parametros: dict
+    cotizaciones: Optional[int] = None
+    segundos: Optional[float] = None
+    error: Optional[str] = None
+    # cartera / proyecto / vendedor -> percentiles de variacion_cuota, tcea
+    # y cuota_ingreso (%), más prob_no_asequible
+    resultados: Optional[dict] = None
+
+
+class FlujoMensual(BaseModel):
+    mes: str                          # YYYY-MM
+    cuotas: int
+    cuota_total: float
+    interes: float
+    amortizacion: float
+
+class ProyeccionFlujosResponse(BaseModel):
+    cotizaciones: int
+    meses: List[FlujoMensual]
+    total: Dict[str, float]           # cuota_total, interes y amortizacion
+
+
+class ErrorImportacion(BaseModel):
+    fila: int
+    errores: List[str]
+
+class ImportacionResponse(BaseModel):
+    filas: int
+    insertadas: int
+    actualizadas: int
+    omitidas: int
+    con_error: int
+    segundos: float
+    filas_por_segundo: float
+
+    # Como mucho importar.MAX_ERRORES_REPORTE filas
+    errores: List[ErrorImportacion]
+
+
+class CotizacionResumen(BaseModel):
+    id: int
+    fecha_cotizacion: datetime
+    vendedor_id: Optional[int] = None
+    cliente_id: Optional[int] = None
+    inmueble_id: Optional[int] = None
+
+    moneda_prestamo: Optional[str] = None
+    precio_final_inmueble: float
+    monto_prestamo: float
+    tipo_tasa: str
+    valor_tasa: float
+    plazo_meses: int
+    tcea: float
+    van: float
+    tir: float
+    cuota_mensual_referencial: float
+
+    # Nombres de las relaciones (None si la fila relacionada no existe)
+    vendedor: Optional[str] = None
+    cliente: Optional[str] = None
+    codigo_proyecto: Optional[str] = None
+    inmueble_direccion: Optional[str] = None
+
+
+class ResumenAnalitica(BaseModel):
+    clave: str
+    moneda: str
+    cotizaciones: int
+    clientes_nuevos: int
+    clientes_recurrentes: int
+    tcea_promedio: float
+    monto_prestamo_promedio: float
+    cuota_promedio: float
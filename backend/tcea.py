@@ -0,0 +1,163 @@
+# backend/tcea.py
+#
+# Solver de TIR / TCEA para flujos de un crédito hipotecario:
+# un desembolso positivo en t=0 seguido de cuotas (negativas).
+#
+# Reemplaza a numpy_financial.irr, que resuelve las raíces de un polinomio de
+# grado len(flujo) (autovalores de una matriz compañera de 241-361 filas).
+
+import numpy as np
+
+TOLERANCIA_TIR = 1e-12
+MAX_ITERACIONES = 100
+
+
+class TIRNoConvergeError(ValueError):
+    """
+    No se pudo obtener la TIR del flujo: no hay cambio de signo
+    (flujo sin raíz) o el método no alcanzó la tolerancia pedida.
+    """
+
+
+# ============================================================
+# Evaluación del VAN y sus derivadas
+# ============================================================
+
+def _van_y_derivadas(flujos: np.ndarray, t: np.ndarray, tasas: np.ndarray):
+    """
+    Para cada fila de `flujos` evalúa, en su tasa correspondiente:
+    f(r) = Σ c_t (1+r)^-t, f'(r) y f''(r).
+    """
+    v = 1.0 / (1.0 + tasas)
+    descuento = v[:, None] ** t[None, :]
+    c_desc = flujos * descuento
+    f = c_desc.sum(axis=1)
+    df = -(c_desc * t).sum(axis=1) * v
+    d2f = (c_desc * (t * (t + 1))).sum(axis=1) * v * v
+    return f, df, d2f
+
+
+def _van(flujos: np.ndarray, t: np.ndarray, tasas: np.ndarray) -> np.ndarray:
+    v = 1.0 / (1.0 + tasas)
+    return (flujos * v[:, None] ** t[None, :]).sum(axis=1)
+
+
+# ============================================================
+# Solver en lote (Halley con respaldo por bisección)
+# ============================================================
+
+def calcular_tir_lote(
+    flujos,
+    tol: float = TOLERANCIA_TIR,
+    max_iter: int = MAX_ITERACIONES,
+    tasa_inicial: float = 0.01,
+):
+    """
+    Calcula la TIR por periodo de muchos flujos a la vez.
+
+    `flujos` es una matriz (escenarios x periodos). Los flujos más cortos
+    se rellenan con ceros al final (no alteran el VAN).
+
+    Cada fila mantiene un intervalo [lo, hi] con cambio de signo; se usa el
+    paso de Halley y, si sale del intervalo, se bisecta. Así la convergencia
+    está garantizada y el resultado queda dentro de `tol`.
+
+    Devuelve (tir, convergio): arrays de tamaño escenarios. Las filas que
+    no convergen quedan en NaN y con convergio=False.
+    """
+    flujos = np.atleast_2d(np.asarray(flujos, dtype=np.float64))
+    n_esc, n_per = flujos.shape
+    t = np.arange(n_per, dtype=np.float64)
+
+    # 1. INTERVALO INICIAL CON CAMBIO DE SIGNO
+    # ----------------------------------------
+    lo = np.full(n_esc, -0.5)
+    hi = np.full(n_esc, 1.0)
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        f_lo = _van(flujos, t, lo)
+        f_hi = _van(flujos, t, hi)
+    for _ in range(60):
+        sin_cambio = np.sign(f_lo) == np.sign(f_hi)
+        if not sin_cambio.any():
+            break
+        # Se amplía hacia ambos lados: lo se acerca a -1, hi se duplica
+        lo = np.where(sin_cambio, -1.0 + (lo + 1.0) / 2.0, lo)
+        hi = np.where(sin_cambio, hi * 2.0, hi)
+        with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+            f_lo = np.where(sin_cambio, _van(flujos, t, lo), f_lo)
+            f_hi = np.where(sin_cambio, _van(flujos, t, hi), f_hi)
+
+    con_raiz = (np.sign(f_lo) != np.sign(f_hi)) & np.isfinite(f_lo) & np.isfinite(f_hi)
+    signo_lo = np.sign(f_lo)
+
+    tir = np.full(n_esc, np.nan)
+    convergio = np.zeros(n_esc, dtype=bool)
+
+    # Raíz exacta en un extremo del intervalo
+    tir[con_raiz & (f_lo == 0)] = lo[con_raiz & (f_lo == 0)]
+    tir[con_raiz & (f_hi == 0)] = hi[con_raiz & (f_hi == 0)]
+    convergio[con_raiz & ((f_lo == 0) | (f_hi == 0))] = True
+
+    activos = con_raiz & ~convergio
+    r = np.clip(np.full(n_esc, tasa_inicial), lo, hi)
+    r = np.where((r <= lo) | (r >= hi), (lo + hi) / 2.0, r)
+
+    # 2. ITERACIONES
+    # --------------
+    for _ in range(max_iter):
+        idx = np.flatnonzero(activos)
+        if idx.size == 0:
+            break
+
+        ri, loi, hii = r[idx], lo[idx], hi[idx]
+        with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+            f, df, d2f = _van_y_derivadas(flujos[idx], t, ri)
+
+        # Actualizar el intervalo con el signo de f
+        mismo_signo_lo = np.sign(f) == signo_lo[idx]
+        loi = np.where(mismo_signo_lo, ri, loi)
+        hii = np.where(mismo_signo_lo, hii, ri)
+
+        # Paso de Halley: r - 2 f f' / (2 f'^2 - f f'')
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r_nuevo = ri - (2 * f * df) / (2 * df * df - f * d2f)
+        fuera = ~np.isfinite(r_nuevo) | (r_nuevo <= loi) | (r_nuevo >= hii)
+        r_nuevo = np.where(fuera, (loi + hii) / 2.0, r_nuevo)
+
+        listo = (np.abs(r_nuevo - ri) <= tol) | (hii - loi <= tol) | (f == 0)
+        r_nuevo = np.where(f == 0, ri, r_nuevo)
+
+        r[idx], lo[idx], hi[idx] = r_nuevo, loi, hii
+        tir[idx[listo]] = r_nuevo[listo]
+        convergio[idx[listo]] = True
+        activos[idx[listo]] = False
+
+    return tir, convergio
+
+
+# ============================================================
+# Interfaz para un solo flujo
+# ============================================================
+
+def calcular_tir(flujo, tol: float = TOLERANCIA_TIR, max_iter: int = MAX_ITERACIONES) -> float:
+    """
+    TIR por periodo de un solo flujo. Lanza TIRNoConvergeError si no existe
+    o no se alcanza la tolerancia.
+    """
+    flujo = np.asarray(flujo, dtype=np.float64)
+    if flujo.size < 2 or not np.isfinite(flujo).all():
+        raise TIRNoConvergeError("El flujo de caja está vacío o contiene valores no finitos")
+
+    tir, convergio = calcular_tir_lote(flujo[None, :], tol=tol, max_iter=max_iter)
+    if not convergio[0]:
+        raise TIRNoConvergeError(
+            "No se encontró una TIR para el flujo (sin cambio de signo o sin convergencia)"
+        )
+    return float(tir[0])
+
+
+def tir_a_tcea(tir_mensual):
+    """
+    Anualiza la TIR mensual: TCEA = (1 + TIR)^12 - 1
+    """
+    return ((1 + tir_mensual) ** 12) - 1
@@ -0,0 +1,57 @@
+# backend/tests/conftest.py
+#
+# Los módulos del backend se importan como módulos planos (igual que al
+# correr uvicorn desde backend/). La BD, el almacén de flujos y el archivo de
+# cotizaciones fallidas de las pruebas van a un directorio temporal: se fijan
+# antes de importar `database`.
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+_TMP = tempfile.mkdtemp(prefix="tf_finanzas_tests_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TMP, 'pruebas.db')}")
+os.environ.setdefault("PROYECCION_DIRECTORIO", os.path.join(_TMP, "proyeccion_flujos"))
+os.environ.setdefault("COTIZACION_ARCHIVO_FALLIDAS", os.path.join(_TMP, "cotizaciones_fallidas.jsonl"))
+
+
+@pytest.fixture(scope="session")
+def api():
+    """Cliente HTTP de la app, con el ciclo de vida (startup/shutdown) activo"""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as cliente:
+        yield cliente
+
+
+@pytest.fixture(scope="session")
+def agente(api):
+    """Headers de un agente registrado (username "ana")"""
+    api.post("/api/registrar-usuario", json={"username": "ana", "email": "ana@x.com", "password": "clave"})
+    token = api.post("/token", data={"username": "ana@x.com", "password": "clave"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def cotizacion_base(api, agente) -> dict:
+    """CotizacionInput válido sobre un cliente y un inmueble creados para las pruebas"""
+    cliente = api.post("/api/clientes", headers=agente, json=dict(
+        dni="12345678", nombres="Rosa", apellidos="Quispe", email="rosa@x.com", telefono="999",
+        ingreso_mensual=9000, edad=35, direccion_actual="Lima",
+    )).json()
+    inmueble = api.post("/api/inmuebles", headers=agente, json=dict(
+        codigo_proyecto="P1", direccion="Av. Siempre Viva 123", tipo="Departamento",
+        area_m2=80, precio_venta=350000, moneda_venta="PEN",
+    )).json()
+    return dict(
+        cliente_id=cliente["id"], inmueble_id=inmueble["id"], precio_final_inmueble=350000,
+        porcentaje_cuota_inicial=10, tipo_tasa="Efectiva", valor_tasa=9, plazo_anios=20,
+        seguro_desgravamen_porc=0.05, seguro_riesgo_porc=0.3,
+    )
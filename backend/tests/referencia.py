@@ -0,0 +1,133 @@
+# backend/tests/referencia.py
+#
+# Cálculo de referencia: el bucle mes a mes de logic.calcular_cotizacion tal
+# como estaba antes del motor vectorizado, para comparar contra él.
+#
+# Cambios: con tasa 0% la fórmula de la renta divide entre cero; se usa su
+# límite (saldo / meses restantes), que es lo que hace el motor actual. Con
+# tramos_tasa la TEM del mes pasa a la del tramo desde su desde_mes (el bucle
+# ya recalcula la cuota cada mes sobre el saldo y el plazo restantes).
+#
+# assert_paridad compara un resultado del motor con el de la referencia.
+
+import numpy as np
+import numpy_financial as npf
+import pytest
+
+import logic
+
+# Las columnas salen redondeadas a 2 decimales: una diferencia de float en el
+# último bit puede mover un redondeo en un centavo
+TOLERANCIA_MONTO = 0.01 + 1e-9
+TOLERANCIA_TASA = 1e-6          # TCEA/TIR en %, redondeadas a 7 decimales
+
+
+def _tem(tipo_tasa, valor_tasa, capitalizacion):
+    tasa_decimal = valor_tasa / 100.0
+    if tipo_tasa == "Nominal":
+        if capitalizacion > 0:
+            m = 360 / capitalizacion
+            return ((1 + (tasa_decimal / m)) ** (30 / capitalizacion)) - 1
+        return ((1 + tasa_decimal) ** (30 / 360)) - 1
+    return ((1 + tasa_decimal) ** (30 / 360)) - 1
+
+
+def calcular_cotizacion_referencia(datos):
+    monto_inicial = datos.precio_final_inmueble * (datos.porcentaje_cuota_inicial / 100.0)
+    monto_prestamo = datos.precio_final_inmueble - monto_inicial - datos.monto_bono_buen_pagador
+
+    tem = _tem(datos.tipo_tasa, datos.valor_tasa, datos.capitalizacion)
+    tramos = sorted(datos.tramos_tasa or (), key=lambda t: t.desde_mes)
+
+    total_cuotas = datos.plazo_anios * 12
+
+    cronograma = []
+    flujo_caja = [monto_prestamo]
+    saldo_capital = monto_prestamo
+    cuota_mensual_referencial = 0.0
+
+    for n in range(1, total_cuotas + 1):
+        tem_mes = tem
+        for tramo in tramos:
+            if n >= tramo.desde_mes:
+                tem_mes = _tem(tramo.tipo_tasa, tramo.valor_tasa, tramo.capitalizacion)
+
+        seguro_desgravamen = saldo_capital * (datos.seguro_desgravamen_porc / 100.0)
+        seguro_riesgo = datos.precio_final_inmueble * (datos.seguro_riesgo_porc / 12 / 100.0)
+        gastos = datos.gastos_administrativos
+
+        interes = saldo_capital * tem_mes
+        amortizacion = 0.0
+        cuota_financiera = 0.0
+
+        if n <= datos.meses_gracia:
+            if datos.tipo_periodo_gracia == "Total":
+                saldo_capital += interes
+            elif datos.tipo_periodo_gracia == "Parcial":
+                cuota_financiera = interes
+        else:
+            meses_restantes = total_cuotas - n + 1
+            if saldo_capital > 0:
+                if tem_mes == 0:
+                    cuota_financiera = saldo_capital / meses_restantes
+                else:
+                    factor = (tem_mes * ((1 + tem_mes) ** meses_restantes)) / (((1 + tem_mes) ** meses_restantes) - 1)
+                    cuota_financiera = saldo_capital * factor
+                amortizacion = cuota_financiera - interes
+            if cuota_mensual_referencial == 0:
+                cuota_mensual_referencial = cuota_financiera + seguro_desgravamen + seguro_riesgo + gastos
+
+        cuota_total = cuota_financiera + seguro_desgravamen + seguro_riesgo + gastos
+
+        if datos.tipo_periodo_gracia != "Total" or n > datos.meses_gracia:
+            saldo_capital -= amortizacion
+            if n == total_cuotas and abs(saldo_capital) < 10:
+                cuota_total += saldo_capital
+                amortizacion += saldo_capital
+                saldo_capital = 0.0
+
+        if saldo_capital < 0:
+            saldo_capital = 0
+
+        cronograma.append({
+            "n": n,
+            "saldo_inicial": round(saldo_capital + amortizacion if (datos.tipo_periodo_gracia != "Total" or n > datos.meses_gracia) else saldo_capital - interes, 2),
+            "interes": round(interes, 2),
+            "amortizacion": round(amortizacion, 2),
+            "seguro_desgravamen": round(seguro_desgravamen, 2),
+            "seguro_riesgo": round(seguro_riesgo, 2),
+            "gastos": round(gastos, 2),
+            "cuota_total": round(cuota_total, 2),
+            "saldo_final": round(saldo_capital, 2),
+        })
+        flujo_caja.append(-cuota_total)
+
+    tir_mensual = npf.irr(flujo_caja)
+    tcea = ((1 + tir_mensual) ** 12) - 1
+    van = npf.npv(tem, flujo_caja)
+
+    return {
+        "monto_prestamo": round(monto_prestamo, 2),
+        "cuota_mensual_referencial": round(cuota_mensual_referencial, 2),
+        "tcea": round(tcea * 100, 7),
+        "van": round(van, 2),
+        "tir": round(tir_mensual * 100, 7),
+        "cronograma": cronograma,
+    }
+
+
+def assert_paridad(nuevo: dict, referencia: dict):
+    for campo in ("monto_prestamo", "cuota_mensual_referencial", "van"):
+        assert nuevo[campo] == pytest.approx(referencia[campo], abs=TOLERANCIA_MONTO), campo
+    for campo in ("tcea", "tir"):
+        assert nuevo[campo] == pytest.approx(referencia[campo], abs=TOLERANCIA_TASA), campo
+
+    assert len(nuevo["cronograma"]) == len(referencia["cronograma"])
+    assert all(f.keys() == r.keys() for f, r in zip(nuevo["cronograma"], referencia["cronograma"]))
+    for columna in logic.COLUMNAS_CRONOGRAMA:
+        a = np.array([f[columna] for f in nuevo["cronograma"]])
+        b = np.array([f[columna] for f in referencia["cronograma"]])
+        diferencia = np.abs(a - b)
+        assert not (diferencia > TOLERANCIA_MONTO).any(), (
+            f"{columna}: cuota {int(np.argmax(diferencia)) + 1}, diferencia {diferencia.max()}"
+        )
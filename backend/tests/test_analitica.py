@@ -0,0 +1,97 @@
+# backend/tests/test_analitica.py
+#
+# Resumen de analítica: el embudo de clientes se decide con UPSERTs (sin
+# leer cotizaciones previas) y los nuevos / recurrentes se cuentan al consultar.
+
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import analitica
+import models
+from database import Base
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def fila(cliente_id: int, dia: int, vendedor_id: int = 1, moneda: str = "PEN") -> dict:
+    return {
+        "fecha_cotizacion": datetime(2026, 3, dia, 10),
+        "vendedor_id": vendedor_id,
+        "cliente_id": cliente_id,
+        "inmueble_id": None,
+        "moneda_prestamo": moneda,
+        "tcea": 0.1,
+        "monto_prestamo": 1000.0,
+        "cuota_mensual_referencial": 100.0,
+    }
+
+
+def guardar(engine, filas: list[dict]):
+    # Una transacción por llamada, como cada inserción de la API
+    with Session(engine) as db:
+        analitica.actualizar_resumen(db, filas)
+        db.commit()
+
+
+def consultar(engine, desde: date | None = None, hasta: date | None = None) -> dict:
+    with Session(engine) as db:
+        filas = db.execute(analitica.consultar_resumen("vendedor", desde, hasta)).mappings().all()
+    return {(f["clave"], f["moneda"]): f for f in filas}
+
+
+def test_embudo_cuenta_una_vez_al_cliente_nuevo(engine):
+    # Mismo cliente en transacciones separadas y dentro de un mismo lote
+    guardar(engine, [fila(1, 1)])
+    guardar(engine, [fila(1, 1)])
+    guardar(engine, [fila(1, 2), fila(2, 2), fila(2, 2)])
+
+    r = consultar(engine)[("1", "PEN")]
+    assert r["cotizaciones"] == 5
+    assert r["clientes_nuevos"] == 2
+    assert r["clientes_recurrentes"] == 2
+
+
+def test_embudo_por_rango_y_moneda(engine):
+    guardar(engine, [fila(1, 1), fila(1, 5, moneda="USD"), fila(1, 9)])
+
+    r = consultar(engine, date(2026, 3, 1), date(2026, 3, 3))
+    assert r[("1", "PEN")]["clientes_nuevos"] == 1
+    assert r[("1", "PEN")]["clientes_recurrentes"] == 0
+
+    # La segunda cotización fue en USD: recurrente en esa moneda
+    r = consultar(engine, date(2026, 3, 4))
+    assert r[("1", "USD")]["clientes_nuevos"] == 0
+    assert r[("1", "USD")]["clientes_recurrentes"] == 1
+    assert r[("1", "PEN")]["clientes_recurrentes"] == 0
+    assert r[("1", "PEN")]["cotizaciones"] == 1
+
+
+def test_reconstruir_coincide_con_incremental(engine):
+    filas = [fila(1, 1), fila(2, 1), fila(1, 2, vendedor_id=2), fila(1, 3), fila(3, 4, moneda="USD")]
+    guardar(engine, [dict(f) for f in filas])
+    incremental = consultar(engine)
+
+    with Session(engine) as db:
+        db.execute(insert(models.Cotizacion), filas)
+        analitica.reconstruir_resumen(db)
+    assert consultar(engine) == incremental
+
+
+def test_actualizar_no_lee_cotizaciones(engine):
+    sentencias = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, sql, *args: sentencias.append(sql.split()[0].upper()))
+
+    guardar(engine, [fila(1, 1), fila(2, 1)])
+    # Sin inmueble no hace falta resolver proyectos: sólo los dos UPSERT
+    assert sentencias == ["INSERT", "INSERT"]
@@ -0,0 +1,39 @@
+# backend/tests/test_auth.py
+#
+# Caché de tokens: una cuenta borrada fuera del ORM de este proceso (otro
+# worker, SQL directo) deja de autenticar a lo más AUTH_CACHE_TTL_SEGUNDOS
+# después.
+
+import time
+
+from sqlalchemy import text
+
+import auth_utils
+from database import engine
+
+
+def test_cache_vence_con_el_ttl(monkeypatch):
+    cache = auth_utils.CacheTokens(ttl=30)
+    agente = auth_utils.AgenteAutenticado(id=1, username="ana", email="ana@x.com")
+    ahora = time.time()
+    cache.guardar("t", ahora + 3600, agente)
+    assert cache.obtener("t") == agente
+
+    monkeypatch.setattr(auth_utils.time, "time", lambda: ahora + 31)
+    assert cache.obtener("t") is None
+
+
+def test_cuenta_borrada_por_fuera_deja_de_autenticar(api, monkeypatch):
+    api.post("/api/registrar-usuario", json={"username": "beto", "email": "beto@x.com", "password": "clave"})
+    token = api.post("/token", data={"username": "beto@x.com", "password": "clave"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert api.get("/api/clientes", headers=headers).status_code == 200
+
+    # Otro proceso la borra: este no se entera hasta que vence la entrada
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM cuentas_agente WHERE email = 'beto@x.com'"))
+    assert api.get("/api/clientes", headers=headers).status_code == 200
+
+    ahora = time.time()
+    monkeypatch.setattr(auth_utils.time, "time", lambda: ahora + auth_utils.AUTH_CACHE_TTL_SEGUNDOS + 1)
+    assert api.get("/api/clientes", headers=headers).status_code == 401
@@ -0,0 +1,44 @@
+# backend/tests/test_cache.py
+#
+# Caché de cotizaciones: guarda el cronograma codificado y en cada acierto
+# devuelve el mismo resultado que el cálculo, como lista de dicts nueva.
+
+from cache import CacheCotizaciones
+from schemas import CotizacionInput
+
+
+def cotizacion(plazo: int = 20) -> CotizacionInput:
+    return CotizacionInput(
+        cliente_id=1, inmueble_id=1, precio_final_inmueble=350000, porcentaje_cuota_inicial=10,
+        tipo_tasa="Efectiva", valor_tasa=9.0, plazo_anios=plazo, tipo_periodo_gracia="Sin Gracia",
+        meses_gracia=0, seguro_desgravamen_porc=0.05, seguro_riesgo_porc=0.3, gastos_administrativos=10,
+    )
+
+
+def test_acierto_reconstruye_el_mismo_resultado():
+    cache = CacheCotizaciones(max_entradas=4, habilitado=True)
+    calculado = cache.calcular(cotizacion())
+    acierto = cache.calcular(cotizacion())
+
+    assert acierto == calculado
+    assert acierto["cronograma"] is not calculado["cronograma"]
+    assert cache.estadisticas()["aciertos"] == 1
+
+    # Modificar lo devuelto no altera lo guardado
+    acierto["cronograma"][0]["cuota_total"] = -1
+    assert cache.calcular(cotizacion()) == calculado
+
+
+def test_guarda_el_cronograma_compacto():
+    cache = CacheCotizaciones(max_entradas=2, habilitado=True)
+    for plazo in (5, 10, 20):
+        cache.calcular(cotizacion(plazo))
+
+    estadisticas = cache.estadisticas()
+    assert estadisticas["entradas"] == 2
+    assert estadisticas["desalojos"] == 1
+    # 2 cronogramas de 120 y 240 cuotas: unos pocos KB, no cientos de dicts
+    assert 0 < estadisticas["bytes_cronogramas"] < 2 * 240 * 10 * 8
+
+    cache.limpiar()
+    assert cache.estadisticas()["bytes_cronogramas"] == 0
@@ -0,0 +1,44 @@
+# backend/tests/test_cotizaciones_listado.py
+#
+# GET /api/cotizaciones: nombres de vendedor, cliente e inmueble del resumen,
+# y la FK de vendedor_id (ids de CuentaAgente).
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import models
+from database import Base
+
+
+def test_vendedor_es_la_cuenta_agente_que_cotizo(api, agente, cotizacion_base):
+    # Un Usuario interno con otro nombre: no debe aparecer como vendedor
+    api.post("/api/usuarios", headers=agente, json={"username": "interno", "email": "interno@x.com", "password": "x"})
+
+    creada = api.post("/api/cotizar", headers=agente, json=cotizacion_base).json()
+    filas = api.get("/api/cotizaciones", headers=agente, params={"limit": 1000}).json()
+    fila = next(f for f in filas if f["id"] == creada["id"])
+
+    assert fila["vendedor"] == "ana"
+    assert fila["cliente"] == "Rosa Quispe"
+    assert fila["codigo_proyecto"] == "P1"
+
+
+def test_fk_de_vendedor_apunta_a_cuentas_agente():
+    # Con las FK activas (como en PostgreSQL) una cotización de un agente sin
+    # Usuario con el mismo id debe aceptarse
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    event.listen(engine, "connect", lambda conexion, _: conexion.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(models.CuentaAgente(id=7, username="ana", email="ana@x.com", password="x"))
+        db.add(models.Cotizacion(vendedor_id=7))
+        db.commit()
+        assert db.scalars(select(models.Cotizacion)).one().vendedor.username == "ana"
+
+        db.add(models.Cotizacion(vendedor_id=8))
+        with pytest.raises(IntegrityError):
+            db.commit()
+    engine.dispose()
@@ -0,0 +1,100 @@
+# backend/tests/test_escritura_diferida.py
+#
+# Escritura diferida: reserva de IDs compartida entre procesos y filas que
+# no se pudieron guardar (archivo de fallidas, reintento al arrancar).
+
+import asyncio
+import os
+from datetime import datetime
+
+import analitica
+import crud
+import crud_async
+import escritura_diferida
+import logic
+import models
+from database import AsyncSessionLocal
+from escritura_diferida import AsignadorIds, EscritorDiferido, escritor_diferido
+from schemas import CotizacionInput
+
+
+def test_ids_reservados_no_se_repiten_entre_asignadores(api):
+    # Dos asignadores = dos procesos de la API: el contador vive en la BD
+    a, b = AsignadorIds(), AsignadorIds()
+
+    async def reservar():
+        async with AsyncSessionLocal() as db:
+            return await a.reservar(db, 3) + await b.reservar(db, 2) + await a.reservar(db, 1)
+
+    ids = api.portal.call(reservar)
+    assert ids == list(range(ids[0], ids[0] + 6))
+
+
+def test_fila_fallida_no_se_pierde_y_se_recupera(api, agente, cotizacion_base, monkeypatch):
+    datos = CotizacionInput(**cotizacion_base)
+    valores = crud.cotizacion_valores(datos, logic.calcular_cotizacion(datos), vendedor_id=1)
+
+    async def reservar():
+        async with AsyncSessionLocal() as db:
+            return await escritor_diferido.ids.reservar(db)
+
+    [id_reservado] = api.portal.call(reservar)
+    valores = dict(valores, id=id_reservado, fecha_cotizacion=datetime.utcnow())
+
+    def bd_caida(*args, **kwargs):
+        raise RuntimeError("BD caída")
+
+    monkeypatch.setattr(escritura_diferida, "REINTENTOS", 1)
+    monkeypatch.setattr(analitica, "actualizar_resumen", bd_caida)
+    api.portal.call(escritor_diferido._guardar, [valores])
+
+    metricas = api.get("/api/cotizar/escritura", headers=agente).json()
+    assert metricas["fallidas"] == 1
+    assert metricas["fallidas_pendientes"] == 1
+    assert os.path.exists(escritor_diferido.archivo_fallidas)
+    # El ID que recibió el cliente sigue respondiendo
+    url = f"/api/cotizaciones/{id_reservado}/cronograma"
+    assert api.get(url, headers=agente).status_code == 200
+
+    # Al volver la BD, el reintento del arranque la guarda
+    monkeypatch.undo()
+    assert api.portal.call(escritor_diferido.reintentar_fallidas) == 1
+    assert not os.path.exists(escritor_diferido.archivo_fallidas)
+    assert escritor_diferido.metricas()["fallidas_pendientes"] == 0
+    assert escritor_diferido.pendiente(id_reservado) is None
+    cuotas = api.get(url, headers=agente, params={"desde": 1, "hasta": 3}).json()["cuotas"]
+    assert [c["n"] for c in cuotas] == [1, 2, 3]
+
+
+def test_reintento_concurrente_toma_cada_fila_una_vez(api, cotizacion_base, tmp_path):
+    datos = CotizacionInput(**cotizacion_base)
+    valores = crud.cotizacion_valores(datos, logic.calcular_cotizacion(datos), vendedor_id=1)
+
+    async def reservar():
+        async with AsyncSessionLocal() as db:
+            return await escritor_diferido.ids.reservar(db, 3)
+
+    ids = api.portal.call(reservar)
+    filas = [dict(valores, id=id_, fecha_cotizacion=datetime.utcnow()) for id_ in ids]
+
+    # Una fila quedó en el archivo de un proceso que murió reintentando
+    archivo = str(tmp_path / "fallidas.jsonl")
+    escritura_diferida._agregar_lineas(archivo, [escritura_diferida._a_linea(f, "BD caída") for f in filas[:2]])
+    escritura_diferida._agregar_lineas(archivo + ".999999-muerto.procesando",
+                                       [escritura_diferida._a_linea(filas[2], "BD caída")])
+
+    # Dos procesos arrancando a la vez
+    a, b = EscritorDiferido(archivo_fallidas=archivo), EscritorDiferido(archivo_fallidas=archivo)
+
+    async def reintentar():
+        return await asyncio.gather(a.reintentar_fallidas(), b.reintentar_fallidas())
+
+    assert sum(api.portal.call(reintentar)) == 3
+    assert a.fallidas == b.fallidas == 0
+    assert os.listdir(tmp_path) == []
+
+    async def guardadas():
+        async with AsyncSessionLocal() as db:
+            return await crud_async.get_ids_existentes(db, models.Cotizacion, ids)
+
+    assert api.portal.call(guardadas) == set(ids)
@@ -0,0 +1,121 @@
+# backend/tests/test_estres.py
+#
+# Prueba de estrés: cotizaciones con tasa por tramos (lo pactado es el
+# cronograma de sus tramos), el pool compartido con lugares limitados y las
+# pruebas que quedan en curso si la API se cae.
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import crud
+import estres
+import logic
+import models
+from database import Base
+from schemas import CotizacionInput, TramoTasa
+
+# Sin shock el reprecio reproduce lo pactado; la TCEA sale de la TIR con
+# TOLERANCIA_TIR_ESTRES y se promedia redondeada a 4 decimales
+TOLERANCIA_TCEA = 1e-3
+
+PARAMETROS = dict(simulaciones=3, semilla=7, deriva_anual=0.0, volatilidad_anual=0.0, meses_fijos=12)
+
+
+def cotizacion(tramos=None) -> CotizacionInput:
+    return CotizacionInput(
+        cliente_id=1,
+        inmueble_id=1,
+        precio_final_inmueble=350000,
+        porcentaje_cuota_inicial=10,
+        tipo_tasa="Efectiva",
+        valor_tasa=9.0,
+        plazo_anios=20,
+        tramos_tasa=tramos,
+        tipo_periodo_gracia="Sin Gracia",
+        meses_gracia=0,
+        seguro_desgravamen_porc=0.05,
+        seguro_riesgo_porc=0.3,
+        gastos_administrativos=10,
+    )
+
+
+def cartera(*lista_datos) -> tuple[dict, list]:
+    """Cartera de cargar_cartera con las cotizaciones dadas y sus resultados"""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    resultados = [logic.calcular_cotizacion(d) for d in lista_datos]
+    with Session(engine) as db:
+        for vendedor_id, (datos, resultado) in enumerate(zip(lista_datos, resultados), start=1):
+            db.add(models.Cotizacion(**crud.cotizacion_valores(datos, resultado, vendedor_id)))
+        db.commit()
+        datos_cartera = estres.cargar_cartera(db)
+    engine.dispose()
+    return datos_cartera, resultados
+
+
+def test_tramos_sin_shock_reproducen_lo_pactado():
+    # Un cambio dentro de los meses fijos y dos al empezar años de reprecio
+    tramos = [
+        TramoTasa(desde_mes=7, tipo_tasa="Efectiva", valor_tasa=10.0),
+        TramoTasa(desde_mes=25, tipo_tasa="Efectiva", valor_tasa=11.0),
+        TramoTasa(desde_mes=61, tipo_tasa="Efectiva", valor_tasa=8.0),
+    ]
+    datos, resultados = cartera(cotizacion(), cotizacion(tramos))
+    assert datos["tasas"][0] is None
+    assert len(datos["tasas"][1]) == 4
+
+    r = estres.ejecutar_estres(datos, **PARAMETROS, en_pool=False)
+    for vendedor, resultado in zip(("1", "2"), resultados):
+        tcea = r["vendedor"][vendedor]["tcea"]["promedio"]
+        assert tcea == pytest.approx(resultado["tcea"], abs=TOLERANCIA_TCEA)
+
+
+def test_pool_compartido_entre_pruebas(monkeypatch):
+    monkeypatch.setattr(estres, "ESTRES_PROCESOS", 2)
+    datos, _ = cartera(cotizacion(), cotizacion([TramoTasa(desde_mes=13, tipo_tasa="Efectiva", valor_tasa=12.0)]))
+    parametros = dict(PARAMETROS, volatilidad_anual=1.0)
+    try:
+        primera = estres.ejecutar_estres(datos, **parametros, en_pool=True)
+        pool = estres._pool
+        segunda = estres.ejecutar_estres(datos, **dict(parametros, semilla=8), en_pool=True)
+        assert estres._pool is pool
+    finally:
+        estres.cerrar_pool()
+    assert primera == estres.ejecutar_estres(datos, **parametros, en_pool=False)
+    assert segunda != primera
+
+
+def test_lanzar_prueba_ocupado_responde_429(api, agente, monkeypatch):
+    monkeypatch.setattr(estres, "ESTRES_PROCESOS", 0)
+    assert estres.reservar_corrida()
+    try:
+        r = api.post("/api/estres", json={"simulaciones": 2}, headers=agente)
+        assert r.status_code == 429
+        assert "Retry-After" in r.headers
+    finally:
+        estres.liberar_corrida()
+
+    # Con lugar libre corre (en segundo plano) y lo devuelve al terminar
+    r = api.post("/api/estres", json={"simulaciones": 2}, headers=agente)
+    assert r.status_code == 202
+    assert api.get(f"/api/estres/{r.json()['id']}", headers=agente).json()["estado"] == "completada"
+    assert estres.reservar_corrida()
+    estres.liberar_corrida()
+
+
+def test_marcar_interrumpidas():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    estados = ("pendiente", "en_curso", "completada", "error")
+    with Session(engine) as db:
+        db.add_all(models.PruebaEstres(estado=e, parametros="{}") for e in estados)
+        db.commit()
+
+        assert estres.marcar_interrumpidas(db) == 2
+        pruebas = db.query(models.PruebaEstres).order_by(models.PruebaEstres.id).all()
+        assert [p.estado for p in pruebas] == ["error"] * 2 + ["completada", "error"]
+        assert all("Interrumpida" in p.error for p in pruebas[:2])
+        assert estres.marcar_interrumpidas(db) == 0
+    engine.dispose()
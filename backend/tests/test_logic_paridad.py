@@ -0,0 +1,63 @@
+# backend/tests/test_logic_paridad.py
+#
+# Paridad del motor vectorizado (logic.calcular_cotizacion) con el bucle mes
+# a mes anterior (tests/referencia.py): todas las columnas del cronograma,
+# cuota referencial, TCEA, TIR y VAN.
+
+import itertools
+
+import pytest
+
+import logic
+from referencia import assert_paridad, calcular_cotizacion_referencia
+from schemas import CotizacionInput
+
+# npf.irr en la referencia domina el tiempo: la grilla se mantiene chica
+TIPOS_GRACIA = ("Sin Gracia", "Total", "Parcial")
+TIPOS_TASA = ("Efectiva", "Nominal")
+CAPITALIZACIONES = (30, 1, 0)
+MESES_GRACIA = (0, 1, 12)
+PLAZOS = (2, 10, 30)
+TASAS = (0.0, 9.0)
+
+def cotizacion(tipo_gracia, tipo_tasa, capitalizacion, meses_gracia, plazo, tasa) -> CotizacionInput:
+    return CotizacionInput(
+        cliente_id=1,
+        inmueble_id=1,
+        precio_final_inmueble=350000,
+        porcentaje_cuota_inicial=10,
+        monto_bono_buen_pagador=25000,
+        tipo_tasa=tipo_tasa,
+        valor_tasa=tasa,
+        capitalizacion=capitalizacion,
+        plazo_anios=plazo,
+        tipo_periodo_gracia=tipo_gracia,
+        meses_gracia=meses_gracia,
+        seguro_desgravamen_porc=0.05,
+        seguro_riesgo_porc=0.3,
+        gastos_administrativos=10,
+    )
+
+
+@pytest.mark.parametrize(
+    "tipo_gracia,tipo_tasa,capitalizacion",
+    list(itertools.product(TIPOS_GRACIA, TIPOS_TASA, CAPITALIZACIONES)),
+)
+def test_paridad_con_bucle_anterior(tipo_gracia, tipo_tasa, capitalizacion):
+    for meses_gracia, plazo, tasa in itertools.product(MESES_GRACIA, PLAZOS, TASAS):
+        datos = cotizacion(tipo_gracia, tipo_tasa, capitalizacion, meses_gracia, plazo, tasa)
+        assert_paridad(logic.calcular_cotizacion(datos), calcular_cotizacion_referencia(datos))
+
+
+def test_tasa_cero_es_lineal():
+    datos = cotizacion("Sin Gracia", "Efectiva", 30, 0, 5, 0.0)
+    resultado = logic.calcular_cotizacion(datos)
+    amortizaciones = {fila["amortizacion"] for fila in resultado["cronograma"]}
+    assert amortizaciones == {round(resultado["monto_prestamo"] / 60, 2)}
+    assert all(fila["interes"] == 0 for fila in resultado["cronograma"])
+    assert resultado["cronograma"][-1]["saldo_final"] == 0
+
+
+def test_plazo_invalido():
+    with pytest.raises(ValueError):
+        logic.calcular_cotizacion(cotizacion("Sin Gracia", "Efectiva", 30, 0, 0, 9.0))
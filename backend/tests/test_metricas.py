@@ -0,0 +1,27 @@
+# backend/tests/test_metricas.py
+#
+# Instrumentación de consultas: una consulta que falla no deja su inicio
+# en la pila de la conexión.
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
+
+import metricas
+
+
+def test_consulta_fallida_no_deja_inicio_en_la_conexion():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    metricas.instrumentar_engine(engine)
+    desglose = metricas.nuevo_desglose()
+
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM no_existe"))
+        conn.execute(text("SELECT 1"))
+        assert conn.info["inicio_consulta"] == []
+
+    assert desglose["db_consultas"] == 4
+    engine.dispose()
@@ -0,0 +1,112 @@
+# backend/tests/test_proyeccion.py
+#
+# Almacén de flujos: registra con el cronograma ya calculado, una vez por
+# cotización, y la reconstrucción no pierde lo registrado mientras corre.
+
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import crud
+import logic
+import models
+import proyeccion
+from database import Base
+from schemas import CotizacionInput
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    return proyeccion.AlmacenFlujos(str(tmp_path / "flujos"))
+
+
+@pytest.fixture
+def db():
+    # La reconstrucción corre en otro hilo en uno de los tests
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as sesion:
+        yield sesion
+    engine.dispose()
+
+
+def valores(id_: int, plazo: int = 2) -> dict:
+    datos = CotizacionInput(
+        cliente_id=1, inmueble_id=1, precio_final_inmueble=350000, porcentaje_cuota_inicial=10,
+        tipo_tasa="Efectiva", valor_tasa=9.0, plazo_anios=plazo, tipo_periodo_gracia="Sin Gracia",
+        meses_gracia=0, seguro_desgravamen_porc=0.05, seguro_riesgo_porc=0.3, gastos_administrativos=10,
+    )
+    fila = crud.cotizacion_valores(datos, logic.calcular_cotizacion(datos), 1)
+    return dict(fila, id=id_, fecha_cotizacion=datetime(2026, 1, 15))
+
+
+def registrar(filas: list[dict], almacen):
+    proyeccion.registrar(filas, almacen)
+    proyeccion.esperar_registros()
+
+
+def test_registra_una_vez_por_id(almacen):
+    registrar([valores(1), valores(2), valores(2)], almacen)
+    registrar([valores(1), valores(3)], almacen)     # reintento de 1
+
+    indice = almacen.indice()
+    assert sorted(indice["id"]) == [1, 2, 3]
+    assert almacen.estadisticas()["cuotas"] == 3 * 24
+
+
+def test_usa_el_cronograma_calculado(almacen, monkeypatch):
+    fila = valores(1)
+
+    def no_recalcular(*args, **kwargs):
+        raise AssertionError("se recalculó el cronograma")
+
+    monkeypatch.setattr(logic, "columnas_cotizaciones_guardadas", no_recalcular)
+    registrar([fila], almacen)
+
+    cronograma = models.Cotizacion(**fila).cronograma
+    total = almacen.proyectar()["total"]
+    assert total["cuota_total"] == pytest.approx(sum(f["cuota_total"] for f in cronograma), abs=1e-6)
+    assert total["interes"] == pytest.approx(sum(f["interes"] for f in cronograma), abs=1e-6)
+
+
+def test_reconstruir_no_pierde_lo_registrado_mientras_corre(almacen, db, monkeypatch):
+    db.execute(insert(models.Cotizacion), [valores(1)])
+    db.commit()
+
+    empezo, seguir = threading.Event(), threading.Event()
+    original = logic.columnas_cotizaciones_guardadas
+
+    def lento(cotizaciones):
+        empezo.set()
+        seguir.wait(5)
+        return original(cotizaciones)
+
+    monkeypatch.setattr(logic, "columnas_cotizaciones_guardadas", lento)
+    hilo = threading.Thread(target=proyeccion.reconstruir, args=(db, almacen))
+    hilo.start()
+    assert empezo.wait(5)
+
+    # Guardada después de que la reconstrucción leyó la BD
+    proyeccion.registrar([valores(2)], almacen)
+    seguir.set()
+    hilo.join(5)
+    proyeccion.esperar_registros()
+
+    assert sorted(almacen.indice()["id"]) == [1, 2]
+
+
+def test_sincronizar_reconstruye_si_no_coincide_con_la_bd(almacen, db):
+    # Almacén de una BD anterior (más cotizaciones que la actual)
+    registrar([valores(1), valores(2), valores(3)], almacen)
+    db.execute(insert(models.Cotizacion), [valores(1, plazo=3)])
+    db.commit()
+
+    assert proyeccion.sincronizar(db, almacen)
+    indice = almacen.indice()
+    assert list(indice["id"]) == [1]
+    assert int(indice["meses"][0]) == 36
+    assert not proyeccion.sincronizar(db, almacen)
@@ -0,0 +1,74 @@
+# backend/tests/test_tramos.py
+#
+# Tasa por tramos (logic.calcular_columnas_tramos) contra el bucle mes a mes
+# de referencia: un solo tramo debe dar el cronograma de tasa única y varios
+# tramos el del bucle con la TEM cambiando desde cada desde_mes.
+
+import itertools
+
+import pytest
+
+import logic
+from referencia import assert_paridad, calcular_cotizacion_referencia
+from schemas import CotizacionInput, TramoTasa
+
+TIPOS_GRACIA = ("Sin Gracia", "Total", "Parcial")
+PLAZOS = (2, 20)
+
+
+def cotizacion(plazo: int, tipo_gracia: str, meses_gracia: int, tramos=None) -> CotizacionInput:
+    return CotizacionInput(
+        cliente_id=1,
+        inmueble_id=1,
+        precio_final_inmueble=350000,
+        porcentaje_cuota_inicial=10,
+        monto_bono_buen_pagador=25000,
+        tipo_tasa="Efectiva",
+        valor_tasa=9.0,
+        plazo_anios=plazo,
+        tramos_tasa=tramos,
+        tipo_periodo_gracia=tipo_gracia,
+        meses_gracia=0 if tipo_gracia == "Sin Gracia" else meses_gracia,
+        seguro_desgravamen_porc=0.05,
+        seguro_riesgo_porc=0.3,
+        gastos_administrativos=10,
+    )
+
+
+def tramo(desde_mes: int, valor_tasa: float, tipo_tasa: str = "Efectiva", capitalizacion: int = 30) -> TramoTasa:
+    return TramoTasa(desde_mes=desde_mes, tipo_tasa=tipo_tasa, valor_tasa=valor_tasa, capitalizacion=capitalizacion)
+
+
+@pytest.mark.parametrize("tipo_gracia,plazo", list(itertools.product(TIPOS_GRACIA, PLAZOS)))
+def test_un_tramo_es_la_tasa_unica(tipo_gracia, plazo):
+    # Un tramo desde la cuota 1 con la misma tasa reemplaza a la base
+    for meses_gracia in (1, 6):
+        sin_tramos = cotizacion(plazo, tipo_gracia, meses_gracia)
+        con_tramo = cotizacion(plazo, tipo_gracia, meses_gracia, [tramo(1, 9.0)])
+        assert_paridad(logic.calcular_cotizacion(con_tramo), calcular_cotizacion_referencia(sin_tramos))
+
+
+@pytest.mark.parametrize("tipo_gracia", TIPOS_GRACIA)
+def test_tramos_coinciden_con_bucle(tipo_gracia):
+    casos = (
+        # Cambio de tasa dentro de la gracia (la gracia cruza el tramo)
+        [tramo(7, 11.0)],
+        # Justo donde termina la gracia, y otro al final del plazo
+        [tramo(13, 7.5), tramo(240, 12.0)],
+        # Varios, desordenados, con tasa nominal y tasa 0%
+        [tramo(121, 0.0), tramo(4, 8.0, "Nominal", 1), tramo(61, 10.0)],
+    )
+    for tramos in casos:
+        datos = cotizacion(20, tipo_gracia, 12, tramos)
+        assert_paridad(logic.calcular_cotizacion(datos), calcular_cotizacion_referencia(datos))
+
+
+@pytest.mark.parametrize("desde_mes", [0, -1, 25])
+def test_tramo_fuera_del_plazo(desde_mes):
+    with pytest.raises(ValueError, match="fuera del plazo"):
+        logic.calcular_cotizacion(cotizacion(2, "Sin Gracia", 0, [tramo(desde_mes, 10.0)]))
+
+
+def test_tramo_repetido():
+    with pytest.raises(ValueError, match="dos tramos"):
+        logic.calcular_cotizacion(cotizacion(2, "Sin Gracia", 0, [tramo(5, 10.0), tramo(5, 11.0)]))